@@ -0,0 +1,72 @@
+"""Benchmark of the mask samplers of RISE.
+
+Measures how many masks each sampler needs to get the saliency map within a target relative error of a
+reference saliency map. The reference is the mean of several saliency maps computed with many plain random
+masks, so it is the same unbiased target for all samplers. The model is a simple function of the image,
+so the benchmark measures the Monte-Carlo error of the masks only.
+
+Usage:
+    python benchmarks/rise_samplers.py [--target-error 0.02] [--repeats 5]
+"""
+import argparse
+import numpy as np
+from dianna.methods.rise import RISE
+from dianna.methods.rise import SAMPLERS
+
+
+IMAGE_SHAPE = (32, 32, 1)
+N_MASKS = (125, 250, 500, 1000, 2000, 4000)
+N_REFERENCE_MASKS = 32000
+N_REFERENCE_SEEDS = 4
+# seeds of the reference maps, different from those of the measured maps
+REFERENCE_SEED = 1000
+P_KEEP = .5
+
+
+def get_model():
+    """Returns a model with 2 classes that depends nonlinearly on a region of the image."""
+    weights = np.zeros(IMAGE_SHAPE)
+    weights[8:20, 10:24] = 1
+    weights /= weights.sum()
+
+    def model(input_data):
+        score = 1 / (1 + np.exp(-10 * ((input_data * weights).reshape(len(input_data), -1).sum(axis=1) - .25)))
+        return np.stack([score, 1 - score], axis=1)
+
+    return model
+
+
+def explain(model, image, sampler, n_masks, seed):
+    """Computes the RISE saliency map of the first class."""
+    np.random.seed(seed)
+    explainer = RISE(n_masks=n_masks, p_keep=P_KEEP, axis_labels={-1: 'channels'}, sampler=sampler)
+    return explainer.explain_image(model, image, labels=(0, ), batch_size=500)[0]
+
+
+def main(argv=None):
+    """Runs the benchmark and prints the relative error per sampler and number of masks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target-error', type=float, default=.02, help='Target relative error (default: 0.02)')
+    parser.add_argument('--repeats', type=int, default=5, help='Number of repeats per setting (default: 5)')
+    args = parser.parse_args(argv)
+
+    model = get_model()
+    image = np.ones(IMAGE_SHAPE)
+    # plain random masks give an unbiased reference, so no sampler is measured against its own estimate
+    reference = np.mean([explain(model, image, 'random', N_REFERENCE_MASKS, seed=REFERENCE_SEED + seed)
+                         for seed in range(N_REFERENCE_SEEDS)], axis=0)
+
+    print(f"{'sampler':<12}" + ''.join(f'{n:>8}' for n in N_MASKS) + f"{'masks for target':>18}")
+    for sampler in SAMPLERS:
+        errors = []
+        for n_masks in N_MASKS:
+            saliencies = [explain(model, image, sampler, n_masks, seed=seed + 1) for seed in range(args.repeats)]
+            errors.append(np.mean([np.linalg.norm(saliency - reference) / np.linalg.norm(reference)
+                                   for saliency in saliencies]))
+        reached = [n_masks for n_masks, error in zip(N_MASKS, errors) if error <= args.target_error]
+        needed = str(reached[0]) if reached else f'>{N_MASKS[-1]}'
+        print(f'{sampler:<12}' + ''.join(f'{error:>8.3f}' for error in errors) + f'{needed:>18}')
+
+
+if __name__ == '__main__':
+    main()
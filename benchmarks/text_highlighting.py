@@ -0,0 +1,77 @@
+"""Benchmark of the text highlighting of dianna.visualization.
+
+Measures the time to create the html of a book-length text with every word highlighted, and compares it
+to the previous implementation, which rebuilt the text for each highlighted word.
+
+Usage:
+    python benchmarks/text_highlighting.py [--words 1000 10000 100000] [--batch 10]
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from dianna.visualization.text import _create_html
+from dianna.visualization.text import _highlight_word
+from dianna.visualization.text import highlight_texts
+
+
+# the previous implementation is quadratic in the length of the text, so it is skipped for long texts
+MAX_WORDS_PREVIOUS = 10000
+
+
+def get_text(n_words, seed=0):
+    """Returns a random text and an explanation that highlights every word."""
+    rng = np.random.default_rng(seed)
+    vocabulary = ['the', 'quick', 'brown', 'fox', 'jumps', 'over', 'lazy', 'dog', 'and', 'runs', 'away']
+    words = rng.choice(vocabulary, n_words)
+    text = ' '.join(words) + '.'
+    starts = np.concatenate([[0], np.cumsum([len(word) + 1 for word in words[:-1]])])
+    importances = rng.normal(size=n_words)
+    return text, [(str(word), int(start), float(importance))
+                  for word, start, importance in zip(words, starts, importances)]
+
+
+def create_html_previous(original_text, explanation, max_opacity):
+    """The previous implementation, which replaces the words in the text one by one."""
+    max_importance = max(abs(item[2]) for item in explanation)
+    body = original_text
+    words_in_reverse_order = sorted(explanation, key=lambda item: item[1], reverse=True)
+    for word, word_start, importance in words_in_reverse_order:
+        word_end = word_start + len(word)
+        highlighted_word = _highlight_word(word, importance, max_importance, max_opacity)
+        body = body[:word_start] + highlighted_word + body[word_end:]
+    return '<html><body>' + body + '</body></html>'
+
+
+def measure(function):
+    """Returns the run time of a function in seconds."""
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    """Runs the benchmark and prints the run times per text length."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, nargs='+', default=[1000, 10000, 100000, 1000000],
+                        help='Number of words of the texts (default: 1000 10000 100000 1000000)')
+    parser.add_argument('--batch', type=int, default=10, help='Number of texts highlighted in a batch (default: 10)')
+    args = parser.parse_args(argv)
+
+    print(f'{"words":>10} {"previous (s)":>14} {"in memory (s)":>14} {"to file (s)":>12} '
+          f'{"batch of " + str(args.batch) + " (s)":>16}')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n_words in args.words:
+            text, explanation = get_text(n_words)
+            previous = f'{measure(lambda: create_html_previous(text, explanation, .8)):.3f}' \
+                if n_words <= MAX_WORDS_PREVIOUS else '-'
+            in_memory = measure(lambda: _create_html(text, explanation, .8))
+            filenames = [os.path.join(tmpdir, f'{i}.html') for i in range(args.batch)]
+            to_file = measure(lambda: highlight_texts([explanation], [text], filenames[:1]))
+            batch = measure(lambda: highlight_texts([explanation] * args.batch, [text] * args.batch, filenames))
+            print(f'{n_words:>10} {previous:>14} {in_memory:>14.3f} {to_file:>12.3f} {batch:>16.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -20,7 +20,8 @@ import os
 import base64
 import layouts
 import utilities
-from utilities import MovieReviewsModelRunner, _create_html
+from utilities import MovieReviewsModelRunner
+from dianna.visualization import highlight_texts
 import numpy as np
 import warnings
 warnings.filterwarnings('ignore')  # disable warnings relateds to versions of tf
@@ -156,6 +157,7 @@ def global_store_i(method_sel, model_path, image_test):
         relevances = dianna.explain_image(
             model_path, image_test,
             method=method_sel, nsamples=1000,
+            labels=list(range(2)),
             background=0, n_segments=200, sigma=0,
             axis_labels=('height', 'width', 'channels'))
 
@@ -459,7 +461,7 @@ def update_multi_options_t(fn_m, input_text, sel_methods, new_model, new_text):
                     relevances_lime = global_store_t(
                         m, model_runner, input_text)
 
-                    output = _create_html(input_text, relevances_lime[0], max_opacity=0.8)
+                    output = highlight_texts([relevances_lime[0]], [input_text], max_opacity=0.8)[0]
                     hti = Html2Image()
                     expl_path = 'text_expl.jpg'
 
@@ -489,7 +491,7 @@ def update_multi_options_t(fn_m, input_text, sel_methods, new_model, new_text):
                     relevances_rise = global_store_t(
                         m, model_runner, input_text)
 
-                    output = _create_html(input_text, relevances_rise[0], max_opacity=0.8)
+                    output = highlight_texts([relevances_rise[0]], [input_text], max_opacity=0.8)[0]
                     hti = Html2Image()
                     expl_path = 'text_expl.jpg'
 
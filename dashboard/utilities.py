@@ -3,9 +3,6 @@ import numpy as np
 from PIL import Image, ImageStat
 from dianna import utils
 from torchtext.data import get_tokenizer
-from torchtext.vocab import Vectors
-from scipy.special import expit as sigmoid
-import os
 
 # colors
 colors = {
@@ -19,40 +16,14 @@ colors = {
 }
 
 
-class MovieReviewsModelRunner:
+class MovieReviewsModelRunner(utils.TextModelRunner):
     """Creates runner for movie review model."""
     def __init__(self, model, word_vectors, max_filter_size):
         """Initializes the class."""
-        self.run_model = utils.get_function(model)
-        self.vocab = Vectors(word_vectors, cache=os.path.dirname(word_vectors))
-        self.max_filter_size = max_filter_size
-        self.tokenizer = get_tokenizer('spacy', 'en_core_web_sm')
-
-    def __call__(self, sentences):
-        # ensure the input has a batch axis
-        if isinstance(sentences, str):
-            sentences = [sentences]
-
-        tokenized_sentences = []
-        for sentence in sentences:
-            # tokenize and pad to minimum length
-            tokens = self.tokenizer(sentence)
-            if len(tokens) < self.max_filter_size:
-                tokens += ['<pad>'] * (self.max_filter_size - len(tokens))
-
-            # numericalize the tokens
-            tokens_numerical = [self.vocab.stoi[token] if token in self.vocab.stoi else self.vocab.stoi['<unk>']
-                                for token in tokens]
-            tokenized_sentences.append(tokens_numerical)
-
-        # run the model, applying a sigmoid because the model outputs logits
-        logits = self.run_model(tokenized_sentences)
-        pred = np.apply_along_axis(sigmoid, 1, logits)
-
-        # output two classes
-        positivity = pred[:, 0]
-        negativity = 1 - positivity
-        return np.transpose([negativity, positivity])
+        # the model outputs the logit of the review being positive
+        super().__init__(model, utils.load_vocabulary(word_vectors),
+                         get_tokenizer('spacy', 'en_core_web_sm'), min_length=max_filter_size,
+                         activation='sigmoid', binary=True)
 
 
 def blank_fig(text=None):
@@ -116,26 +87,3 @@ def fill_segmentation(values, segmentation):
 def preprocess_function(image):
     """For LIME: we divided the input data by 256 for the model (binary mnist) and LIME needs RGB values."""
     return (image / 256).astype(np.float32)
-
-
-def _create_html(original_text, explanation, max_opacity):
-    """Creates text explaination map using html format."""
-    max_importance = max(abs(item[2]) for item in explanation)
-    body = original_text
-    words_in_reverse_order = sorted(explanation, key=lambda item: item[1], reverse=True)
-    for word, word_start, importance in words_in_reverse_order:
-        word_end = word_start + len(word)
-        highlighted_word = _highlight_word(word, importance, max_importance, max_opacity)
-        body = body[:word_start] + highlighted_word + body[word_end:]
-    return '<html><body>' + body + '</body></html>'
-
-
-def _highlight_word(word, importance, max_importance, max_opacity):
-    """Defines how to highlight words according to importance."""
-    opacity = max_opacity * abs(importance) / max_importance
-    if importance > 0:
-        color = f'rgba(255, 0, 0, {opacity:.2f})'
-    else:
-        color = f'rgba(0, 0, 255, {opacity:2f})'
-    highlighted_word = f'<span style="background:{color}">{word}</span>'
-    return highlighted_word
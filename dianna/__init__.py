@@ -21,12 +21,15 @@ become a source of (scientific) insights.
 
 See https://github.com/dianna-ai/dianna
 """
+import asyncio
+import functools
 import importlib
 import logging
 from . import utils
 
 
-logging.getLogger(__name__).addHandler(logging.NullHandler())
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 __author__ = "DIANNA Team"
 __email__ = "dianna-ai@esciencecenter.nl"
@@ -37,11 +40,14 @@ def explain_image(model_or_function, input_data, method, labels=(1,), **kwargs):
     """
     Explain an image (input_data) given a model and a chosen method.
 
+    The number of samples the model was run on, which a time budget may reduce, is logged
+    to the dianna logger at level INFO.
+
     Args:
         model_or_function (callable or str): The function that runs the model to be explained _or_
                                              the path to a ONNX model on disk.
         input_data (np.ndarray): Image data to be explained
-        method (string): One of the supported methods: RISE, LIME or KernelSHAP
+        method (string): One of the supported methods: RISE, LIME, KernelSHAP or Occlusion
         labels (tuple): Labels to be explained
 
     Returns:
@@ -52,14 +58,35 @@ def explain_image(model_or_function, input_data, method, labels=(1,), **kwargs):
         # To avoid Access Violation on Windows with SHAP:
         from onnx_tf.backend import prepare  # pylint: disable=import-outside-toplevel,unused-import
     explainer = _get_explainer(method, kwargs)
-    explain_image_kwargs = utils.get_kwargs_applicable_to_function(explainer.explain_image, kwargs)
-    return explainer.explain_image(model_or_function, input_data, labels, **explain_image_kwargs)
+    explain_image_kwargs = _get_explain_kwargs(explainer, explainer.explain_image, kwargs)
+    result = explainer.explain_image(model_or_function, input_data, labels, **explain_image_kwargs)
+    _log_sample_count(method, explainer)
+    return result
+
+
+async def explain_image_async(model_or_function, input_data, method, labels=(1,), **kwargs):
+    """
+    Explain an image (input_data) given a model and a chosen method, without blocking the event loop.
+
+    The explanation is run in the default executor of the running asyncio event loop.
+    See explain_image for the arguments.
+
+    Returns:
+        One heatmap (2D array) per class.
+
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(explain_image, model_or_function, input_data,
+                                                              method, labels=labels, **kwargs))
 
 
 def explain_text(model_or_function, input_data, method, labels=(1,), **kwargs):
     """
     Explain text (input_data) given a model and a chosen method.
 
+    The number of samples the model was run on, which a time budget may reduce, is logged
+    to the dianna logger at level INFO.
+
     Args:
         model_or_function (callable or str): The function that runs the model to be explained _or_
                                              the path to a ONNX model on disk.
@@ -72,8 +99,100 @@ def explain_text(model_or_function, input_data, method, labels=(1,), **kwargs):
 
     """
     explainer = _get_explainer(method, kwargs)
-    explain_text_kwargs = utils.get_kwargs_applicable_to_function(explainer.explain_text, kwargs)
-    return explainer.explain_text(model_or_function, input_data, labels, **explain_text_kwargs)
+    explain_text_kwargs = _get_explain_kwargs(explainer, explainer.explain_text, kwargs)
+    result = explainer.explain_text(model_or_function, input_data, labels, **explain_text_kwargs)
+    _log_sample_count(method, explainer)
+    return result
+
+
+def explain_image_sequence(model_or_function, input_data, method, labels=(1,), **kwargs):
+    """
+    Explain a sequence of images (input_data), such as the frames of a video, given a model and a chosen method.
+
+    Args:
+        model_or_function (callable or str): The function that runs the model to be explained _or_
+                                             the path to a ONNX model on disk.
+        input_data (np.ndarray): Images to be explained, with the frames along the first axis
+        method (string): One of the supported methods: RISE
+        labels (tuple): Labels to be explained
+
+    Returns:
+        One heatmap (2D array) per class, for each frame.
+
+    """
+    explainer = _get_explainer(method, kwargs)
+    explain_sequence_kwargs = _get_explain_kwargs(explainer, explainer.explain_image_sequence, kwargs)
+    result = explainer.explain_image_sequence(model_or_function, input_data, labels, **explain_sequence_kwargs)
+    _log_sample_count(method, explainer)
+    return result
+
+
+def explain_timeseries(model_or_function, input_data, method, labels=(1,), **kwargs):
+    """
+    Explain a time series (input_data) given a model and a chosen method.
+
+    Args:
+        model_or_function (callable or str): The function that runs the model to be explained _or_
+                                             the path to a ONNX model on disk.
+        input_data (np.ndarray): Time series to be explained
+        method (string): One of the supported methods: RISE
+        labels (tuple): Labels to be explained
+
+    Returns:
+        One heatmap (1D array, or 2D array of time and channels) per class.
+
+    """
+    explainer = _get_explainer(method, kwargs)
+    explain_timeseries_kwargs = _get_explain_kwargs(explainer, explainer.explain_timeseries, kwargs)
+    result = explainer.explain_timeseries(model_or_function, input_data, labels, **explain_timeseries_kwargs)
+    _log_sample_count(method, explainer)
+    return result
+
+
+def explain_image_ensemble(models, input_data, method, labels=(1,), parallel=False, **kwargs):
+    """
+    Explain an image (input_data) for several models, using the same perturbations for all models.
+
+    Each perturbed batch is created once and given to every model, so the explanations of the models
+    are cheaper than separate explanations and are directly comparable, as they share the same noise.
+
+    Args:
+        models (list): Functions that run a model _or_ paths to ONNX models on disk
+        input_data (np.ndarray): Image data to be explained
+        method (string): One of the supported methods: RISE or LIME
+        labels (tuple): Labels to be explained, for each model
+        parallel (bool): Whether to run the models in parallel threads
+
+    Returns:
+        For each model, one heatmap (2D array) per label.
+
+    """
+    with _get_ensemble(models, method, labels, parallel, kwargs) as ensemble:
+        return ensemble.split(explain_image(ensemble, input_data, method, labels=tuple(range(ensemble.n_outputs)),
+                                            **kwargs))
+
+
+def explain_text_ensemble(models, input_data, method, labels=(1,), parallel=False, **kwargs):
+    """
+    Explain text (input_data) for several models, using the same perturbations for all models.
+
+    See explain_image_ensemble. The text is tokenized with the tokenizer of the first model.
+
+    Returns:
+        For each model, a list of (word, index of word in raw text, importance for target class) tuples per label.
+
+    """
+    with _get_ensemble(models, method, labels, parallel, kwargs) as ensemble:
+        return ensemble.split(explain_text(ensemble, input_data, method, labels=tuple(range(ensemble.n_outputs)),
+                                           **kwargs))
+
+
+def _get_ensemble(models, method, labels, parallel, kwargs):  # pylint: disable=too-many-arguments
+    if method == "KernelSHAP":
+        raise ValueError("KernelSHAP loads the ONNX model itself and cannot explain an ensemble of models")
+    if 'top_k' in kwargs or 'top_labels' in kwargs:
+        raise ValueError("The labels of an ensemble explanation must be given explicitly")
+    return utils.ModelEnsemble(models, labels, runner_options=kwargs.get('runner_options'), parallel=parallel)
 
 
 def _get_explainer(method, kwargs):
@@ -81,3 +200,31 @@ def _get_explainer(method, kwargs):
     method_class = getattr(method_submodule, method)
     method_kwargs = utils.get_kwargs_applicable_to_function(method_class.__init__, kwargs)
     return method_class(**method_kwargs)
+
+
+def _log_sample_count(method, explainer):
+    """Logs the number of samples the model was run on, which a time budget may have reduced.
+
+    RISE stores the count in n_evaluated_masks, LIME and KernelSHAP in n_evaluated_samples.
+    """
+    n_samples = getattr(explainer, 'n_evaluated_masks', None)
+    if n_samples is None:
+        n_samples = getattr(explainer, 'n_evaluated_samples', None)
+    if n_samples is not None:
+        logger.info('%s explanation is based on %d samples', method, n_samples, extra={'n_samples': int(n_samples)})
+
+
+def _get_explain_kwargs(explainer, explain_function, kwargs):
+    """Returns the keyword arguments for the explain method, those not used by the explainer initializer.
+
+    A warning is given for keyword arguments that neither the initializer nor the explain method accepts,
+    so a misspelled or unsupported option is not silently ignored. Explain methods that accept **kwargs
+    check the keyword arguments they pass on themselves.
+    """
+    init_kwargs = utils.get_kwargs_applicable_to_function(type(explainer).__init__, kwargs)
+    explain_kwargs = utils.get_kwargs_applicable_to_function(explain_function, kwargs)
+    if utils.accepts_var_keyword(explain_function):
+        return {**{key: value for key, value in kwargs.items() if key not in init_kwargs}, **explain_kwargs}
+    utils.warn_inapplicable_kwargs(kwargs, type(explainer).__init__, explain_function,
+                                   name=f'{type(explainer).__name__}.{explain_function.__name__}')
+    return explain_kwargs
@@ -0,0 +1,285 @@
+"""Command line interface to explain many inputs with a single command.
+
+Example:
+    dianna explain --model model.onnx --method RISE --inputs images/ --out results/ --workers 4
+"""
+import argparse
+import ast
+import json
+import logging
+import multiprocessing
+import os
+import time
+from pathlib import Path
+import numpy as np
+
+
+IMAGE_EXTENSIONS = ('.npy', '.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+TEXT_EXTENSIONS = ('.txt', )
+TEXT_RESULTS_FILENAME = 'text_results.jsonl'
+# explainers whose saliency maps are constant per segment, which are stored per segment
+SEGMENT_METHODS = ('kernelshap', 'lime')
+
+# state of a worker process, set by _init_worker so the model stays loaded between inputs
+_worker = {}
+
+
+def main(argv=None):
+    """Runs the dianna command line interface."""
+    args = _get_parser().parse_args(argv)
+    return args.func(args)
+
+
+def _get_parser():
+    parser = argparse.ArgumentParser(prog='dianna', description='Deep Insight And Neural Network Analysis')
+    subparsers = parser.add_subparsers(required=True)
+
+    explain = subparsers.add_parser('explain', help='Explain the predictions of a model for a set of inputs',
+                                    description='Explain the predictions of a model for each image in a '
+                                                'directory tree or each line in a text file. The saliency maps '
+                                                'of images are written to a results store in <out>, which can '
+                                                'be read with dianna.utils.ResultsReader, under the path of '
+                                                'each image relative to the input directory. The explanations '
+                                                f'of text lines are written to <out>/{TEXT_RESULTS_FILENAME}. '
+                                                'Inputs with an existing result are skipped, so an interrupted '
+                                                'run can be resumed by running the same command.')
+    explain.add_argument('--model', required=True, help='Path to the ONNX model')
+    explain.add_argument('--method', required=True, help='Explainer method, e.g. RISE, LIME, KernelSHAP or Occlusion')
+    explain.add_argument('--inputs', required=True,
+                         help='Directory with images (.npy or image files) or text file with one input per line')
+    explain.add_argument('--out', required=True, help='Output directory')
+    explain.add_argument('--vocab', default=None,
+                         help='Word vector file with the vocabulary of a text model, required for text inputs')
+    explain.add_argument('--tokenizer', default='whitespace',
+                         help='Tokenizer of a text model: whitespace, or the name of a torchtext tokenizer, '
+                              'optionally followed by its language, e.g. spacy:en_core_web_sm (default: whitespace)')
+    explain.add_argument('--min-length', type=int, default=0,
+                         help='Minimum number of tokens of the input of a text model, shorter texts are padded '
+                              '(default: 0)')
+    explain.add_argument('--activation', choices=('sigmoid', 'softmax'), default=None,
+                         help='Activation applied to the output of a text model (default: none)')
+    explain.add_argument('--chunk-size', type=int, default=256,
+                         help='Number of image results per chunk of the results store (default: 256)')
+    explain.add_argument('--flush-interval', type=float, default=60,
+                         help='Seconds after which image results are written to disk, even if their chunk is not '
+                              'full, so an interrupted run keeps them. 0 writes every result at once (default: 60)')
+    explain.add_argument('--labels', type=int, nargs='+', default=[1], help='Labels to explain (default: 1)')
+    explain.add_argument('--axis-labels', default=None,
+                         help='Comma-separated name of each axis of the images (default: channels last)')
+    explain.add_argument('--workers', type=int, default=1, help='Number of worker processes (default: 1)')
+    explain.add_argument('--threads', type=int, default=None,
+                         help='Number of ONNX Runtime threads per worker (default: number of CPUs / workers). '
+                              'Not supported by KernelSHAP, which does not run the model with ONNX Runtime.')
+    explain.add_argument('--param', action='append', default=[], metavar='KEY=VALUE',
+                         help='Keyword argument for the explainer, e.g. --param n_masks=2000. Can be repeated.')
+    explain.set_defaults(func=_explain)
+    return parser
+
+
+def _explain(args):
+    """Runs the explain command."""
+    kwargs = _parse_params(args.param)
+    if args.axis_labels is not None:
+        kwargs['axis_labels'] = args.axis_labels.split(',')
+    inputs_path = Path(args.inputs)
+    inputs = _list_inputs(inputs_path)
+    is_text = not inputs_path.is_dir()
+    if is_text and args.vocab is None:
+        raise SystemExit('Text inputs require the vocabulary of the model, given with --vocab')
+    if args.method.lower() == 'kernelshap' and args.threads is not None:
+        raise SystemExit('KernelSHAP runs the model with onnx-tf instead of ONNX Runtime, so --threads cannot be used')
+    threads = args.threads if args.threads is not None else max(1, (os.cpu_count() or 1) // args.workers)
+    config = {'model': args.model,
+              'method': args.method,
+              'labels': tuple(args.labels),
+              'kwargs': kwargs,
+              'runner_options': {'intra_op_num_threads': threads, 'inter_op_num_threads': 1},
+              'text': {'vocab': args.vocab, 'tokenizer': args.tokenizer, 'min_length': args.min_length,
+                       'activation': args.activation} if is_text else None}
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    if is_text:
+        writer = _TextResultsWriter(out / TEXT_RESULTS_FILENAME)
+    else:
+        # import here because importing dianna is slow
+        from dianna import utils  # pylint: disable=import-outside-toplevel
+        encoding = 'segments' if args.method.lower() in SEGMENT_METHODS else 'dense'
+        writer = utils.ResultsWriter(out, method=args.method, params=kwargs, model=args.model, encoding=encoding,
+                                     chunk_size=args.chunk_size)
+    with writer:
+        inputs = [(name, source) for name, source in inputs if name not in writer]
+        print(f'Explaining {len(inputs)} inputs, results are written to {out}')
+        if args.workers == 1:
+            _init_worker(config)
+            _write_results(map(_explain_input, inputs), writer, len(inputs), args.flush_interval)
+        else:
+            with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(config,)) as pool:
+                _write_results(pool.imap_unordered(_explain_input, inputs), writer, len(inputs),
+                               args.flush_interval)
+    return 0
+
+
+def _parse_params(params):
+    """Parses KEY=VALUE strings, where the value is a python literal or else a string."""
+    kwargs = {}
+    for param in params:
+        key, sep, value = param.partition('=')
+        if not sep:
+            raise SystemExit(f'Invalid parameter {param}, expected KEY=VALUE')
+        try:
+            kwargs[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            kwargs[key] = value
+    return kwargs
+
+
+def _list_inputs(path):
+    """Lists (name, source) of all inputs. The source is a file path for images or the text itself for text.
+
+    The name of an image is its path relative to the input directory, so images with the same file name in
+    different subdirectories are kept apart.
+    """
+    if path.is_dir():
+        return [(file.relative_to(path).as_posix(), file) for file in sorted(path.rglob('*'))
+                if file.is_file() and file.suffix.lower() in IMAGE_EXTENSIONS]
+    if path.suffix.lower() in TEXT_EXTENSIONS:
+        with open(path, encoding='utf-8') as text_file:
+            lines = [line.rstrip('\n') for line in text_file]
+        return [(f'line_{i:08d}', line) for i, line in enumerate(lines) if line.strip()]
+    raise SystemExit(f'Inputs must be a directory with images or a text file, got: {path}')
+
+
+def _load_image(path):
+    if path.suffix.lower() == '.npy':
+        return np.load(path)
+    # import here because it is only needed for image files
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+    image = np.asarray(Image.open(path)).astype(np.float32)
+    # always provide a channel axis
+    return image[..., np.newaxis] if image.ndim == 2 else image
+
+
+def _init_worker(config):
+    """Loads the model once per worker process."""
+    # imports are done here because they are slow
+    import dianna  # pylint: disable=import-outside-toplevel
+    from dianna import utils  # pylint: disable=import-outside-toplevel
+    _worker['dianna'] = dianna
+    _worker['config'] = config
+    # the dispatcher logs the number of samples of each explanation, which is reported with the result
+    if 'samples' in _worker:
+        dianna.logger.removeHandler(_worker['samples'])
+    _worker['samples'] = _SampleCountHandler()
+    dianna.logger.addHandler(_worker['samples'])
+    dianna.logger.setLevel(logging.INFO)
+    if config['text'] is not None:
+        text = config['text']
+        _worker['model'] = utils.TextModelRunner(config['model'], utils.load_vocabulary(text['vocab']),
+                                                 _get_tokenizer(text['tokenizer']), min_length=text['min_length'],
+                                                 activation=text['activation'],
+                                                 runner_options=config['runner_options'])
+    elif config['method'].lower() == 'kernelshap':
+        # KernelSHAP loads the model itself
+        _worker['model'] = config['model']
+    else:
+        _worker['model'] = utils.get_function(config['model'], runner_options=config['runner_options'])
+
+
+def _get_tokenizer(name):
+    """Returns the tokenizer of a text model, given as whitespace or as torchtext tokenizer[:language]."""
+    if name == 'whitespace':
+        return str.split
+    # import here because torchtext is only needed for these tokenizers
+    from torchtext.data import get_tokenizer  # pylint: disable=import-outside-toplevel
+    tokenizer, _, language = name.partition(':')
+    return get_tokenizer(tokenizer, language or 'en')
+
+
+def _explain_input(name_and_source):
+    """Explains a single input in a worker process."""
+    name, source = name_and_source
+    dianna, config = _worker['dianna'], _worker['config']
+    _worker['samples'].n_samples = None
+    kwargs = dict(config['kwargs'])
+    if isinstance(source, Path):
+        kwargs.setdefault('axis_labels', {-1: 'channels'})
+        result = dianna.explain_image(_worker['model'], _load_image(source), config['method'],
+                                      labels=config['labels'], **kwargs)
+    else:
+        result = dianna.explain_text(_worker['model'], source, config['method'], labels=config['labels'],
+                                     **kwargs)
+    return name, result, _worker['samples'].n_samples
+
+
+def _write_results(results, writer, n_inputs, flush_interval):
+    """Writes each result as soon as it is available, flushing the writer at least every flush_interval seconds."""
+    last_flush = time.monotonic()
+    for i, (name, result, n_samples) in enumerate(results, start=1):
+        writer.write(name, result)
+        if time.monotonic() - last_flush >= flush_interval:
+            writer.flush()
+            last_flush = time.monotonic()
+        print(f'[{i}/{n_inputs}] {name}' + ('' if n_samples is None else f' ({n_samples} samples)'))
+
+
+class _SampleCountHandler(logging.Handler):
+    """Keeps the number of samples that the dispatcher logs for the last explanation of a worker."""
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.n_samples = None
+
+    def emit(self, record):
+        self.n_samples = getattr(record, 'n_samples', self.n_samples)
+
+
+class _TextResultsWriter:
+    """Appends text explanations to a JSON lines file, one line with the name and explanation per input.
+
+    The explanation of a text is a list of (word, index, importance) per label, whose length differs between
+    texts, so it is not written to a results store. Each line is flushed when it is written, so an interrupted
+    run keeps all finished results.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._names = set()
+        self._ends_with_newline = True
+        if path.exists():
+            with open(path, encoding='utf-8') as results_file:
+                for line in results_file:
+                    self._ends_with_newline = line.endswith('\n')
+                    try:
+                        self._names.add(json.loads(line)['name'])
+                    except json.JSONDecodeError:
+                        # a line cut off by an interruption is not a result
+                        continue
+        self._file = None
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def write(self, name, result):
+        """Appends the explanation of a text."""
+        explanation = [[[str(word), int(index), float(importance)] for word, index, importance in label_result]
+                       for label_result in result]
+        self._file.write(json.dumps({'name': name, 'explanation': explanation}) + '\n')
+        self.flush()
+        self._names.add(name)
+
+    def flush(self):
+        """Writes the appended lines to disk."""
+        self._file.flush()
+
+    def __enter__(self):
+        self._file = open(self.path, 'a', encoding='utf-8')  # pylint: disable=consider-using-with
+        if not self._ends_with_newline:
+            # start after the line that was cut off
+            self._file.write('\n')
+        return self
+
+    def __exit__(self, *args):
+        self._file.close()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
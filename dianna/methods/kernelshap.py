@@ -21,6 +21,8 @@ class KernelSHAP:
         """
         self.preprocess_function = preprocess_function
         self.axis_labels = axis_labels if axis_labels is not None else []
+        self.explained_labels = None
+        self.n_evaluated_samples = None
         # import here because it's slow
         from onnx_tf.backend import prepare  # pylint: disable=import-outside-toplevel
         self.onnx_to_tf = prepare
@@ -70,8 +72,14 @@ class KernelSHAP:
         n_segments=100,
         compactness=10.0,
         sigma=0,
+        batch_size=None,
+        prefetch=0,
+        time_budget=None,
+        max_memory=None,
+        checkpoint=None,
+        top_k=None,
         **kwargs,
-    ):  # pylint: disable=too-many-arguments
+    ):  # pylint: disable=too-many-arguments,too-many-locals
         """Run the KernelSHAP explainer.
 
         The model will be called with the function of image segmentation.
@@ -86,7 +94,9 @@ class KernelSHAP:
                                      example. The input dimension must be
                                      [batch, height, width, color_channels] or
                                      [batch, color_channels, height, width] (see axis_labels)
-            labels (tuple): Indices of classes to be explained
+            labels (tuple): Indices of classes to be explained. If None, all classes are explained. The SHAP
+                            values of all classes are computed from the same model evaluations, so the cost
+                            does not depend on the labels.
             nsamples ("auto" or int): Number of times to re-evaluate the model when
                                       explaining each prediction. More samples lead
                                       to lower variance estimates of the SHAP values.
@@ -99,6 +109,16 @@ class KernelSHAP:
                                square/cubic.
             sigma (float): Width of Gaussian smoothing kernel for pre-processing for
                            each dimension of the image. Zero means no smoothing.
+            batch_size (int or "auto", optional): Batch size to use for running the model, "auto" to tune it.
+                                                  By default, all samples are given to the model at once.
+            prefetch (int): Number of batches to prepare in a background thread while the model is running
+            time_budget (float, optional): Maximum time in seconds to spend, see utils.TimeBudget.
+                                           The number of samples used is stored in n_evaluated_samples.
+            max_memory (int or str, optional): Memory budget, e.g. '2GB', see utils.MemoryBudget
+            checkpoint (str, Path or utils.Checkpoint, optional): File to resume from, see utils.Checkpoint
+            top_k (int, optional): If given, explain the top_k labels with the highest prediction for the
+                                   unmasked image instead of the given labels, from highest to lowest.
+                                   The explained labels are stored in the explained_labels attribute.
 
         Other keyword arguments: see the documentation of kernel explainer of SHAP
                                  (also in function "shap_values") via:
@@ -107,11 +127,20 @@ class KernelSHAP:
         https://scikit-image.org/docs/dev/api/skimage.segmentation.html#skimage.segmentation.slic
 
         Returns:
-            Explanation heatmap of shapley values for each class (np.ndarray).
+            Shapley values of the segments for each explained label (list of np.ndarray with shape
+            (1, n_segments)), and the segmentation of the image. Earlier versions returned the values of all
+            classes regardless of labels, which labels=None still gives.
         """
+        utils.warn_inapplicable_kwargs(kwargs, skimage.segmentation.slic, name='KernelSHAP.explain_image')
+        budget = utils.TimeBudget(time_budget)
+        checkpoint = utils.get_checkpoint(checkpoint)
+        if checkpoint is not None:
+            checkpoint.check_fixed_parameters(top_k=top_k is not None, batch_size=batch_size == 'auto',
+                                              time_budget=time_budget is not None)
         self.onnx_model, self.input_node_dtype,\
             self.output_node = utils.onnx_model_node_loader(model)
-        self.labels = labels
+        # prepare the TensorFlow backend once, it is reused for every batch
+        self.tf_model = self.onnx_to_tf(self.onnx_model)
         self.input_data = self._prepare_image_data(input_data)
         self.background = background
 
@@ -128,18 +157,54 @@ class KernelSHAP:
             **slic_kwargs
         )
 
-        # call the Kernel SHAP explainer
+        self._model = self._run_model
+        # while tuning the batch size, the runner is called without splitting the input into batches
+        self.batch_size = None
+        self.prefetch = prefetch
+        max_batch_size = self._plan_image_memory(utils.MemoryBudget(max_memory))
+        self.batch_size = utils.get_batch_size(batch_size, self._runner, lambda n: np.ones((n, n_segments)),
+                                               model_or_function=model, input_shape=self.input_data.shape,
+                                               max_batch_size=max_batch_size, time_budget=budget)
+        if max_batch_size is not None:
+            self.batch_size = max_batch_size if self.batch_size is None else min(self.batch_size, max_batch_size)
+        if time_budget is not None:
+            max_nsamples = 2 * n_segments + 2048 if nsamples == "auto" else nsamples
+            seconds_per_sample = utils.measure_seconds_per_sample(
+                self._runner, np.ones((min(10, max_nsamples), n_segments)))
+            nsamples = budget.plan_samples(seconds_per_sample, max_nsamples)
+
+        if top_k is not None:
+            # the labels with the highest prediction for the unmasked image, which has all segments present
+            prediction = np.asarray(self._runner(np.ones((1, n_segments))))[0]
+            self.explained_labels = tuple(int(label) for label in np.argsort(prediction)[::-1][:top_k])
+
+        if checkpoint is not None:
+            # SHAP samples the same coalitions as the interrupted run from the same random state
+            checkpoint.restore_random_state(np.random)
+            self._model = checkpoint.wrap(self._run_model)
+
+        # call the Kernel SHAP explainer, with all segments masked as background. SHAP values are computed
+        # for all outputs of the model at once, so each coalition is evaluated once regardless of the labels
         explainer = shap.KernelExplainer(
-            self._runner, np.zeros((len(self.labels), n_segments)))
+            self._runner, np.zeros((1, n_segments)))
 
         with warnings.catch_warnings():
             # avoid warnings due to version conflicts
             warnings.simplefilter("ignore")
             shap_values = explainer.shap_values(
-                np.ones((len(self.labels), n_segments)), nsamples=nsamples
+                np.ones((1, n_segments)), nsamples=nsamples
             )
 
-        return shap_values, self.image_segments
+        # SHAP resolves nsamples="auto" to the number of coalitions it evaluated
+        self.n_evaluated_samples = explainer.nsamples
+        if checkpoint is not None:
+            checkpoint.remove()
+        # recent versions of SHAP return a single array with the outputs along the last axis
+        if isinstance(shap_values, np.ndarray) and shap_values.ndim == 3:
+            shap_values = list(np.moveaxis(shap_values, -1, 0))
+        if top_k is None:
+            self.explained_labels = tuple(range(len(shap_values))) if labels is None else tuple(labels)
+        return [shap_values[label] for label in self.explained_labels], self.image_segments
 
     def _prepare_image_data(self, input_data):
         """Transforms the data to be of the shape and type KernelSHAP expects.
@@ -149,14 +214,25 @@ class KernelSHAP:
         Returns:
             transformed input data
         """
-        input_data = utils.to_xarray(
+        axis_labels = utils.get_axis_labels(
             input_data, self.axis_labels, KernelSHAP.required_labels)
         # ensure channels axis is last and keep track of where it was so we can move it back
-        self.channels_axis_index = input_data.dims.index('channels')
-        input_data = utils.move_axis(input_data, 'channels', -1)
+        self.channels_axis_index = axis_labels.index('channels')
+        input_data = np.moveaxis(np.asarray(input_data), self.channels_axis_index, -1)
 
         return input_data
 
+    def _plan_image_memory(self, memory):
+        """Determines the largest batch size that fits in the memory budget, None if there is no limit."""
+        if memory.max_memory is None:
+            return None
+        # the input image and its segmentation
+        memory.reserve(self.input_data.nbytes + self.image_segments.nbytes, 'The input data')
+        # a batch of masked images, and the copy of it the user's preprocessing may make
+        n_copies = 1 if self.preprocess_function is None else 2
+        sample_bytes = self.input_data.size * np.dtype(self.input_node_dtype.as_numpy_dtype).itemsize
+        return memory.chunk_size(n_copies * sample_bytes, description='A single masked image')
+
     def _mask_image(
         self, features, segmentation, image, background=None,
         channels_axis_index=2, datatype=np.float32
@@ -177,22 +253,22 @@ class KernelSHAP:
         if background is None:
             background = image.mean(axis=(0, 1))
 
-        # Create an empty 4D array
-        out = np.zeros(
-            (features.shape[0], image.shape[0], image.shape[1], image.shape[2])
-        )
+        # the output shape should satisfy the requirement from onnx model input shape,
+        # so the masked images are written directly in that layout and datatype
+        if channels_axis_index != 2:
+            out = np.empty((features.shape[0], image.shape[2], image.shape[0], image.shape[1]), dtype=datatype)
+            out_channels_last = np.moveaxis(out, 1, -1)
+        else:
+            out = np.empty((features.shape[0], ) + image.shape, dtype=datatype)
+            out_channels_last = out
 
         for i in range(features.shape[0]):
-            out[i] = image
+            out_channels_last[i] = image
             for j in range(features.shape[1]):
                 if features[i, j] == 0:
-                    out[i][segmentation == j, :] = background
+                    out_channels_last[i][segmentation == j, :] = background
 
-        # the output shape should satisfy the requirement from onnx model input shape
-        if channels_axis_index != 2:
-            out = np.transpose(out, (0, 3, 1, 2))
-
-        return out.astype(datatype)
+        return out
 
     def _runner(self, features):
         """Define a runner/wrapper to load models and values.
@@ -201,6 +277,15 @@ class KernelSHAP:
             features (np.ndarray): A matrix of samples (# samples x # features)
                                    on which to explain the model's output.
         """
+        return utils.run_in_batches(self._model, features, self.batch_size,
+                                    preprocess_function=self._get_model_input, prefetch=self.prefetch)
+
+    def _get_model_input(self, features):
+        """Masks the image according to the features and converts it to the model's input.
+
+        Args:
+            features (np.ndarray): A matrix of samples (# samples x # features)
+        """
         model_input = self._mask_image(features,
                                        self.image_segments,
                                        self.input_data,
@@ -210,4 +295,8 @@ class KernelSHAP:
                                        )
         if self.preprocess_function is not None:
             model_input = self.preprocess_function(model_input)
-        return self.onnx_to_tf(self.onnx_model).run(model_input)[f"{self.output_node}"]
+        return model_input
+
+    def _run_model(self, model_input):
+        """Runs the model on a batch of (masked) input data."""
+        return self.tf_model.run(model_input)[f"{self.output_node}"]
@@ -1,4 +1,6 @@
+import warnings
 import numpy as np
+from lime.lime_image import ImageExplanation
 from lime.lime_image import LimeImageExplainer
 from lime.lime_text import LimeTextExplainer
 from dianna import utils
@@ -22,6 +24,7 @@ class LIME:
                  char_level=False,
                  axis_labels=None,
                  preprocess_function=None,
+                 runner_options=None,
                  ):  # pylint: disable=too-many-arguments
         """
         Initializes Lime explainer.
@@ -41,6 +44,8 @@ class LIME:
                                                If a list, the name of each axis where the index
                                                in the list is the axis index
             preprocess_function (callable, optional): Function to preprocess input data with
+            runner_options (dict, optional): ONNX Runtime session options, used if the model is given as a path.
+                                             See dianna.utils.onnx_runner.SimpleModelRunner for the options.
         """
         self.text_explainer = LimeTextExplainer(kernel_width,
                                                 kernel,
@@ -63,14 +68,21 @@ class LIME:
 
         self.preprocess_function = preprocess_function
         self.axis_labels = axis_labels if axis_labels is not None else []
+        self.runner_options = runner_options
+        self.n_evaluated_samples = None
+        self.explained_labels = None
 
     def explain_text(self,
                      model_or_function,
                      input_data,
                      labels=(0,),
-                     top_labels=None,
+                     top_k=None,
                      num_features=10,
                      num_samples=5000,
+                     batch_size=None,
+                     prefetch=0,
+                     time_budget=None,
+                     checkpoint=None,
                      **kwargs,
                      ):  # pylint: disable=too-many-arguments
         """
@@ -81,6 +93,16 @@ class LIME:
                                                  the path to a ONNX model on disk.
             input_data (np.ndarray): Data to be explained
             labels ([int], optional): Iterable of indices of class to be explained
+            top_k (int, optional): If given, explain the top_k labels with the highest prediction for the
+                                   unperturbed text instead of the given labels, from highest to lowest.
+                                   The explained labels are stored in the explained_labels attribute.
+                                   Replaces the deprecated top_labels argument.
+            batch_size (int or "auto", optional): Batch size to use for running the model, "auto" to tune it.
+                                                  By default, all samples are given to the model at once.
+            prefetch (int): Number of batches to prepare in a background thread while the model is running
+            time_budget (float, optional): Maximum time in seconds to spend, see utils.TimeBudget.
+                                           The number of samples used is stored in n_evaluated_samples.
+            checkpoint (str, Path or utils.Checkpoint, optional): File to resume from, see utils.Checkpoint
 
         Other keyword arguments: see the LIME documentation for LimeTextExplainer.explain_instance:
         https://lime-ml.readthedocs.io/en/latest/lime.html#lime.lime_text.LimeTextExplainer.explain_instance.
@@ -88,20 +110,64 @@ class LIME:
         Returns:
             list of (word, index of word in raw text, importance for target class) tuples
         """
-        runner = utils.get_function(model_or_function, preprocess_function=self.preprocess_function)
+        top_k = self._get_top_k(top_k, kwargs)
+        utils.warn_inapplicable_kwargs(kwargs, self.text_explainer.explain_instance, name='LIME.explain_text')
+        budget = utils.TimeBudget(time_budget)
+        checkpoint = utils.get_checkpoint(checkpoint)
+        if checkpoint is not None:
+            checkpoint.check_fixed_parameters(top_k=top_k is not None, batch_size=batch_size == 'auto',
+                                              time_budget=time_budget is not None)
+        runner = utils.get_function(model_or_function, preprocess_function=self.preprocess_function,
+                                    runner_options=self.runner_options)
+        batch_size = utils.get_batch_size(batch_size, runner, lambda n: [input_data] * n,
+                                          model_or_function=model_or_function, input_shape=(len(input_data),),
+                                          max_batch_size=num_samples, time_budget=budget)
+        num_samples = self._plan_num_samples(budget, runner, lambda n: [input_data] * n, num_samples, num_features)
+        model_runner = utils.get_function(model_or_function, runner_options=self.runner_options)
+        if checkpoint is not None:
+            # LIME generates the same perturbations as the interrupted run from the same random state
+            checkpoint.restore_random_state(np.random, self.text_explainer.random_state)
+            model_runner = checkpoint.wrap(model_runner)
+
+        def batched_runner(data):
+            # the user's preprocessing is done separately from running the model, so it can be prefetched
+            return utils.run_in_batches(model_runner, data, batch_size,
+                                        preprocess_function=self.preprocess_function, prefetch=prefetch)
+
         explain_instance_kwargs = utils.get_kwargs_applicable_to_function(self.text_explainer.explain_instance, kwargs)
         explanation = self.text_explainer.explain_instance(input_data,
-                                                           runner,
+                                                           batched_runner,
                                                            labels=labels,
-                                                           top_labels=top_labels,
+                                                           top_labels=top_k,
                                                            num_features=num_features,
                                                            num_samples=num_samples,
                                                            **explain_instance_kwargs
                                                            )
 
+        if checkpoint is not None:
+            checkpoint.remove()
+        self.explained_labels = self._get_explained_labels(explanation, labels, top_k)
         local_explanations = explanation.local_exp
         string_map = explanation.domain_mapper.indexed_string
-        return [self._get_results_for_single_label(local_explanations[label], string_map) for label in labels]
+        return [self._get_results_for_single_label(local_explanations[label], string_map)
+                for label in self.explained_labels]
+
+    @staticmethod
+    def _get_top_k(top_k, kwargs):
+        """Returns top_k, taking the deprecated top_labels keyword argument out of kwargs."""
+        if 'top_labels' not in kwargs:
+            return top_k
+        warnings.warn('The top_labels argument of LIME is deprecated, use top_k instead',
+                      DeprecationWarning, stacklevel=3)
+        top_labels = kwargs.pop('top_labels')
+        return top_labels if top_k is None else top_k
+
+    @staticmethod
+    def _get_explained_labels(explanation, labels, top_k):
+        """Returns the labels LIME explained, which are the top predicted labels if top_k is given."""
+        if top_k:
+            return tuple(int(label) for label in explanation.top_labels)
+        return tuple(labels)
 
     @staticmethod
     def _get_results_for_single_label(local_explanation, string_map):
@@ -112,11 +178,15 @@ class LIME:
                       model_or_function,
                       input_data,
                       labels=(1,),
-                      top_labels=None,
+                      top_k=None,
                       num_features=10,
                       num_samples=5000,
                       positive_only=False,
                       hide_rest=True,
+                      batch_size=10,
+                      time_budget=None,
+                      max_memory=None,
+                      checkpoint=None,
                       **kwargs,
                       ):  # pylint: disable=too-many-arguments,too-many-locals
         """
@@ -128,6 +198,16 @@ class LIME:
             input_data (np.ndarray): Data to be explained. Must be an "RGB image", i.e. with values in
                                      the [0,255] range.
             labels (tuple): Indices of classes to be explained
+            top_k (int, optional): If given, explain the top_k labels with the highest prediction for the
+                                   unperturbed image instead of the given labels, from highest to lowest.
+                                   The explained labels are stored in the explained_labels attribute.
+                                   Replaces the deprecated top_labels argument.
+            batch_size (int or "auto"): Batch size to use for running the model, "auto" to tune it
+            time_budget (float, optional): Maximum time in seconds to spend, see utils.TimeBudget.
+                                           The number of samples used is stored in n_evaluated_samples.
+            max_memory (int or str, optional): Memory budget, e.g. '2GB', see utils.MemoryBudget
+            checkpoint (str, Path or utils.Checkpoint, optional): File to resume from, see utils.Checkpoint
+
         Other keyword arguments: see the LIME documentation for LimeImageExplainer.explain_instance and
         ImageExplanation.get_image_and_mask:
 
@@ -137,26 +217,94 @@ class LIME:
         Returns:
             list of heatmaps for each label
         """
+        top_k = self._get_top_k(top_k, kwargs)
+        utils.warn_inapplicable_kwargs(kwargs, self.image_explainer.explain_instance,
+                                       ImageExplanation.get_image_and_mask, name='LIME.explain_image')
+        budget = utils.TimeBudget(time_budget)
+        checkpoint = utils.get_checkpoint(checkpoint)
+        if checkpoint is not None:
+            checkpoint.check_fixed_parameters(top_k=top_k is not None, batch_size=batch_size == 'auto',
+                                              time_budget=time_budget is not None)
         input_data, full_preprocess_function = self._prepare_image_data(input_data)
-        runner = utils.get_function(model_or_function, preprocess_function=full_preprocess_function)
+        runner = utils.get_function(model_or_function, preprocess_function=full_preprocess_function,
+                                    runner_options=self.runner_options)
+        max_batch_size = self._plan_image_memory(utils.MemoryBudget(max_memory), input_data, num_samples)
+        batch_size = utils.get_batch_size(batch_size, runner, lambda n: np.repeat(input_data[None], n, axis=0),
+                                          model_or_function=model_or_function, input_shape=input_data.shape,
+                                          max_batch_size=max_batch_size, time_budget=budget)
+        batch_size = max_batch_size if batch_size is None else min(batch_size, max_batch_size)
+        num_samples = self._plan_num_samples(budget, runner, lambda n: np.repeat(input_data[None], n, axis=0),
+                                             num_samples, num_features, probe_size=batch_size)
+        if checkpoint is not None:
+            # LIME generates the same segmentation and perturbations as the interrupted run from the same random state
+            checkpoint.restore_random_state(np.random, self.image_explainer.random_state)
+            model_runner = checkpoint.wrap(utils.get_function(model_or_function, runner_options=self.runner_options))
+            runner = utils.get_function(model_runner, preprocess_function=full_preprocess_function)
 
         # run the explanation.
         explain_instance_kwargs = utils.get_kwargs_applicable_to_function(self.image_explainer.explain_instance, kwargs)
         explanation = self.image_explainer.explain_instance(input_data,
                                                             runner,
                                                             labels=labels,
-                                                            top_labels=top_labels,
+                                                            top_labels=top_k,
                                                             num_features=num_features,
                                                             num_samples=num_samples,
+                                                            batch_size=batch_size,
                                                             **explain_instance_kwargs,
                                                             )
 
+        if checkpoint is not None:
+            checkpoint.remove()
+        self.explained_labels = self._get_explained_labels(explanation, labels, top_k)
         get_image_and_mask_kwargs = utils.get_kwargs_applicable_to_function(explanation.get_image_and_mask, kwargs)
         masks = [explanation.get_image_and_mask(label, positive_only=positive_only, hide_rest=hide_rest,
                                                 num_features=num_features, **get_image_and_mask_kwargs)[1]
-                 for label in labels]
+                 for label in self.explained_labels]
         return masks
 
+    def _plan_num_samples(self, budget, runner, make_batch, num_samples,  # pylint: disable=too-many-arguments
+                          num_features, probe_size=10):
+        """Determines the number of samples that can be evaluated within the time budget.
+
+        Args:
+            budget (utils.TimeBudget): Time budget of the explanation
+            runner (callable): Function that runs the model
+            make_batch (callable): Function that returns a batch of model input of the given size
+            num_samples (int): Requested number of samples
+            num_features (int): Number of features of the explanation, the surrogate model needs at
+                                least one more sample than this.
+            probe_size (int): Number of samples used to measure the time per sample
+
+        Returns:
+            Number of samples to use (int)
+        """
+        if budget.seconds is not None:
+            seconds_per_sample = utils.measure_seconds_per_sample(runner, make_batch(min(probe_size, num_samples)))
+            num_samples = budget.plan_samples(seconds_per_sample, num_samples, min_samples=num_features + 1)
+        self.n_evaluated_samples = num_samples
+        return num_samples
+
+    @staticmethod
+    def _plan_image_memory(memory, input_data, num_samples):
+        """Determines the largest batch size that fits in the memory budget.
+
+        Args:
+            memory (utils.MemoryBudget): Memory budget of the explanation
+            input_data (np.ndarray): Channels-last float64 image, as given to LIME
+            num_samples (int): Number of perturbed samples
+
+        Returns:
+            Maximum batch size (int)
+        """
+        if memory.max_memory is None:
+            return num_samples
+        # the input image, the copy LIME makes to create the perturbations from and the segmentation
+        memory.reserve(2 * input_data.nbytes + input_data[..., 0].size * np.dtype(np.int64).itemsize,
+                       'The input data')
+        # LIME keeps each perturbed image of a batch in a list and then stacks them into an array,
+        # after which the batch is converted to the model's layout and dtype
+        return memory.chunk_size(3 * input_data.nbytes, num_samples, 'A single perturbed image')
+
     def _prepare_image_data(self, input_data):
         """
         Transforms the data to be of the shape and type LIME expects.
@@ -167,24 +315,24 @@ class LIME:
         Returns:
             transformed input data, preprocessing function to use with utils.get_function()
         """
-        input_data = utils.to_xarray(input_data, self.axis_labels, LIME.required_labels)
+        axis_labels = utils.get_axis_labels(input_data, self.axis_labels, LIME.required_labels)
         # ensure channels axis is last and keep track of where it was so we can move it back
-        channels_axis_index = input_data.dims.index('channels')
-        input_data = utils.move_axis(input_data, 'channels', -1)
+        channels_axis_index = axis_labels.index('channels')
+        input_data = np.moveaxis(np.asarray(input_data), channels_axis_index, -1)
         # LIME requires 3 channels. If the input has one channel, assume it is greyscale and
         # append two channel axes with identical data
         greyscale = False
-        if len(input_data['channels']) == 1:
+        if input_data.shape[-1] == 1:
             greyscale = True
-            input_data = input_data.sel(channels=0).expand_dims({'channels': 3}, axis=input_data.dims.index('channels'))
+            input_data = np.repeat(input_data, 3, axis=-1)
         # create preprocessing function that puts model input generated by LIME into the right shape and dtype,
         # followed by running the user's preprocessing function
         full_preprocess_function = self._get_full_preprocess_function(channels_axis_index, input_data.dtype,
-                                                                      greyscale)
+                                                                      greyscale, input_data.ndim)
         # LIME requires float64 numpy data
-        return input_data.values.astype(np.float64), full_preprocess_function
+        return input_data.astype(np.float64), full_preprocess_function
 
-    def _get_full_preprocess_function(self, channel_axis_index, dtype, greyscale=False):
+    def _get_full_preprocess_function(self, channel_axis_index, dtype, greyscale=False, n_dims=None):
         """
         Creates a full preprocessing function.
 
@@ -195,21 +343,32 @@ class LIME:
             channel_axis_index (int): Axis index of the channels in the input data
             dtype (type): Data type of the input data (e.g. np.float32)
             greyscale (bool): Whether or not the data is greyscale (i.e. one channel)
+            n_dims (int, optional): Number of dimensions of the input data, without batch axis.
+                                    Used to detect if the data is already in the right layout.
 
         Returns:
             Function that first ensures the data has the same shape and type as the input data,
             then runs the users' preprocessing function
         """
-        # LIME generates numpy arrays, so numpy is used to move the channel axis back to where it
-        # was in the input data
+        # LIME generates float64 numpy arrays with the channel axis last. If that is also the layout and dtype
+        # of the input data, the data can be given to the model as is. Otherwise, the data is written into a
+        # reusable buffer with the channel axis moved back to where it was in the input data.
         # one is added to the channels axis index because there is an extra first axis: the batch axis
         # if the data was greyscale, also remove the extra channels
-        if greyscale:
+        channels_last = n_dims is not None and channel_axis_index == n_dims - 1
+        if channels_last and not greyscale and np.dtype(dtype) == np.float64:
             def moveaxis_function(data):
-                return np.moveaxis(data[..., [0]], -1, channel_axis_index + 1).astype(dtype)
+                return data
         else:
+            buffers = utils.BatchBuffer(dtype)
+
             def moveaxis_function(data):
-                return np.moveaxis(data, -1, channel_axis_index + 1).astype(dtype)
+                if greyscale:
+                    data = data[..., :1]
+                data = np.moveaxis(data, -1, channel_axis_index + 1)
+                out = buffers.get(data.shape)
+                np.copyto(out, data, casting='unsafe')
+                return out
 
         if self.preprocess_function is None:
             return moveaxis_function
@@ -0,0 +1,169 @@
+from pathlib import Path
+import numpy as np
+from dianna import utils
+
+
+def _get_patch_starts(size, patch_size, stride):
+    """Returns the start of each patch along an axis, with the last patch ending at the edge of the image."""
+    starts = list(range(0, max(size - patch_size, 0) + 1, stride))
+    if starts[-1] + patch_size < size:
+        starts.append(size - patch_size)
+    return np.array(starts)
+
+
+def _get_coverage(starts, patch_size, size, start=0):
+    """Returns for each patch whether it covers each position along an axis, from start onwards (n_patches x size)."""
+    positions = np.arange(start, size)
+    return (positions >= starts[:, np.newaxis]) & (positions < starts[:, np.newaxis] + patch_size)
+
+
+class Occlusion:
+    """Occlusion explainer, which occludes the image with a patch at regular positions.
+
+    The relevance of a pixel is the mean decrease of the model output over all patches that cover it.
+    The explanation is deterministic and needs one model evaluation per patch position.
+    """
+    # axis labels required to be present in input image data
+    required_labels = ('channels', )
+
+    def __init__(self, patch_size=8, stride=None, baseline=0,  # pylint: disable=too-many-arguments
+                 axis_labels=None, preprocess_function=None, runner_options=None):
+        """Occlusion initializer.
+
+        Args:
+            patch_size (int or tuple): Height and width of the occluding patch
+            stride (int or tuple, optional): Step between patch positions along the y and x axis,
+                                             defaults to the patch size
+            baseline (float, str or np.ndarray): Value of the occluded pixels. A number, 'mean' to use the
+                                                 mean of each channel of the image, or an array that
+                                                 broadcasts to the image, e.g. a blurred copy of the image
+            axis_labels (dict/list, optional): If a dict, key,value pairs of axis index, name.
+                                               If a list, the name of each axis where the index
+                                               in the list is the axis index
+            preprocess_function (callable, optional): Function to preprocess input data with
+            runner_options (dict, optional): ONNX Runtime session options, e.g. {'intra_op_num_threads': 4},
+                                             used when a path to an ONNX model is given
+        """
+        self.patch_size = np.broadcast_to(patch_size, 2).astype(int)
+        self.stride = self.patch_size if stride is None else np.broadcast_to(stride, 2).astype(int)
+        if np.any(self.patch_size < 1) or np.any(self.stride < 1):
+            raise ValueError(f'patch_size and stride must be at least 1, got {patch_size} and {stride}')
+        if isinstance(baseline, str) and baseline != 'mean':
+            raise ValueError(f"baseline must be a number, 'mean' or an array, got: {baseline}")
+        self.baseline = baseline
+        self.axis_labels = axis_labels if axis_labels is not None else []
+        self.preprocess_function = preprocess_function
+        self.runner_options = runner_options
+        self.n_patches = None
+
+    def explain_image(self, model_or_function, input_data, labels=(0,),  # pylint: disable=too-many-arguments,too-many-locals
+                      batch_size=100, prefetch=0, max_memory=None, out=None):
+        """Runs the occlusion explainer on images.
+
+           The patch positions are processed in row-major order, one batch at a time, and only the rows
+           covered by a batch are updated in the saliency. The memory use therefore does not depend on the
+           number of patches, and the saliency of a large image can be written to a memory-mapped file.
+
+        Args:
+            model_or_function (callable or str): The function that runs the model to be explained _or_
+                                                 the path to a ONNX model on disk.
+            input_data (np.ndarray): Image to be explained
+            labels (tuple): Labels to be explained
+            batch_size (int or str): Batch size to use for running the model, or "auto" to tune it
+            prefetch (int): Number of batches to prepare in a background thread while the model is running
+            max_memory (int or str, optional): Memory budget, e.g. '2GB', see utils.MemoryBudget
+            out (str or Path, optional): .npy file to write the saliency to as a memory-mapped array.
+                                         If None, the saliency is kept in memory.
+
+        Returns:
+            Explanation heatmap for each label (np.ndarray, or np.memmap if out is given).
+        """
+        axis_labels = utils.get_axis_labels(input_data, self.axis_labels, Occlusion.required_labels)
+        channels_axis_index = axis_labels.index('channels')
+        # add batch axis, keeping the data in its original layout, which is the layout of the model input
+        model_input = np.asarray(input_data)[np.newaxis]
+        img_shape = tuple(int(size) for size in np.delete(model_input.shape[1:], channels_axis_index))
+        patch_size = np.minimum(self.patch_size, img_shape)
+        starts_y = _get_patch_starts(img_shape[0], patch_size[0], self.stride[0])
+        starts_x = _get_patch_starts(img_shape[1], patch_size[1], self.stride[1])
+        # row-major order, so consecutive patches cover the same rows
+        starts = np.stack(np.meshgrid(starts_y, starts_x, indexing='ij'), axis=-1).reshape(-1, 2)
+        self.n_patches = len(starts)
+
+        runner = utils.get_function(model_or_function, preprocess_function=self.preprocess_function,
+                                    runner_options=self.runner_options)
+        memory = utils.MemoryBudget(max_memory)
+        max_batch_size = memory.chunk_size((prefetch + 2) * model_input.nbytes, self.n_patches,
+                                           'A batch of one occluded input')
+        batch_size = utils.get_batch_size(batch_size, runner, lambda n: np.repeat(model_input, n, axis=0),
+                                          model_or_function=model_or_function, input_shape=model_input.shape[1:],
+                                          max_batch_size=max_batch_size)
+        batch_size = min(batch_size, max_batch_size)
+
+        labels = list(labels)
+        reference = runner(model_input)[:, labels]
+        create_occluded_batch = self._get_occluded_batch_function(model_input, channels_axis_index, patch_size,
+                                                                  prefetch)
+        batches = ((starts[i:i + batch_size], create_occluded_batch(starts[i:i + batch_size]))
+                   for i in range(0, self.n_patches, batch_size))
+
+        saliency = np.zeros((len(labels), ) + img_shape, dtype=np.float32) if out is None else \
+            np.lib.format.open_memmap(Path(out), mode='w+', dtype=np.float32, shape=(len(labels), ) + img_shape)
+        progress = {'total': len(range(0, self.n_patches, batch_size)), 'desc': 'Explaining'}
+        for batch_starts, occluded in utils.prefetch_batches(batches, prefetch, progress):
+            decrease = reference - runner(occluded)[:, labels]
+            first_row, end_row = batch_starts[0, 0], batch_starts[-1, 0] + patch_size[0]
+            coverage_y = _get_coverage(batch_starts[:, 0], patch_size[0], end_row, first_row)
+            coverage_x = _get_coverage(batch_starts[:, 1], patch_size[1], img_shape[1])
+            saliency[:, first_row:end_row] += np.einsum('nl,ny,nx->lyx', decrease, coverage_y, coverage_x)
+
+        # number of patches covering each pixel, pixels between patches are not covered when stride > patch size
+        n_covering = np.outer(_get_coverage(starts_y, patch_size[0], img_shape[0]).sum(axis=0),
+                              _get_coverage(starts_x, patch_size[1], img_shape[1]).sum(axis=0))
+        for y in range(0, img_shape[0], patch_size[0]):
+            # normalize per block of rows, so a memory-mapped output is not loaded at once
+            rows = slice(y, y + patch_size[0])
+            saliency[:, rows] = np.divide(saliency[:, rows], n_covering[rows], out=np.zeros_like(saliency[:, rows]),
+                                          where=n_covering[rows] > 0)
+        if out is not None:
+            saliency.flush()
+        return saliency
+
+    def _get_baseline(self, model_input, channels_axis_index):
+        """Returns the baseline value(s) in the layout of the model input, without batch axis."""
+        if isinstance(self.baseline, str):
+            # mean of each channel, keeping the channel axis
+            spatial_axes = tuple(i for i in range(model_input.ndim - 1) if i != channels_axis_index)
+            return model_input[0].mean(axis=spatial_axes, keepdims=True).astype(model_input.dtype)
+        return np.asarray(self.baseline, dtype=model_input.dtype)
+
+    def _get_occluded_batch_function(self, model_input, channels_axis_index, patch_size, prefetch):
+        """Creates a function that occludes the input data at a batch of patch positions.
+
+        The occluded data is written directly in the layout and dtype of the model, into preallocated
+        buffers that are reused across batches.
+
+        Args:
+            model_input (np.ndarray): Input data in the layout and dtype of the model, including batch axis
+            channels_axis_index (int): Axis index of the channels in the input data, without batch axis
+            patch_size (np.ndarray): Height and width of the patch
+            prefetch (int): Number of batches that are prepared ahead of the model
+
+        Returns:
+            Function that takes the (y, x) start of each patch in a batch and returns the occluded input data
+        """
+        baseline = self._get_baseline(model_input, channels_axis_index)
+        img_shape = np.delete(model_input.shape[1:], channels_axis_index)
+        buffers = utils.BatchBuffer.for_prefetch(model_input.dtype, prefetch)
+
+        def occluded_batch_function(batch_starts):
+            occluded_pixels = _get_coverage(batch_starts[:, 0], patch_size[0], img_shape[0])[:, :, np.newaxis] & \
+                _get_coverage(batch_starts[:, 1], patch_size[1], img_shape[1])[:, np.newaxis, :]
+            # add the channel axis where it is in the model input
+            occluded_pixels = np.expand_dims(occluded_pixels, channels_axis_index + 1)
+            occluded = buffers.get((len(batch_starts),) + model_input.shape[1:])
+            occluded[:] = model_input
+            np.copyto(occluded, baseline, where=occluded_pixels)
+            return occluded
+
+        return occluded_batch_function
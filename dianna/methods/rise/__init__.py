@@ -0,0 +1,297 @@
+"""RISE explainer, see https://arxiv.org/abs/1806.07421.
+
+The RISE class holds the settings of the explainer and dispatches to the driver of each modality,
+which live in the modules of this package.
+"""
+from . import images
+from . import multiresolution
+from . import sequence
+from . import text
+from . import tiled
+from . import timeseries
+from .masks import SAMPLERS  # noqa: F401
+from .saliency import normalize  # noqa: F401
+
+
+class RISE:
+    """RISE implementation based on https://github.com/eclique/RISE/blob/master/Easy_start.ipynb."""
+    # axis labels required to be present in input image data
+    required_labels = ('channels', )
+
+    def __init__(self, n_masks=1000, feature_res=8, p_keep=None,  # pylint: disable=too-many-arguments
+                 axis_labels=None, preprocess_function=None, mask_string="UNKWORDZ", runner_options=None,
+                 sampler='random'):
+        """RISE initializer.
+
+        Args:
+            n_masks (int): Number of masks to generate.
+            feature_res (int): Resolution of features in masks.
+            p_keep (float): Fraction of image to keep in each mask (Default: auto-tune this value).
+            axis_labels (dict/list, optional): If a dict, key,value pairs of axis index, name.
+                                               If a list, the name of each axis where the index
+                                               in the list is the axis index
+            preprocess_function (callable, optional): Function to preprocess input data with
+            mask_string (str, optional): String to replace masked tokens with (text only)
+            runner_options (dict, optional): ONNX Runtime session options, used if the model is given as a path.
+                                             See dianna.utils.onnx_runner.SimpleModelRunner for the options.
+            sampler (str, optional): How the cells of the masks are sampled. One of:
+
+                - 'random': each cell is kept independently with probability p_keep
+                - 'stratified': each mask keeps exactly round(p_keep * number of cells) cells
+                - 'sobol': cells are kept based on a scrambled Sobol sequence, which covers the
+                  possible masks more evenly than random sampling
+                - 'antithetic': masks come in pairs with opposite random numbers, so cells that are
+                  likely kept in one mask are likely masked in the other
+
+                The latter three typically need fewer masks for the same accuracy of the explanation.
+        """
+        if sampler not in SAMPLERS:
+            raise ValueError(f"Unknown sampler: {sampler}, must be one of {', '.join(SAMPLERS)}")
+        self.n_masks = n_masks
+        self.feature_res = feature_res
+        self.p_keep = p_keep
+        self.preprocess_function = preprocess_function
+        self.masks = None
+        self.predictions = None
+        self.n_evaluated_masks = None
+        self.explained_labels = None
+        self.keyframes = None
+        self.axis_labels = axis_labels if axis_labels is not None else []
+        self.mask_string = mask_string
+        self.runner_options = runner_options
+        self.sampler = sampler
+
+    def explain_text(self, model_or_function, input_text, labels=(0,), batch_size=100,  # pylint: disable=too-many-arguments
+                     prefetch=0, time_budget=None, checkpoint=None, top_k=None):
+        """Runs the RISE explainer on text.
+
+           The model will be called with masked versions of the input text.
+
+        Args:
+            model_or_function (callable or str): The function that runs the model to be explained _or_
+                                                 the path to a ONNX model on disk.
+            input_text (np.ndarray): Text to be explained
+            labels (list(int)): Labels to be explained
+            batch_size (int or "auto"): Batch size to use for running the model, "auto" to tune it
+            prefetch (int): Number of batches to prepare in a background thread while the model is running
+            time_budget (float, optional): Maximum time in seconds to spend, see utils.TimeBudget.
+                                           The number of evaluated masks is stored in n_evaluated_masks.
+            checkpoint (str, Path or utils.Checkpoint, optional): File to resume from, see utils.Checkpoint
+            top_k (int, optional): If given, explain the top_k labels with the highest prediction for the
+                                   unmasked text instead of the given labels, from highest to lowest.
+                                   The explained labels are stored in the explained_labels attribute.
+
+        Returns:
+            Explanation heatmap for each class (np.ndarray).
+        """
+        return text.explain_text(self, model_or_function, input_text, labels, batch_size, prefetch, time_budget,
+                                 checkpoint, top_k)
+
+    def explain_text_windows(self, model_or_function, input_text, window_size,  # pylint: disable=too-many-arguments
+                             labels=(0,), overlap=None, batch_size=100, prefetch=0):
+        """Runs the RISE explainer on a long text, in overlapping windows of tokens.
+
+           Each window is given to the model as a text of its own, so the number of masks needed for a
+           stable estimate depends on the window size rather than on the length of the document. All windows
+           are explained with the same set of masks and masked sentences of several windows are run in the
+           same batch. The saliencies of the windows are blended into one saliency per token, with weights
+           that decrease towards the edges of each window within the overlap.
+
+        Args:
+            model_or_function (callable or str): The function that runs the model to be explained _or_
+                                                 the path to a ONNX model on disk.
+            input_text (str): Text to be explained
+            window_size (int): Number of tokens per window
+            labels (tuple): Labels to be explained
+            overlap (int, optional): Number of tokens by which neighbouring windows overlap,
+                                     defaults to half the window size
+            batch_size (int): Batch size to use for running the model
+            prefetch (int): Number of batches to prepare in a background thread while the model is running
+
+        Returns:
+            For each label, a list of (word, character offset of word in input_text, importance) tuples.
+        """
+        return text.explain_text_windows(self, model_or_function, input_text, window_size, labels, overlap, batch_size,
+                                         prefetch)
+
+    def explain_timeseries(self, model_or_function, input_timeseries, labels=(0,),  # pylint: disable=too-many-arguments
+                           batch_size=100, prefetch=0, mask_channels=False):
+        """Runs the RISE explainer on a time series.
+
+           The masks are smooth 1-D masks along the time axis. They are generated per batch and the saliency
+           is accumulated per batch, so only a single batch of masks and masked input is in memory, which
+           allows for sequences of millions of time steps.
+
+        Args:
+            model_or_function (callable or str): The function that runs the model to be explained _or_
+                                                 the path to a ONNX model on disk.
+            input_timeseries (np.ndarray): Time series to be explained, either 1-D or with a channel axis,
+                                           which must be named 'channels' in the axis labels
+            labels (tuple): Labels to be explained
+            batch_size (int or "auto"): Batch size to use for running the model, "auto" to tune it
+            prefetch (int): Number of batches to prepare in a background thread while the model is running
+            mask_channels (bool): If True, each channel is masked independently and a saliency is
+                                  computed per channel. Otherwise, all channels share the same masks.
+
+        Returns:
+            Explanation for each label (np.ndarray), of shape (labels, time) or (labels, time, channels)
+            if mask_channels is True.
+        """
+        return timeseries.explain_timeseries(self, model_or_function, input_timeseries, labels, batch_size, prefetch,
+                                             mask_channels)
+
+    def generate_masks_for_timeseries(self, sequence_length, p_keep, n_masks, n_channels=None):
+        """Generates a set of random, smooth masks along the time axis.
+
+        Args:
+            sequence_length (int): Number of time steps
+            p_keep (float): Fraction of the time series to keep in each mask
+            n_masks (int): Number of masks to generate
+            n_channels (int, optional): If given, an independent mask is generated for each channel
+
+        Returns:
+            The generated masks (np.ndarray), of shape (n_masks, time) or (n_masks, time, channels)
+        """
+        return timeseries.generate_masks(self, sequence_length, p_keep, n_masks, n_channels)
+
+    def explain_image(self, model_or_function, input_data, labels=None, batch_size=100,  # pylint: disable=too-many-arguments
+                      prefetch=0, time_budget=None, max_memory=None, checkpoint=None, top_k=None,
+                      channel_groups=None):
+        """Runs the RISE explainer on images.
+
+           The model will be called with masked images,
+           with a shape defined by `batch_size` and the shape of `input_data`.
+           Images can have any number of spatial axes, e.g. volumes with axis labels
+           ('depth', 'height', 'width', 'channels'). The masks of images with more than two spatial
+           axes, or masked per channel group, are generated per batch and not kept in the masks attribute.
+
+        Args:
+            model_or_function (callable or str): The function that runs the model to be explained _or_
+                                                 the path to a ONNX model on disk.
+            input_data (np.ndarray): Image to be explained
+            batch_size (int or "auto"): Batch size to use for running the model, "auto" to tune it
+            labels (tuple): Labels to be explained. If None, all labels are explained.
+            prefetch (int): Number of batches to prepare in a background thread while the model is running
+            time_budget (float, optional): Maximum time in seconds to spend, see utils.TimeBudget.
+                                           The number of evaluated masks is stored in n_evaluated_masks.
+            max_memory (int or str, optional): Memory budget, e.g. '2GB', see utils.MemoryBudget.
+                                               Masks that do not fit are generated per batch and not kept.
+            checkpoint (str, Path or utils.Checkpoint, optional): File to resume from, see utils.Checkpoint
+            top_k (int, optional): If given, explain the top_k labels with the highest prediction for the
+                                   unmasked image instead of the given labels, from highest to lowest.
+                                   The explained labels are stored in the explained_labels attribute.
+            channel_groups (int or sequence, optional): If given, the channels are divided into groups that
+                                                        are masked independently, e.g. bands of a hyperspectral
+                                                        image. Either the number of groups of consecutive
+                                                        channels, or the group index of each channel.
+
+        Returns:
+            Explanation heatmap for each class (np.ndarray), with a last axis for the channel groups
+            if channel_groups is given.
+        """
+        return images.explain_image(self, model_or_function, input_data, labels, batch_size, prefetch, time_budget,
+                                    max_memory, checkpoint, top_k, channel_groups)
+
+    def explain_image_tiled(self, model_or_function, input_data, tile_size,  # pylint: disable=too-many-arguments
+                            labels=(0,), overlap=0, batch_size=100, prefetch=0, out=None):
+        """Runs the RISE explainer on an image that is larger than the input of the model.
+
+           The model input window is slid over the image in tiles that overlap by the given number of pixels.
+           Each tile is explained with the same set of masks and the saliency maps of the tiles are blended
+           into one map of the full image. Only one tile is loaded at a time, so the image can be a
+           memory-mapped array, and the saliency can be written to a memory-mapped file.
+
+        Args:
+            model_or_function (callable or str): The function that runs the model to be explained _or_
+                                                 the path to a ONNX model on disk.
+            input_data (np.ndarray): Image to be explained, e.g. a np.memmap
+            tile_size (tuple): Height and width of the model input
+            labels (tuple): Labels to be explained
+            overlap (int): Number of pixels by which neighbouring tiles overlap. Saliency values in the
+                           overlap are blended with weights that decrease towards the edge of each tile.
+            batch_size (int): Batch size to use for running the model
+            prefetch (int): Number of batches to prepare in a background thread while the model is running
+            out (str or Path, optional): .npy file to write the saliency to as a memory-mapped array.
+                                         If None, the saliency is kept in memory.
+
+        Returns:
+            Explanation heatmap for each label (np.ndarray, or np.memmap if out is given).
+        """
+        return tiled.explain_image_tiled(self, model_or_function, input_data, tile_size, labels, overlap, batch_size,
+                                         prefetch, out)
+
+    def explain_image_multiresolution(self, model_or_function, input_data,  # pylint: disable=too-many-arguments
+                                      labels=(0,), resolutions=(4, 8, 16), refine_fraction=.25,
+                                      batch_size=100, prefetch=0):
+        """Runs the RISE explainer on images from coarse to fine resolution.
+
+           The image is first explained with masks at the coarsest resolution. Each next, finer resolution only
+           perturbs the regions where the saliency or its uncertainty of the previous level is highest, while
+           the rest of the image is kept unmasked. The detail of each finer level is merged into the map of
+           the previous level within these regions. The n_masks masks are divided equally over the levels.
+
+        Args:
+            model_or_function (callable or str): The function that runs the model to be explained _or_
+                                                 the path to a ONNX model on disk.
+            input_data (np.ndarray): Image to be explained
+            labels (tuple): Labels to be explained
+            resolutions (tuple): Resolution of features in the masks at each level, from coarse to fine
+            refine_fraction (float): Fraction of the image that is refined at each finer level
+            batch_size (int): Batch size to use for running the model
+            prefetch (int): Number of batches to prepare in a background thread while the model is running
+
+        Returns:
+            Explanation heatmap for each label (np.ndarray).
+        """
+        return multiresolution.explain_image_multiresolution(self, model_or_function, input_data, labels, resolutions,
+                                                             refine_fraction, batch_size, prefetch)
+
+    def explain_image_sequence(self, model_or_function, frames, labels=(0,),  # pylint: disable=too-many-arguments
+                               batch_size=100, prefetch=0, warm_start_masks=None, change_threshold=.05,
+                               keyframe_interval=10):
+        """Runs the RISE explainer on a sequence of images, such as the frames of a video.
+
+           All frames are explained with the same set of masks and the masked frames are batched together,
+           so a batch can hold masked versions of several frames. If warm_start_masks is given, frames that
+           differ little from the last keyframe are not explained from scratch: their explanation is the
+           explanation of the previous frame, corrected with the change in model output on the first
+           warm_start_masks masks only. As both frames see the same masks, this correction is much less
+           noisy than an explanation with the same number of masks.
+
+        Args:
+            model_or_function (callable or str): The function that runs the model to be explained _or_
+                                                 the path to a ONNX model on disk.
+            frames (np.ndarray): Images to be explained, with the frames along the first axis.
+                                 The axis labels apply to a single frame.
+            labels (tuple): Labels to be explained
+            batch_size (int): Batch size to use for running the model
+            prefetch (int): Number of batches to prepare in a background thread while the model is running
+            warm_start_masks (int, optional): Number of masks to evaluate for a frame that is warm-started
+                                              from the previous frame, at least 1. If None, every frame is
+                                              explained with all masks.
+            change_threshold (float): Frames whose relative difference to the last keyframe, measured as
+                                      the norm of the difference divided by the norm of the keyframe, is
+                                      larger than this are explained with all masks and become a keyframe
+            keyframe_interval (int): Maximum number of frames between keyframes, which limits the build-up
+                                     of noise from consecutive corrections
+
+        Returns:
+            Explanation heatmap for each frame and label (np.ndarray of shape frames x labels x image shape).
+        """
+        return sequence.explain_image_sequence(self, model_or_function, frames, labels, batch_size, prefetch,
+                                               warm_start_masks, change_threshold, keyframe_interval)
+
+    def generate_masks_for_images(self, input_size, p_keep, n_masks, feature_res=None,  # pylint: disable=too-many-arguments
+                                  n_groups=None):
+        """Generates a set of random masks to mask the input data.
+
+        Args:
+            input_size (tuple): Size of a single sample of input data, for images without the channel axis.
+                                Can have any number of spatial axes.
+            feature_res (int, optional): Resolution of features in the masks, defaults to self.feature_res
+            n_groups (int, optional): If given, an independent mask is generated for each group of channels
+
+        Returns:
+            The generated masks (np.ndarray), with a last axis of size 1, or n_groups if given
+        """
+        return images.generate_masks(self, input_size, p_keep, n_masks, feature_res, n_groups)
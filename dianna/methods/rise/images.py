@@ -0,0 +1,273 @@
+import numpy as np
+from dianna import utils
+from .masks import sample_image_grids
+from .masks import upscale_image_grids
+from .saliency import accumulate_saliency
+from .saliency import get_labels
+from .saliency import get_predictions
+from .saliency import get_progress
+from .saliency import keep_evaluated_masks
+from .saliency import normalize
+from .saliency import select_labels
+from .saliency import select_p_keep
+
+
+def explain_image(explainer, model_or_function, input_data, labels=None, batch_size=100,  # pylint: disable=too-many-arguments,too-many-locals
+                  prefetch=0, time_budget=None, max_memory=None, checkpoint=None, top_k=None,
+                  channel_groups=None):
+    """See RISE.explain_image."""
+    budget = utils.TimeBudget(time_budget)
+    memory = utils.MemoryBudget(max_memory)
+    checkpoint = utils.get_checkpoint(checkpoint)
+    if checkpoint is not None:
+        checkpoint.check_fixed_parameters(p_keep=explainer.p_keep is None, top_k=top_k is not None,
+                                          batch_size=batch_size == 'auto', time_budget=time_budget is not None)
+    model_input, channels_axis_index = get_model_input(explainer, input_data)
+    input_data, full_preprocess_function = prepare_image_data(explainer, model_input, channels_axis_index)
+    runner = utils.get_function(model_or_function, preprocess_function=full_preprocess_function,
+                                runner_options=explainer.runner_options)
+    # data shape without batch axis and channel axis
+    img_shape = input_data.shape[1:-1]
+    group_index = _get_channel_group_index(channel_groups, input_data.shape[-1])
+    n_groups = None if group_index is None else group_index.max() + 1
+    # shape of the saliency of each label, which is the shape of a mask without the batch axis
+    mask_shape = img_shape if n_groups is None else img_shape + (n_groups, )
+    unmasked_prediction, n_outputs = _get_unmasked_prediction(runner, input_data, checkpoint, memory, top_k)
+    max_batch_size, keep_masks = _plan_memory(explainer, memory, n_outputs, input_data, mask_shape, prefetch)
+    batch_size = min(max_batch_size, utils.get_batch_size(
+        batch_size, runner, lambda n: np.repeat(input_data, n, axis=0), model_or_function=model_or_function,
+        input_shape=input_data.shape[1:], max_batch_size=max_batch_size, time_budget=budget))
+    model_runner = utils.get_function(model_or_function, runner_options=explainer.runner_options)
+    if checkpoint is not None:
+        # masks are generated from the same random state as the interrupted run
+        checkpoint.restore_random_state(np.random)
+        model_runner = checkpoint.wrap(model_runner)
+        runner = utils.get_function(model_runner, preprocess_function=full_preprocess_function)
+    explainer.explained_labels = get_labels(runner, input_data, labels, top_k, unmasked_prediction)
+
+    active_p_keep = determine_p_keep(explainer, input_data, runner, batch_size=batch_size,
+                                     group_index=group_index, budget=budget) \
+        if explainer.p_keep is None else explainer.p_keep
+    # the masked batches are created separately from running the model, so this can happen in a background thread
+    create_masked_batch = get_masked_batch_function(explainer, model_input, channels_axis_index, prefetch,
+                                                    group_index)
+    if keep_masks and n_groups is None and len(img_shape) == 2:
+        # Expose masks for to make user inspection possible
+        explainer.masks = generate_masks(explainer, img_shape, active_p_keep, explainer.n_masks)
+        batches = (create_masked_batch(explainer.masks[i:i + batch_size])
+                   for i in range(0, explainer.n_masks, batch_size))
+        explainer.predictions = get_predictions(batches, model_runner, prefetch, budget,
+                                                get_progress(explainer.n_masks, batch_size))
+        keep_evaluated_masks(explainer)
+        saliency = select_labels(explainer.predictions, explainer.explained_labels).T.dot(
+            explainer.masks.reshape(explainer.n_evaluated_masks, -1))
+    else:
+        # the masks are too large to keep in memory at once, so they are upscaled from their grids per batch
+        # and the saliency is accumulated
+        explainer.masks = None
+        grids, shifts = sample_image_grids(explainer.sampler, img_shape, active_p_keep, explainer.n_masks,
+                                           explainer.feature_res, n_groups)
+        mask_batches = (upscale_image_grids(grids[i:i + batch_size], shifts[i:i + batch_size], img_shape)
+                        for i in range(0, explainer.n_masks, batch_size))
+        batches = ((masks, create_masked_batch(masks)) for masks in mask_batches)
+        saliency = accumulate_saliency(explainer, batches, model_runner, prefetch, budget,
+                                       explainer.explained_labels, get_progress(explainer.n_masks, batch_size))
+
+    result = normalize(saliency.reshape(-1, *mask_shape), explainer.n_evaluated_masks, active_p_keep)
+    if checkpoint is not None:
+        checkpoint.remove()
+    return result
+
+
+def _get_unmasked_prediction(runner, input_data, checkpoint, memory, top_k):  # pylint: disable=too-many-arguments
+    """Returns the prediction for the unmasked input if it is needed, and the number of outputs of the model.
+
+    The prediction is shared by the memory planning and the label selection. An export is given the number
+    of outputs, as it does not run the model.
+    """
+    n_outputs = getattr(checkpoint, 'n_outputs', None) or getattr(runner, 'n_outputs', None)
+    if top_k is None and (memory.max_memory is None or n_outputs is not None):
+        return None, n_outputs
+    unmasked_prediction = np.asarray(runner(input_data))
+    return unmasked_prediction, unmasked_prediction.shape[-1]
+
+
+def _plan_memory(explainer, memory, n_outputs, input_data, mask_shape, prefetch):  # pylint: disable=too-many-arguments
+    """Sizes the arrays of an image explanation to fit in the memory budget.
+
+    Args:
+        explainer (RISE): The explainer, which holds the number of masks and their resolution
+        memory (utils.MemoryBudget): Memory budget of the explanation
+        n_outputs (int): Number of outputs of the model per input, only used if there is a memory budget
+        input_data (np.ndarray): Data to be explained, including batch axis
+        mask_shape (tuple): Shape of a single mask, without batch axis
+        prefetch (int): Number of batches that are prepared ahead of the model
+
+    Returns:
+        maximum batch size (int), whether all masks can be kept in memory (bool)
+    """
+    if memory.max_memory is None:
+        return explainer.n_masks, True
+    memory.reserve(input_data.nbytes, 'The input data')
+    mask_bytes = np.prod(mask_shape) * np.dtype(np.float32).itemsize
+    # saliency maps and temporary arrays of the same size while computing them
+    memory.reserve(3 * n_outputs * mask_bytes, 'The saliency maps')
+    # one masked batch is used by the model and one is being filled, next to the prefetched ones
+    n_buffers = prefetch + 2
+    # the predictions are kept together with the masks, assuming float32 outputs
+    all_masks_bytes = explainer.n_masks * (mask_bytes + n_outputs * np.dtype(np.float32).itemsize)
+    keep_masks = memory.fits(all_masks_bytes + n_buffers * input_data.nbytes)
+    if keep_masks:
+        memory.reserve(all_masks_bytes, 'The masks')
+        bytes_per_sample = n_buffers * input_data.nbytes
+    else:
+        # the grids and shifts the masks are upscaled from, one per mask and channel group
+        n_spatial_axes = input_data.ndim - 2
+        n_grids = explainer.n_masks * int(np.prod(mask_shape[n_spatial_axes:]))
+        memory.reserve(n_grids * (explainer.feature_res ** n_spatial_axes + n_spatial_axes * np.dtype(int).itemsize),
+                       'The mask grids')
+        bytes_per_sample = n_buffers * (input_data.nbytes + mask_bytes)
+    return memory.chunk_size(bytes_per_sample, explainer.n_masks, 'A batch of one masked input'), keep_masks
+
+
+def _get_channel_group_index(channel_groups, n_channels):
+    """Returns the group index of each channel, or None if the channels are not grouped."""
+    if channel_groups is None:
+        return None
+    if np.isscalar(channel_groups):
+        if not 1 <= channel_groups <= n_channels:
+            raise ValueError(f'The number of channel groups must be between 1 and {n_channels}, got {channel_groups}')
+        # groups of consecutive channels, of (nearly) equal size
+        return np.arange(n_channels) * channel_groups // n_channels
+    group_index = np.asarray(channel_groups, dtype=int)
+    if group_index.shape != (n_channels, ) or group_index.min() < 0:
+        raise ValueError(f'channel_groups must hold a non-negative group index for each of the {n_channels} channels')
+    return group_index
+
+
+def determine_p_keep(explainer, input_data, runner, n_masks=100, batch_size=50,  # pylint: disable=too-many-arguments
+                     group_index=None, budget=None):
+    """See n_mask default value https://github.com/dianna-ai/dianna/issues/24#issuecomment-1000152233."""
+    p_keeps = np.arange(0.1, 1.0, 0.1)
+    stds = []
+    for p_keep in p_keeps:
+        std = _calculate_mean_class_std(explainer, p_keep, runner, input_data, n_masks=n_masks,
+                                        batch_size=batch_size, group_index=group_index)
+        stds += [std]
+        if budget is not None and budget.exhausted:
+            break
+    return select_p_keep(p_keeps, stds)
+
+
+def _calculate_mean_class_std(explainer, p_keep, runner, input_data, n_masks,  # pylint: disable=too-many-arguments
+                              batch_size=50, group_index=None):
+    img_shape = input_data.shape[1:-1]
+    n_groups = None if group_index is None else group_index.max() + 1
+    predictions = []
+    grids, shifts = sample_image_grids(explainer.sampler, img_shape, p_keep, n_masks, explainer.feature_res,
+                                       n_groups)
+    for i in range(0, n_masks, batch_size):
+        # upscale the masks per batch, so only a single batch of masks and masked input is in memory
+        masks = upscale_image_grids(grids[i:i + batch_size], shifts[i:i + batch_size], img_shape)
+        current_input = input_data * (masks if group_index is None else masks[..., group_index])
+        current_predictions = runner(current_input)
+        predictions.append(current_predictions.max(axis=1))
+    predictions = np.concatenate(predictions)
+    std_per_class = predictions.std()
+    return np.mean(std_per_class)
+
+
+def generate_masks(explainer, input_size, p_keep, n_masks, feature_res=None,  # pylint: disable=too-many-arguments
+                   n_groups=None):
+    """See RISE.generate_masks_for_images."""
+    feature_res = explainer.feature_res if feature_res is None else feature_res
+    grids, shifts = sample_image_grids(explainer.sampler, input_size, p_keep, n_masks, feature_res, n_groups)
+    return upscale_image_grids(grids, shifts, input_size)
+
+
+def get_model_input(explainer, input_data):
+    """Adds a batch axis to the data, keeping it in its original layout, which is the layout of the model input.
+
+    Returns:
+        model input (np.ndarray), axis index of the channels in the model input (int)
+    """
+    # resolve the axis labels once, after which only plain numpy arrays are used
+    axis_labels = utils.get_axis_labels(input_data, explainer.axis_labels, explainer.required_labels)
+    return np.asarray(input_data)[np.newaxis], axis_labels.index('channels') + 1
+
+
+def prepare_image_data(explainer, input_data, channels_axis_index):
+    """Transforms the data to be of the shape and type RISE expects.
+
+    Args:
+        explainer (RISE): The explainer, which holds the user's preprocessing function
+        input_data (np.ndarray): Data to be explained, including batch axis
+        channels_axis_index (int): Axis index of the channels in the input data
+
+    Returns:
+        transformed input data, preprocessing function to use with utils.get_function()
+    """
+    # ensure channels axis is last, the original position is kept so we can move it back
+    input_data = np.moveaxis(input_data, channels_axis_index, -1)
+    # create preprocessing function that puts model input generated by RISE into the right shape and dtype,
+    # followed by running the user's preprocessing function
+    full_preprocess_function = get_full_preprocess_function(explainer, channels_axis_index, input_data.dtype)
+    return input_data, full_preprocess_function
+
+
+def get_full_preprocess_function(explainer, channel_axis_index, dtype):
+    """Creates a full preprocessing function.
+
+    Creates a preprocessing function that incorporates both the (optional) user's
+    preprocessing function, as well as any needed dtype and shape conversions
+
+    Args:
+        explainer (RISE): The explainer, which holds the user's preprocessing function
+        channel_axis_index (int): Axis index of the channels in the input data
+        dtype (type): Data type of the input data (e.g. np.float32)
+
+    Returns:
+        Function that first ensures the data has the same shape and type as the input data,
+        then runs the users' preprocessing function
+    """
+    def moveaxis_function(data):
+        return np.moveaxis(data, -1, channel_axis_index).astype(dtype)
+
+    if explainer.preprocess_function is None:
+        return moveaxis_function
+    return lambda data: explainer.preprocess_function(moveaxis_function(data))
+
+
+def get_masked_batch_function(explainer, model_input, channel_axis_index, prefetch,  # pylint: disable=too-many-arguments
+                              group_index=None):
+    """Creates a function that masks the input data, directly in the layout and dtype of the model.
+
+    The masks are only moved to the model's layout as a view and the masked data is written into
+    preallocated buffers that are reused across batches, so no per-batch transpose or cast is done.
+
+    Args:
+        explainer (RISE): The explainer, which holds the user's preprocessing function
+        model_input (np.ndarray): Input data in the layout and dtype of the model, including batch axis
+        channel_axis_index (int): Axis index of the channels in the model input
+        prefetch (int): Number of batches that are prepared ahead of the model
+        group_index (np.ndarray, optional): Group of each channel, if the masks have an axis of channel groups
+
+    Returns:
+        Function that takes a batch of masks and returns the masked input data,
+        followed by running the users' preprocessing function
+    """
+    buffers = utils.BatchBuffer.for_prefetch(model_input.dtype, prefetch)
+
+    def masked_batch_function(masks):
+        if group_index is not None:
+            # mask each channel with the mask of its group
+            masks = masks[..., group_index]
+        # the masks have the channel axis last, move it to where it is in the model input
+        masks = np.moveaxis(masks, -1, channel_axis_index)
+        masked = buffers.get((len(masks),) + model_input.shape[1:])
+        np.multiply(model_input, masks, out=masked, casting='unsafe')
+        return masked
+
+    if explainer.preprocess_function is None:
+        return masked_batch_function
+    return lambda masks: explainer.preprocess_function(masked_batch_function(masks))
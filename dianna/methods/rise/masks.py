@@ -0,0 +1,117 @@
+import warnings
+import numpy as np
+from scipy.stats import qmc
+from skimage.transform import resize
+
+
+SAMPLERS = ('random', 'stratified', 'sobol', 'antithetic')
+
+
+def sample_grids(sampler, size, p_keep):
+    """Samples boolean grids of the given size (number of masks, cells...), where True means the cell is kept.
+
+    The properties of the sampler (e.g. the low discrepancy of Sobol points or the antithetic pairs) hold along
+    the first axis, over all cells of a mask, so the grids of all masks of an explanation are sampled at once.
+    """
+    n_masks, n_cells = size[0], int(np.prod(size[1:]))
+    if sampler == 'random':
+        return np.random.choice(a=(True, False), size=size, p=(p_keep, 1 - p_keep))
+    if sampler == 'stratified':
+        # keep the cells with the lowest random rank, so every mask keeps the same number of cells
+        ranks = np.random.random((n_masks, n_cells)).argsort(axis=1).argsort(axis=1)
+        grids = ranks < int(round(p_keep * n_cells))
+    elif sampler == 'sobol':
+        with warnings.catch_warnings():
+            # the balance properties of Sobol sequences hold best for powers of two, other sizes are still fine
+            warnings.simplefilter('ignore', UserWarning)
+            grids = qmc.Sobol(d=n_cells, scramble=True, seed=np.random.randint(2 ** 31)).random(n_masks) < p_keep
+    else:
+        uniform = np.random.random(((n_masks + 1) // 2, n_cells))
+        # interleave each sample with its antithetic counterpart
+        grids = np.stack([uniform, 1 - uniform], axis=1).reshape(-1, n_cells)[:n_masks] < p_keep
+    return grids.reshape(size)
+
+
+def sample_image_grids(sampler, input_size, p_keep, n_masks, feature_res, n_groups=None):  # pylint: disable=too-many-arguments
+    """Samples the grids and shifts of masks for images, which upscale_image_grids turns into masks.
+
+    The grids are much smaller than the masks, so those of all masks are sampled at once and the masks do not
+    depend on how they are split into batches. The grids of the channel groups of a mask are sampled as one
+    grid, so the sampler pairs masks rather than groups.
+
+    Returns:
+        Grids (np.ndarray of bool) of shape (n_masks, [n_groups, ] feature_res, ...), and the shift of each
+        grid along each spatial axis (np.ndarray of int) of shape (n_masks, [n_groups, ] spatial axes)
+    """
+    groups_shape = () if n_groups is None else (n_groups, )
+    cell_size = np.ceil(np.array(input_size) / feature_res).astype(int)
+    grids = sample_grids(sampler, (n_masks, ) + groups_shape + (feature_res, ) * len(input_size), p_keep)
+    shifts = np.random.randint(0, cell_size, size=(n_masks, ) + groups_shape + (len(input_size), ))
+    return grids, shifts
+
+
+def upscale_image_grids(grids, shifts, input_size):
+    """Upscales grids sampled by sample_image_grids to masks, with a last axis of size 1 or n_groups."""
+    input_size = tuple(input_size)
+    feature_res = grids.shape[-1]
+    up_size = (feature_res + 1) * np.ceil(np.array(input_size) / feature_res)
+    flat_grids = grids.reshape((-1, ) + grids.shape[-len(input_size):]).astype(np.float32)
+    flat_shifts = shifts.reshape(-1, len(input_size))
+    masks = np.empty((len(flat_grids), *input_size), dtype=np.float32)
+    for i, (grid, shift) in enumerate(zip(flat_grids, flat_shifts)):
+        # Linear upsampling and cropping
+        masks[i] = _upscale(grid, up_size)[tuple(slice(start, start + size)
+                                                 for start, size in zip(shift, input_size))]
+    if grids.ndim == len(input_size) + 1:
+        return masks.reshape(-1, *input_size, 1)
+    return np.moveaxis(masks.reshape(len(grids), grids.shape[1], *input_size), 1, -1)
+
+
+def sample_timeseries_grids(sampler, sequence_length, p_keep, n_masks, feature_res, n_channels=None):  # pylint: disable=too-many-arguments
+    """Samples the grids and shifts of masks for time series, which upscale_timeseries_grids turns into masks.
+
+    Like for images, the grids of all masks are sampled at once.
+
+    Returns:
+        Grids (np.ndarray of bool) of shape (n_masks, feature_res) or (n_masks, n_channels, feature_res),
+        and the shift of each grid (np.ndarray of int) of shape (n_masks, ) or (n_masks, n_channels)
+    """
+    channels_shape = () if n_channels is None else (n_channels, )
+    cell_size = int(np.ceil(sequence_length / feature_res))
+    grids = sample_grids(sampler, (n_masks, ) + channels_shape + (feature_res, ), p_keep)
+    shifts = np.random.randint(0, cell_size, size=(n_masks, ) + channels_shape)
+    return grids, shifts
+
+
+def upscale_timeseries_grids(grids, shifts, sequence_length):
+    """Upscales grids sampled by sample_timeseries_grids to masks of shape (n_masks, time[, channels])."""
+    feature_res = grids.shape[-1]
+    cell_size = int(np.ceil(sequence_length / feature_res))
+    masks = _upscale_sequences(grids.reshape(-1, feature_res).astype(np.float32), sequence_length, cell_size,
+                               shifts.reshape(-1))
+    if grids.ndim == 2:
+        return masks
+    return masks.reshape(grids.shape[:2] + (sequence_length, )).transpose(0, 2, 1)
+
+
+def _upscale(grid_i, up_size):
+    return resize(grid_i, up_size, order=1, mode='reflect', anti_aliasing=False)
+
+
+def _upscale_sequences(grids, length, cell_size, shifts):
+    """Linearly upsamples each 1-D grid to (n_cells + 1) * cell_size values and crops length values from its shift.
+
+    Only the cropped values are computed, for all grids at once.
+    """
+    n_cells = grids.shape[1]
+    up_size = (n_cells + 1) * cell_size
+    # position of each output value in the grid, with the same pixel-center alignment as _upscale
+    positions = np.arange(length, dtype=np.float32) + shifts.astype(np.float32)[:, np.newaxis]
+    positions = np.clip((positions + .5) * np.float32(n_cells / up_size) - .5, 0, n_cells - 1)
+    weights, left = np.modf(positions)
+    left = left.astype(np.int32)
+    # index the flattened grids, with one extra cell per grid so the right neighbour of the last cell exists
+    padded = np.concatenate([grids, grids[:, -1:]], axis=1).ravel()
+    left += (np.arange(len(grids), dtype=np.int32) * (n_cells + 1))[:, np.newaxis]
+    left_values = padded[left]
+    return left_values + (padded[left + 1] - left_values) * weights
@@ -0,0 +1,64 @@
+import numpy as np
+from skimage.filters import gaussian
+from dianna import utils
+from .images import determine_p_keep
+from .images import generate_masks
+from .images import get_masked_batch_function
+from .images import get_model_input
+from .images import prepare_image_data
+from .saliency import get_progress
+from .saliency import get_saliency_and_std_error
+
+
+def explain_image_multiresolution(explainer, model_or_function, input_data,  # pylint: disable=too-many-arguments,too-many-locals
+                                  labels=(0,), resolutions=(4, 8, 16), refine_fraction=.25,
+                                  batch_size=100, prefetch=0):
+    """See RISE.explain_image_multiresolution."""
+    model_input, channels_axis_index = get_model_input(explainer, input_data)
+    input_data, full_preprocess_function = prepare_image_data(explainer, model_input, channels_axis_index)
+    img_shape = input_data.shape[1:3]
+    model_runner = utils.get_function(model_or_function, runner_options=explainer.runner_options)
+    active_p_keep = determine_p_keep(
+        explainer, input_data, utils.get_function(model_runner, preprocess_function=full_preprocess_function),
+        batch_size=batch_size) if explainer.p_keep is None else explainer.p_keep
+    create_masked_batch = get_masked_batch_function(explainer, model_input, channels_axis_index, prefetch)
+    n_masks = max(1, explainer.n_masks // len(resolutions))
+
+    explainer.explained_labels = list(labels)
+    saliency, region = None, np.ones(img_shape, dtype=np.float32)
+    for level, feature_res in enumerate(resolutions):
+        # outside of the region to refine, the masks keep the image
+        masks = generate_masks(explainer, img_shape, active_p_keep, n_masks, feature_res=feature_res)
+        masks = masks * region[..., np.newaxis] + (1 - region[..., np.newaxis])
+        batches = ((masks[i:i + batch_size], create_masked_batch(masks[i:i + batch_size]))
+                   for i in range(0, n_masks, batch_size))
+        progress = get_progress(n_masks, batch_size, f'Explaining at resolution {feature_res}')
+        level_saliency, std_error = get_saliency_and_std_error(batches, model_runner, prefetch, labels,
+                                                               n_masks, active_p_keep, progress)
+        level_saliency, std_error = level_saliency.reshape(-1, *img_shape), std_error.reshape(-1, *img_shape)
+        saliency = level_saliency if saliency is None else _merge_detail(saliency, level_saliency, region)
+        if level + 1 < len(resolutions):
+            cell_size = np.ceil(max(img_shape) / resolutions[level + 1])
+            region = _get_refine_region(saliency, std_error, refine_fraction, cell_size)
+    explainer.masks = None
+    explainer.n_evaluated_masks = n_masks * len(resolutions)
+    return saliency
+
+
+def _get_refine_region(saliency, std_error, refine_fraction, cell_size):
+    """Selects the fraction of pixels with the highest saliency or uncertainty, as weights with soft edges."""
+    def scaled(values):
+        values = np.abs(values).max(axis=0)
+        return values / max(values.max(), 1e-12)
+
+    score = np.maximum(scaled(saliency), scaled(std_error))
+    region = (score >= np.quantile(score, 1 - refine_fraction)).astype(np.float32)
+    # soften the edges over about one cell of the next level, so the merged levels do not show seams
+    return np.clip(gaussian(region, sigma=cell_size / 2) * 2, 0, 1).astype(np.float32)
+
+
+def _merge_detail(coarse, fine, region):
+    """Merges a finer saliency map into a coarser one within the region, matching their mean in the region."""
+    weights_sum = max(region.sum(), 1e-12)
+    offset = ((coarse - fine) * region).sum(axis=(1, 2), keepdims=True) / weights_sum
+    return coarse * (1 - region) + (fine + offset) * region
@@ -0,0 +1,114 @@
+import numpy as np
+from dianna import utils
+
+
+def normalize(saliency, n_masks, p_keep):
+    """Normalizes salience by number of masks and keep probability."""
+    return saliency / n_masks / p_keep
+
+
+def select_labels(predictions, labels):
+    """Selects the prediction columns of the labels to explain, so only those are aggregated."""
+    if labels is None:
+        return predictions
+    return predictions[:, list(labels)]
+
+
+def get_progress(n_samples, batch_size, desc='Explaining'):
+    """Returns the progress bar options for running the model on n_samples in batches, see utils.prefetch_batches."""
+    return {'total': len(range(0, n_samples, batch_size)), 'desc': desc}
+
+
+def select_p_keep(p_keeps, stds):
+    """Returns the p_keep with the largest spread of predictions, of those evaluated within the time budget."""
+    best_p_keep = p_keeps[np.argmax(stds)]
+    if len(stds) < len(p_keeps):
+        print(f'Time budget reached while determining p_keep, only {len(stds)} values were tried')
+    print(f'Rise parameter p_keep was automatically determined at {best_p_keep}')
+    return best_p_keep
+
+
+def get_labels(runner, unmasked_input, labels, top_k=None, unmasked_prediction=None):  # pylint: disable=too-many-arguments
+    """Returns the labels to explain, which are the top_k predicted labels for the unmasked input if given.
+
+    The model is only run on the unmasked input if its prediction is not given.
+    """
+    if top_k is None:
+        return labels
+    if unmasked_prediction is None:
+        unmasked_prediction = runner(unmasked_input)
+    prediction = np.asarray(unmasked_prediction)[0]
+    return tuple(int(label) for label in np.argsort(prediction)[::-1][:top_k])
+
+
+def get_predictions(batches, runner, prefetch, budget=None, progress=None):
+    """Runs the model on the batches of masked input and returns all predictions."""
+    batches = utils.prefetch_batches(batches, prefetch, progress)
+    if budget is not None:
+        batches = budget.iterate(batches)
+    predictions = []
+    for batch in batches:
+        predictions.append(runner(batch))
+    predictions = np.concatenate(predictions)
+    return predictions
+
+
+def keep_evaluated_masks(explainer):
+    """Drops the masks that were not evaluated because the time budget ran out."""
+    explainer.n_evaluated_masks = len(explainer.predictions)
+    if explainer.n_evaluated_masks < len(explainer.masks):
+        print(f'Time budget reached, RISE explanation is based on {explainer.n_evaluated_masks} masks')
+        explainer.masks = explainer.masks[:explainer.n_evaluated_masks]
+
+
+def accumulate_saliency(explainer, batches, runner, prefetch, budget=None,  # pylint: disable=too-many-arguments
+                        labels=None, progress=None):
+    """Runs the model on (masks, masked input) batches and sums the masks weighted by the predictions."""
+    batches = utils.prefetch_batches(batches, prefetch, progress)
+    if budget is not None:
+        batches = budget.iterate(batches)
+    saliency = None
+    explainer.predictions = None
+    explainer.n_evaluated_masks = 0
+    for masks, masked in batches:
+        batch_saliency = select_labels(runner(masked), labels).T.dot(masks.reshape(len(masks), -1))
+        if saliency is None:
+            saliency = batch_saliency
+        else:
+            saliency += batch_saliency
+        explainer.n_evaluated_masks += len(masks)
+    if explainer.n_evaluated_masks < explainer.n_masks:
+        print(f'Time budget reached, RISE explanation is based on {explainer.n_evaluated_masks} masks')
+    return saliency
+
+
+def get_saliency_and_std_error(batches, runner, prefetch,  # pylint: disable=too-many-arguments
+                               labels, n_masks, p_keep, progress=None):
+    """Computes the RISE saliency and the standard error of this Monte-Carlo estimate for each pixel."""
+    first_moment, second_moment = 0, 0
+    for masks, masked in utils.prefetch_batches(batches, prefetch, progress):
+        predictions = select_labels(runner(masked), labels)
+        masks = masks.reshape(len(masks), -1)
+        first_moment = first_moment + predictions.T.dot(masks)
+        second_moment = second_moment + (predictions ** 2).T.dot(masks ** 2)
+    saliency = normalize(first_moment, n_masks, p_keep)
+    variance = np.maximum(second_moment / n_masks / p_keep ** 2 - saliency ** 2, 0)
+    return saliency, np.sqrt(variance / n_masks)
+
+
+def get_tile_starts(size, tile_size, stride):
+    """Returns the start positions of tiles along an axis, with the last tile aligned to the end of the axis."""
+    starts = list(range(0, size - tile_size + 1, stride))
+    if starts[-1] != size - tile_size:
+        starts.append(size - tile_size)
+    return starts
+
+
+def get_blend_ramp(size, overlap):
+    """Returns weights along an axis of a tile, which decrease linearly towards the edges within the overlap."""
+    return np.minimum(np.minimum(np.arange(1, size + 1), np.arange(size, 0, -1)), overlap + 1).astype(np.float32)
+
+
+def get_blend_window(tile_size, overlap):
+    """Returns the weights of the pixels of a tile, which decrease linearly towards the edges within the overlap."""
+    return np.minimum.outer(*[get_blend_ramp(size, overlap) for size in tile_size])
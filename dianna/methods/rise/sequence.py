@@ -0,0 +1,123 @@
+import numpy as np
+from dianna import utils
+from .images import determine_p_keep
+from .images import generate_masks
+from .images import prepare_image_data
+from .saliency import get_progress
+from .saliency import normalize
+from .saliency import select_labels
+
+
+def explain_image_sequence(explainer, model_or_function, frames, labels=(0,),  # pylint: disable=too-many-arguments,too-many-locals
+                           batch_size=100, prefetch=0, warm_start_masks=None, change_threshold=.05,
+                           keyframe_interval=10):
+    """See RISE.explain_image_sequence."""
+    if warm_start_masks is not None and warm_start_masks < 1:
+        # warm-started frames would not be evaluated on any mask
+        raise ValueError(f'warm_start_masks must be at least 1, got {warm_start_masks}')
+    frames = np.asarray(frames)
+    axis_labels = utils.get_axis_labels(frames[0], explainer.axis_labels, explainer.required_labels)
+    # axis index of the channels in a batch of frames
+    channels_axis_index = axis_labels.index('channels') + 1
+    input_data, full_preprocess_function = prepare_image_data(explainer, frames[:1], channels_axis_index)
+    img_shape = input_data.shape[1:-1]
+    model_runner = utils.get_function(model_or_function, runner_options=explainer.runner_options)
+    active_p_keep = determine_p_keep(
+        explainer, input_data, utils.get_function(model_runner, preprocess_function=full_preprocess_function),
+        batch_size=batch_size) if explainer.p_keep is None else explainer.p_keep
+    explainer.masks = generate_masks(explainer, img_shape, active_p_keep, explainer.n_masks)
+    explainer.explained_labels = list(labels)
+
+    explainer.keyframes = _get_keyframes(frames, warm_start_masks is not None, change_threshold, keyframe_interval)
+    n_warm = 0 if warm_start_masks is None else min(warm_start_masks, explainer.n_masks)
+    keyframe_saliency, warm_predictions = _run_frames(explainer, model_runner, frames, channels_axis_index, n_warm,
+                                                      batch_size, prefetch)
+
+    flat_masks = explainer.masks.reshape(explainer.n_masks, -1)
+    saliency = np.empty((len(frames), len(explainer.explained_labels)) + img_shape, dtype=np.float32)
+    for frame in range(len(frames)):
+        if frame in keyframe_saliency:
+            frame_saliency = normalize(keyframe_saliency[frame], explainer.n_masks, active_p_keep)
+        else:
+            change = (warm_predictions[frame] - warm_predictions[frame - 1]).T.dot(flat_masks[:n_warm])
+            frame_saliency = saliency[frame - 1].reshape(len(explainer.explained_labels), -1) + \
+                normalize(change, n_warm, active_p_keep)
+        saliency[frame] = frame_saliency.reshape(-1, *img_shape)
+    return saliency
+
+
+def _run_frames(explainer, model_runner, frames, channels_axis_index, n_warm,  # pylint: disable=too-many-arguments,too-many-locals
+                batch_size, prefetch):
+    """Runs the model on all masks for the keyframes and on the first n_warm masks for the other frames.
+
+    Returns:
+        the unnormalized saliency of each keyframe (dict), and the predictions for the first n_warm masks of
+        each frame (np.ndarray of shape frames x n_warm x labels), for the warm-start corrections
+    """
+    # the (frame, mask) pairs to evaluate, all masks for keyframes and the first n_warm masks for other frames
+    n_evaluated = np.where(np.isin(np.arange(len(frames)), explainer.keyframes), explainer.n_masks, n_warm)
+    frame_index = np.repeat(np.arange(len(frames)), n_evaluated)
+    mask_index = np.concatenate([np.arange(n) for n in n_evaluated])
+    explainer.n_evaluated_masks = len(mask_index)
+
+    create_masked_batch = _get_masked_frames_function(explainer, frames, channels_axis_index, prefetch)
+    batches = ((frame_index[i:i + batch_size], mask_index[i:i + batch_size],
+                create_masked_batch(frame_index[i:i + batch_size], mask_index[i:i + batch_size]))
+               for i in range(0, len(mask_index), batch_size))
+
+    flat_masks = explainer.masks.reshape(explainer.n_masks, -1)
+    keyframes = set(explainer.keyframes)
+    keyframe_saliency = {}
+    warm_predictions = np.zeros((len(frames), n_warm, len(explainer.explained_labels)))
+    for batch_frames, batch_masks, masked in utils.prefetch_batches(
+            batches, prefetch, get_progress(len(mask_index), batch_size, 'Explaining frames')):
+        predictions = select_labels(model_runner(masked), explainer.explained_labels)
+        is_warm = batch_masks < n_warm
+        warm_predictions[batch_frames[is_warm], batch_masks[is_warm]] = predictions[is_warm]
+        for frame in np.unique(batch_frames):
+            if frame in keyframes:
+                in_frame = batch_frames == frame
+                keyframe_saliency[frame] = keyframe_saliency.get(frame, 0) + \
+                    predictions[in_frame].T.dot(flat_masks[batch_masks[in_frame]])
+    return keyframe_saliency, warm_predictions
+
+
+def _get_keyframes(frames, warm_start, change_threshold, keyframe_interval):
+    """Returns the indices of the frames that are explained from scratch, the other frames are warm-started."""
+    if not warm_start:
+        return list(range(len(frames)))
+    keyframes = [0]
+    for frame in range(1, len(frames)):
+        keyframe = frames[keyframes[-1]].astype(np.float64)
+        change = np.linalg.norm(frames[frame] - keyframe) / max(np.linalg.norm(keyframe), 1e-12)
+        if change > change_threshold or frame - keyframes[-1] >= keyframe_interval:
+            keyframes.append(frame)
+    return keyframes
+
+
+def _get_masked_frames_function(explainer, frames, channel_axis_index, prefetch):
+    """Creates a function that masks a batch of (frame, mask) pairs, directly in the layout and dtype of the model.
+
+    Args:
+        explainer (RISE): The explainer, which holds the masks and the user's preprocessing function
+        frames (np.ndarray): Frames in the layout and dtype of the model, with the frames along the first axis
+        channel_axis_index (int): Axis index of the channels in a batch of frames
+        prefetch (int): Number of batches that are prepared ahead of the model
+
+    Returns:
+        Function that takes the frame index and mask index of each sample in a batch and returns
+        the masked input data, followed by running the users' preprocessing function
+    """
+    # the masks have the channel axis last, move it to where it is in the model input
+    masks = np.moveaxis(explainer.masks, -1, channel_axis_index)
+    buffers = utils.BatchBuffer.for_prefetch(frames.dtype, prefetch)
+
+    def masked_frames_function(frame_index, mask_index):
+        masked = buffers.get((len(frame_index),) + frames.shape[1:])
+        np.multiply(frames[frame_index], masks[mask_index], out=masked, casting='unsafe')
+        return masked
+
+    if explainer.preprocess_function is None:
+        return masked_frames_function
+    return lambda frame_index, mask_index: explainer.preprocess_function(masked_frames_function(frame_index,
+                                                                                                    mask_index))
@@ -0,0 +1,173 @@
+import numpy as np
+from dianna import utils
+from .masks import sample_grids
+from .saliency import get_blend_ramp
+from .saliency import get_labels
+from .saliency import get_predictions
+from .saliency import get_progress
+from .saliency import get_tile_starts
+from .saliency import keep_evaluated_masks
+from .saliency import normalize
+from .saliency import select_labels
+from .saliency import select_p_keep
+
+
+def explain_text(explainer, model_or_function, input_text, labels=(0,), batch_size=100,  # pylint: disable=too-many-arguments
+                 prefetch=0, time_budget=None, checkpoint=None, top_k=None):
+    """See RISE.explain_text."""
+    budget = utils.TimeBudget(time_budget)
+    checkpoint = utils.get_checkpoint(checkpoint)
+    if checkpoint is not None:
+        checkpoint.check_fixed_parameters(p_keep=explainer.p_keep is None, top_k=top_k is not None,
+                                          batch_size=batch_size == 'auto', time_budget=time_budget is not None)
+    runner = utils.get_function(model_or_function, preprocess_function=explainer.preprocess_function,
+                                runner_options=explainer.runner_options)
+    input_tokens = np.asarray(model_or_function.tokenizer(input_text))
+    text_length = len(input_tokens)
+    batch_size = utils.get_batch_size(batch_size, runner, lambda n: [input_text] * n,
+                                      model_or_function=model_or_function, input_shape=(text_length,),
+                                      max_batch_size=explainer.n_masks, time_budget=budget)
+    if checkpoint is not None:
+        # masks are generated from the same random state as the interrupted run
+        checkpoint.restore_random_state(np.random)
+        model_runner = checkpoint.wrap(utils.get_function(model_or_function, runner_options=explainer.runner_options))
+        runner = utils.get_function(model_runner, preprocess_function=explainer.preprocess_function)
+    explainer.explained_labels = get_labels(runner, [input_text], labels, top_k)
+    active_p_keep = determine_p_keep(explainer, input_tokens, runner, batch_size=batch_size, budget=budget) \
+        if explainer.p_keep is None else explainer.p_keep
+    # Expose masks for to make user inspection possible
+    explainer.masks = generate_masks(explainer, (text_length,), active_p_keep, explainer.n_masks)
+    batches = (create_masked_sentences(explainer, input_tokens, explainer.masks[i:i + batch_size])
+               for i in range(0, explainer.n_masks, batch_size))
+    explainer.predictions = get_predictions(batches, runner, prefetch, budget,
+                                            get_progress(explainer.n_masks, batch_size))
+    keep_evaluated_masks(explainer)
+    saliencies = select_labels(explainer.predictions, explainer.explained_labels).T \
+        .dot(explainer.masks.reshape(explainer.n_evaluated_masks, -1)).reshape(-1, text_length)
+    saliencies = normalize(saliencies, explainer.n_evaluated_masks, active_p_keep)
+    if checkpoint is not None:
+        checkpoint.remove()
+    return _reshape_result(input_tokens, saliencies)
+
+
+def explain_text_windows(explainer, model_or_function, input_text, window_size,  # pylint: disable=too-many-arguments,too-many-locals
+                         labels=(0,), overlap=None, batch_size=100, prefetch=0):
+    """See RISE.explain_text_windows."""
+    runner = utils.get_function(model_or_function, preprocess_function=explainer.preprocess_function,
+                                runner_options=explainer.runner_options)
+    input_tokens = np.asarray(model_or_function.tokenizer(input_text))
+    window_size = min(window_size, len(input_tokens))
+    overlap = window_size // 2 if overlap is None else overlap
+    if not 0 <= overlap < window_size:
+        raise ValueError(f'overlap must be at least 0 and smaller than the window size, got {overlap}')
+    starts = get_tile_starts(len(input_tokens), window_size, window_size - overlap)
+    windows = [input_tokens[start:start + window_size] for start in starts]
+
+    active_p_keep = determine_p_keep(explainer, windows[0], runner, batch_size=batch_size) \
+        if explainer.p_keep is None else explainer.p_keep
+    explainer.masks = generate_masks(explainer, (window_size, ), active_p_keep, explainer.n_masks)
+    explainer.explained_labels = list(labels)
+    explainer.n_evaluated_masks = explainer.n_masks
+    window_saliency = _get_window_saliencies(explainer, runner, windows, batch_size, prefetch)
+
+    ramp = get_blend_ramp(window_size, overlap)
+    saliency = np.zeros((len(explainer.explained_labels), len(input_tokens)))
+    weights_sum = np.zeros(len(input_tokens))
+    for start, window_saliency_i in zip(starts, normalize(window_saliency, explainer.n_masks, active_p_keep)):
+        saliency[:, start:start + window_size] += window_saliency_i * ramp
+        weights_sum[start:start + window_size] += ramp
+    offsets = _get_token_offsets(input_text, input_tokens)
+    return [list(zip(input_tokens, offsets, label_saliency)) for label_saliency in saliency / weights_sum]
+
+
+def _get_window_saliencies(explainer, runner, windows, batch_size, prefetch):  # pylint: disable=too-many-arguments
+    """Runs the model on all (window, mask) pairs, window by window, and sums the masks of each window."""
+    window_index = np.repeat(np.arange(len(windows)), explainer.n_masks)
+    mask_index = np.tile(np.arange(explainer.n_masks), len(windows))
+
+    def create_window_sentences(batch_windows, batch_masks):
+        return [sentence for window in np.unique(batch_windows)
+                for sentence in create_masked_sentences(explainer, windows[window],
+                                                        explainer.masks[batch_masks[batch_windows == window]])]
+
+    batches = ((window_index[i:i + batch_size], mask_index[i:i + batch_size],
+                create_window_sentences(window_index[i:i + batch_size], mask_index[i:i + batch_size]))
+               for i in range(0, len(mask_index), batch_size))
+    window_saliency = np.zeros((len(windows), len(explainer.explained_labels), len(windows[0])))
+    for batch_windows, batch_masks, sentences in utils.prefetch_batches(
+            batches, prefetch, get_progress(len(mask_index), batch_size, 'Explaining windows')):
+        predictions = select_labels(np.asarray(runner(sentences)), explainer.explained_labels)
+        for window in np.unique(batch_windows):
+            in_window = batch_windows == window
+            window_saliency[window] += predictions[in_window].T.dot(explainer.masks[batch_masks[in_window]])
+    return window_saliency
+
+
+def determine_p_keep(explainer, input_data, runner, n_masks=100, batch_size=50,  # pylint: disable=too-many-arguments
+                     budget=None):
+    """See n_mask default value https://github.com/dianna-ai/dianna/issues/24#issuecomment-1000152233."""
+    p_keeps = np.arange(0.1, 1.0, 0.1)
+    stds = []
+    for p_keep in p_keeps:
+        std = _calculate_mean_class_std(explainer, p_keep, runner, input_data, n_masks=n_masks,
+                                        batch_size=batch_size)
+        stds += [std]
+        if budget is not None and budget.exhausted:
+            break
+    return select_p_keep(p_keeps, stds)
+
+
+def _calculate_mean_class_std(explainer, p_keep, runner, input_data, n_masks,  # pylint: disable=too-many-arguments
+                              batch_size=50):
+    masks = generate_masks(explainer, input_data.shape, p_keep, n_masks)
+    masked = create_masked_sentences(explainer, input_data, masks)
+    predictions = []
+    for i in range(0, n_masks, batch_size):
+        current_input = masked[i:i + batch_size]
+        current_predictions = runner(current_input)
+        predictions.append(current_predictions.max(axis=1))
+    predictions = np.concatenate(predictions)
+    std_per_class = predictions.std()
+    return np.mean(std_per_class)
+
+
+def generate_masks(explainer, input_shape, p_keep, n_masks):
+    """Generates boolean masks of the tokens, where True means the token is kept."""
+    masks = sample_grids(explainer.sampler, (n_masks,) + input_shape, p_keep)
+    return masks
+
+
+def create_masked_sentences(explainer, tokens, masks):
+    """Joins the tokens of each mask into a sentence, with the masked tokens replaced by the mask string."""
+    tokens_masked = []
+    for mask in masks:
+        tokens_masked.append([token if keep else explainer.mask_string for token, keep in zip(tokens, mask)])
+    sentences = [" ".join(t) for t in tokens_masked]
+    return sentences
+
+
+def _reshape_result(input_tokens, saliencies):
+    word_lengths = [len(t) for t in input_tokens]
+    word_indices = [sum(word_lengths[:i]) + i for i in range(len(input_tokens))]
+    return [list(zip(input_tokens, word_indices, saliency)) for saliency in saliencies]
+
+
+def _get_token_offsets(text, tokens):
+    """Returns the character offset of each token in the text, searching from the end of the previous token.
+
+    Tokens that are not found literally, e.g. because the tokenizer changed their case, are searched for
+    case-insensitively. Tokens that are not found at all get the offset of the end of the previous token.
+    """
+    lower_text = text.lower()
+    offsets = []
+    position = 0
+    for token in tokens:
+        offset = text.find(token, position)
+        if offset < 0:
+            offset = lower_text.find(token.lower(), position)
+        if offset < 0:
+            offsets.append(position)
+        else:
+            offsets.append(offset)
+            position = offset + len(token)
+    return offsets
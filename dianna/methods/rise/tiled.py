@@ -0,0 +1,75 @@
+from pathlib import Path
+import numpy as np
+from tqdm import tqdm
+from dianna import utils
+from .images import determine_p_keep
+from .images import generate_masks
+from .images import get_full_preprocess_function
+from .images import get_masked_batch_function
+from .saliency import get_blend_window
+from .saliency import get_predictions
+from .saliency import get_tile_starts
+from .saliency import normalize
+from .saliency import select_labels
+
+
+def explain_image_tiled(explainer, model_or_function, input_data, tile_size,  # pylint: disable=too-many-arguments,too-many-locals
+                        labels=(0,), overlap=0, batch_size=100, prefetch=0, out=None):
+    """See RISE.explain_image_tiled."""
+    axis_labels = utils.get_axis_labels(input_data, explainer.axis_labels, explainer.required_labels)
+    channels_axis_index = axis_labels.index('channels')
+    # channels-last view, which does not load a memory-mapped image
+    image = np.moveaxis(input_data, channels_axis_index, -1)
+    img_shape, tile_size = image.shape[:2], tuple(tile_size)
+    if img_shape[0] < tile_size[0] or img_shape[1] < tile_size[1]:
+        raise ValueError(f'The image of shape {img_shape} is smaller than the tile size {tile_size}')
+    if not 0 <= overlap < min(tile_size):
+        raise ValueError(f'overlap must be at least 0 and smaller than the tile size, got {overlap}')
+
+    model_runner = utils.get_function(model_or_function, runner_options=explainer.runner_options)
+    labels = list(labels)
+    tiles = [(y, x) for y in get_tile_starts(img_shape[0], tile_size[0], tile_size[0] - overlap)
+             for x in get_tile_starts(img_shape[1], tile_size[1], tile_size[1] - overlap)]
+
+    active_p_keep = explainer.p_keep
+    if active_p_keep is None:
+        # tune p_keep on the first tile, as all tiles share the same masks
+        tile = np.asarray(image[:tile_size[0], :tile_size[1]])[np.newaxis]
+        runner = utils.get_function(model_runner, preprocess_function=get_full_preprocess_function(
+            explainer, channels_axis_index + 1, tile.dtype))
+        active_p_keep = determine_p_keep(explainer, tile, runner, batch_size=batch_size)
+    explainer.masks = generate_masks(explainer, tile_size, active_p_keep, explainer.n_masks)
+
+    saliency = _create_output(out, (len(labels), ) + img_shape)
+    weights_path = None if out is None else Path(out).with_suffix('.weights.npy')
+    weights_sum = _create_output(weights_path, img_shape)
+    window = get_blend_window(tile_size, overlap)
+    for y, x in tqdm(tiles, desc='Explaining tiles'):
+        # add batch axis and move the channels back to where they are in the model input
+        tile = np.asarray(image[y:y + tile_size[0], x:x + tile_size[1]])
+        tile_input = np.moveaxis(tile, -1, channels_axis_index)[np.newaxis]
+        create_masked_batch = get_masked_batch_function(explainer, tile_input, channels_axis_index + 1, prefetch)
+        batches = (create_masked_batch(explainer.masks[i:i + batch_size])
+                   for i in range(0, explainer.n_masks, batch_size))
+        predictions = get_predictions(batches, model_runner, prefetch)
+        tile_saliency = select_labels(predictions, labels).T.dot(explainer.masks.reshape(explainer.n_masks, -1))
+        tile_saliency = normalize(tile_saliency, explainer.n_masks, active_p_keep).reshape(-1, *tile_size)
+        saliency[:, y:y + tile_size[0], x:x + tile_size[1]] += tile_saliency * window
+        weights_sum[y:y + tile_size[0], x:x + tile_size[1]] += window
+
+    # normalize per block of rows, so a memory-mapped output is not loaded at once
+    for y in range(0, img_shape[0], tile_size[0]):
+        saliency[:, y:y + tile_size[0]] /= weights_sum[y:y + tile_size[0]]
+    if weights_path is not None:
+        saliency.flush()
+        del weights_sum
+        weights_path.unlink()
+    return saliency
+
+
+def _create_output(out, shape):
+    """Creates a zero-filled float32 array, memory-mapped to a .npy file if out is given."""
+    if out is None:
+        return np.zeros(shape, dtype=np.float32)
+    # a new .npy file is filled with zeros
+    return np.lib.format.open_memmap(out, mode='w+', dtype=np.float32, shape=shape)
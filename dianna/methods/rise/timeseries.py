@@ -0,0 +1,98 @@
+import numpy as np
+from dianna import utils
+from .masks import sample_timeseries_grids
+from .masks import upscale_timeseries_grids
+from .saliency import accumulate_saliency
+from .saliency import get_progress
+from .saliency import normalize
+
+
+def explain_timeseries(explainer, model_or_function, input_timeseries, labels=(0,),  # pylint: disable=too-many-arguments,too-many-locals
+                       batch_size=100, prefetch=0, mask_channels=False):
+    """See RISE.explain_timeseries."""
+    input_timeseries = np.asarray(input_timeseries)
+    if input_timeseries.ndim not in (1, 2):
+        raise ValueError(f'Expected a 1-D time series, optionally with a channel axis, '
+                         f'got an array of shape {input_timeseries.shape}')
+    required_labels = ('channels', ) if input_timeseries.ndim == 2 else ()
+    axis_labels = utils.get_axis_labels(input_timeseries, explainer.axis_labels or ['time'], required_labels)
+    channels_axis_index = axis_labels.index('channels') if 'channels' in axis_labels else None
+    time_axis_index = 1 - channels_axis_index if channels_axis_index is not None else 0
+    sequence_length = input_timeseries.shape[time_axis_index]
+    n_channels = input_timeseries.shape[channels_axis_index] if mask_channels and channels_axis_index is not None \
+        else None
+
+    model_input = input_timeseries[np.newaxis]
+    runner = utils.get_function(model_or_function, preprocess_function=explainer.preprocess_function,
+                                runner_options=explainer.runner_options)
+    batch_size = utils.get_batch_size(batch_size, runner, lambda n: np.repeat(model_input, n, axis=0),
+                                      model_or_function=model_or_function, input_shape=model_input.shape[1:],
+                                      max_batch_size=explainer.n_masks)
+    create_masked_batch = _get_masked_timeseries_function(model_input, time_axis_index, channels_axis_index,
+                                                          prefetch)
+    active_p_keep = _determine_p_keep(explainer, runner, create_masked_batch, sequence_length, n_channels,
+                                      batch_size=batch_size) if explainer.p_keep is None else explainer.p_keep
+
+    explainer.masks = None
+    explainer.explained_labels = list(labels)
+    grids, shifts = sample_timeseries_grids(explainer.sampler, sequence_length, active_p_keep, explainer.n_masks,
+                                            explainer.feature_res, n_channels)
+    mask_batches = (upscale_timeseries_grids(grids[i:i + batch_size], shifts[i:i + batch_size], sequence_length)
+                    for i in range(0, explainer.n_masks, batch_size))
+    batches = ((masks, create_masked_batch(masks)) for masks in mask_batches)
+    saliency = accumulate_saliency(explainer, batches, runner, prefetch, labels=explainer.explained_labels,
+                                   progress=get_progress(explainer.n_masks, batch_size))
+    result_shape = (sequence_length, ) if n_channels is None else (sequence_length, n_channels)
+    return normalize(saliency, explainer.n_evaluated_masks, active_p_keep).reshape(-1, *result_shape)
+
+
+def generate_masks(explainer, sequence_length, p_keep, n_masks, n_channels=None):
+    """See RISE.generate_masks_for_timeseries."""
+    grids, shifts = sample_timeseries_grids(explainer.sampler, sequence_length, p_keep, n_masks,
+                                            explainer.feature_res, n_channels)
+    return upscale_timeseries_grids(grids, shifts, sequence_length)
+
+
+def _determine_p_keep(explainer, runner, create_masked_batch,  # pylint: disable=too-many-arguments
+                      sequence_length, n_channels, n_masks=100, batch_size=50):
+    """See n_mask default value https://github.com/dianna-ai/dianna/issues/24#issuecomment-1000152233."""
+    p_keeps = np.arange(0.1, 1.0, 0.1)
+    stds = []
+    for p_keep in p_keeps:
+        predictions = []
+        grids, shifts = sample_timeseries_grids(explainer.sampler, sequence_length, p_keep, n_masks,
+                                                explainer.feature_res, n_channels)
+        for i in range(0, n_masks, batch_size):
+            masks = upscale_timeseries_grids(grids[i:i + batch_size], shifts[i:i + batch_size], sequence_length)
+            predictions.append(runner(create_masked_batch(masks)).max(axis=1))
+        stds += [np.concatenate(predictions).std()]
+    best_p_keep = p_keeps[np.argmax(stds)]
+    print(f'Rise parameter p_keep was automatically determined at {best_p_keep}')
+    return best_p_keep
+
+
+def _get_masked_timeseries_function(model_input, time_axis_index, channels_axis_index, prefetch):
+    """Creates a function that masks the time series, directly in the layout and dtype of the model.
+
+    Args:
+        model_input (np.ndarray): Input data in the layout and dtype of the model, including batch axis
+        time_axis_index (int): Axis index of the time in the input data, without batch axis
+        channels_axis_index (int or None): Axis index of the channels in the input data, without batch axis
+        prefetch (int): Number of batches that are prepared ahead of the model
+
+    Returns:
+        Function that takes a batch of masks of shape (batch, time) or (batch, time, channels)
+        and returns the masked input data
+    """
+    buffers = utils.BatchBuffer.for_prefetch(model_input.dtype, prefetch)
+
+    def masked_timeseries_function(masks):
+        if masks.ndim == 3:
+            masks = np.moveaxis(masks, (1, 2), (time_axis_index + 1, channels_axis_index + 1))
+        elif channels_axis_index is not None:
+            masks = np.expand_dims(masks, channels_axis_index + 1)
+        masked = buffers.get((len(masks),) + model_input.shape[1:])
+        np.multiply(model_input, masks, out=masked, casting='unsafe')
+        return masked
+
+    return masked_timeseries_function
@@ -1,6 +1,28 @@
 # flake8: noqa: F401
+from .batch_buffer import BatchBuffer
+from .batching import clear_batch_size_cache
+from .batching import get_batch_size
+from .batching import prefetch_batches
+from .batching import run_in_batches
+from .checkpoint import Checkpoint
+from .checkpoint import get_checkpoint
+from .ensemble import ModelEnsemble
+from .memory import MemoryBudget
+from .memory import parse_memory_size
+from .misc import accepts_var_keyword
+from .misc import warn_inapplicable_kwargs
+from .misc import get_axis_labels
 from .misc import get_function
 from .misc import get_kwargs_applicable_to_function
 from .misc import move_axis
 from .misc import onnx_model_node_loader
 from .misc import to_xarray
+from .offline import PerturbationExport
+from .offline import PredictionImport
+from .results import ResultsReader
+from .results import ResultsWriter
+from .text_runner import TextModelRunner
+from .time_budget import TimeBudget
+from .time_budget import measure_seconds_per_sample
+from .vocabulary import Vocabulary
+from .vocabulary import load_vocabulary
@@ -0,0 +1,53 @@
+import numpy as np
+
+
+class BatchBuffer:
+    """Pool of preallocated, C-contiguous arrays that are reused to hold batches of model input."""
+    def __init__(self, dtype, n_buffers=1):
+        """
+        Creates an (empty) pool of buffers. Memory is allocated on first use.
+
+        Args:
+            dtype (type): Data type of the buffers (e.g. np.float32)
+            n_buffers (int): Number of buffers to cycle through. A batch stays valid until
+                             `n_buffers` more batches have been requested, so when batches are
+                             prepared ahead of the model (see prefetch_batches) this should be at
+                             least the number of prefetched batches plus two.
+
+        Examples:
+            >>> buffers = BatchBuffer(np.float32)
+            >>> out = buffers.get((batch_size, 1, 28, 28))
+            >>> np.multiply(input_data, masks, out=out, casting='unsafe')
+        """
+        self.dtype = dtype
+        self._buffers = [None] * n_buffers
+        self._index = 0
+
+    @classmethod
+    def for_prefetch(cls, dtype, prefetch):
+        """Creates a pool for batches that are prepared ahead of the model with prefetch_batches.
+
+        One buffer is in use by the model and one is being filled, next to the prefetched ones.
+
+        Args:
+            dtype (type): Data type of the buffers
+            prefetch (int): Number of batches that are prepared ahead of the model
+        """
+        return cls(dtype, n_buffers=prefetch + 2)
+
+    def get(self, shape):
+        """Returns a C-contiguous array of the given shape, reusing previously allocated memory where possible.
+
+        Args:
+            shape (tuple): Shape of the batch, the first axis being the batch axis
+
+        Returns:
+            Uninitialized array (np.ndarray)
+        """
+        buffer = self._buffers[self._index]
+        if buffer is None or buffer.shape[1:] != tuple(shape[1:]) or len(buffer) < shape[0]:
+            buffer = np.empty(shape, dtype=self.dtype)
+            self._buffers[self._index] = buffer
+        self._index = (self._index + 1) % len(self._buffers)
+        # slicing the first axis keeps the array C-contiguous
+        return buffer[:shape[0]]
@@ -0,0 +1,210 @@
+import os
+import queue
+import threading
+import time
+import weakref
+import numpy as np
+from tqdm import tqdm
+
+
+# candidate batch sizes probed when batch_size="auto"
+DEFAULT_BATCH_SIZE_CANDIDATES = (1, 8, 16, 32, 64, 128, 256)
+
+# cache of tuned batch sizes, key is (model key, shape of a single sample), see _get_model_key
+_batch_size_cache = {}
+
+
+def get_batch_size(batch_size, runner, make_batch, model_or_function=None,  # pylint: disable=too-many-arguments
+                   input_shape=None, max_batch_size=None, max_memory=None,
+                   candidates=DEFAULT_BATCH_SIZE_CANDIDATES, time_budget=None):
+    """Resolves the batch size to use for model calls, tuning it if batch_size is "auto".
+
+    When tuning, the runner is called with batches of increasing size. The batch size
+    that gives the highest throughput (samples/second) is selected. The choice is cached
+    per model and input shape, so the probing is only done on the first call.
+
+    Args:
+        batch_size (int or "auto"): Requested batch size. Integers are returned unchanged.
+        runner (callable): Function that runs the model on a batch of data
+        make_batch (callable): Function that returns a batch of model input of the given size
+        model_or_function (callable or str, optional): Model used as cache key. If None, or a callable that
+                                                       cannot be weakly referenced, the result is not cached.
+        input_shape (tuple, optional): Shape of a single sample, used as cache key
+        max_batch_size (int, optional): Upper limit to the batch size, e.g. the total number of samples
+        max_memory (int, optional): Maximum size in bytes of a single batch of model input
+        candidates (tuple): Batch sizes to probe
+        time_budget (utils.TimeBudget, optional): Budget the probing is charged to. Probing stops when it runs
+                                                  out, and the best batch size so far is used but not cached.
+
+    Returns:
+        Batch size (int)
+    """
+    if batch_size != 'auto':
+        return batch_size
+
+    cache_key = None
+    model_key = _get_model_key(model_or_function)
+    if model_key is not None:
+        cache_key = (model_key, tuple(input_shape) if input_shape is not None else None)
+        if cache_key in _batch_size_cache:
+            return _limit_batch_size(_batch_size_cache[cache_key], max_batch_size)
+
+    best_batch_size, completed = _probe_batch_size(runner, make_batch, max_batch_size, max_memory, candidates,
+                                                   time_budget)
+    if cache_key is not None and completed:
+        _batch_size_cache[cache_key] = best_batch_size
+    return best_batch_size
+
+
+def clear_batch_size_cache():
+    """Removes all tuned batch sizes from the cache."""
+    _batch_size_cache.clear()
+
+
+def _get_model_key(model_or_function):
+    """Returns the key of a model in the batch size cache: its file path, or a weak reference to a callable.
+
+    A callable is not keyed by its id(), as the id of a garbage collected function can be reused by another model.
+    Its cache entries are removed when it is garbage collected instead. None is returned if there is no model, or
+    if the callable cannot be weakly referenced or hashed, in which case the batch size is not cached.
+    """
+    if model_or_function is None:
+        return None
+    if isinstance(model_or_function, (str, os.PathLike)):
+        return os.fspath(model_or_function)
+    try:
+        model_key = weakref.ref(model_or_function, _forget_model)
+        hash(model_key)
+    except TypeError:
+        return None
+    return model_key
+
+
+def _forget_model(model_key):
+    """Removes the cache entries of a garbage collected model."""
+    for cache_key in [cache_key for cache_key in _batch_size_cache if cache_key[0] is model_key]:
+        del _batch_size_cache[cache_key]
+
+
+def run_in_batches(runner, input_data, batch_size, preprocess_function=None, prefetch=0):  # pylint: disable=too-many-arguments
+    """Runs the model on input data in batches of the given size and concatenates the predictions.
+
+    Args:
+        runner (callable): Function that runs the model on a batch of data
+        input_data (NumPy-compatible array or list): Data to run the model on
+        batch_size (int): Batch size. If None, all data is given to the runner at once.
+        preprocess_function (callable, optional): Function to prepare each batch before running the model
+        prefetch (int): Number of batches to prepare in a background thread while the model is running.
+                        If 0, batches are prepared and run sequentially.
+
+    Returns:
+        Concatenated predictions
+    """
+    if batch_size is None:
+        batch_size = len(input_data)
+    if preprocess_function is None:
+        def preprocess_function(data):
+            return data
+    batches = (preprocess_function(input_data[i:i + batch_size]) for i in range(0, len(input_data), batch_size))
+    return np.concatenate([runner(batch) for batch in prefetch_batches(batches, prefetch)])
+
+
+def prefetch_batches(batches, prefetch, progress=None):
+    """Iterates over batches, preparing up to `prefetch` batches ahead in a background thread.
+
+    This allows the CPU-side work of creating the batches (e.g. masking the input)
+    to overlap with running the model on the previous batch.
+
+    Args:
+        batches (iterable): Iterable that creates the batches
+        prefetch (int): Maximum number of batches to prepare ahead. If 0, no background thread is used.
+        progress (dict, optional): Keyword arguments of a tqdm progress bar, e.g. total and desc. The bar
+                                   advances when the next batch is requested, so it follows the batches
+                                   the model has finished rather than those prepared ahead.
+
+    Returns:
+        Iterator over the batches, in order
+    """
+    prepared = _prefetch_batches(batches, prefetch)
+    return prepared if progress is None else tqdm(prepared, **progress)
+
+
+def _prefetch_batches(batches, prefetch):
+    if not prefetch:
+        yield from batches
+        return
+
+    prepared = queue.Queue(maxsize=prefetch)
+    done = object()
+    stop = threading.Event()
+
+    def producer():
+        try:
+            for batch in batches:
+                if stop.is_set():
+                    return
+                prepared.put((batch, None))
+            prepared.put((done, None))
+        except Exception as e:  # pylint: disable=broad-except
+            # forward the error to the consumer
+            prepared.put((done, e))
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch, error = prepared.get()
+            if error is not None:
+                raise error
+            if batch is done:
+                return
+            yield batch
+    finally:
+        # unblock the producer if the consumer stopped early
+        stop.set()
+        while thread.is_alive():
+            try:
+                prepared.get_nowait()
+            except queue.Empty:
+                thread.join(timeout=.01)
+
+
+def _probe_batch_size(runner, make_batch, max_batch_size, max_memory, candidates,  # pylint: disable=too-many-arguments
+                      time_budget=None):
+    """Measures the throughput of the runner for each candidate batch size.
+
+    Returns:
+        The best batch size, and whether all applicable candidates were probed within the time budget
+    """
+    sample_bytes = getattr(make_batch(1), 'nbytes', None)
+    candidates = sorted(candidates)
+    # the first model call often includes one-time costs (e.g. creating a session), so do not time it
+    runner(make_batch(candidates[0]))
+
+    best_batch_size = candidates[0]
+    best_throughput = 0
+    for candidate in candidates:
+        if time_budget is not None and time_budget.exhausted:
+            return best_batch_size, False
+        if max_batch_size is not None and candidate > max_batch_size:
+            break
+        if max_memory is not None and sample_bytes is not None and candidate * sample_bytes > max_memory:
+            break
+        batch = make_batch(candidate)
+        start = time.perf_counter()
+        try:
+            runner(batch)
+        except Exception:  # pylint: disable=broad-except
+            # the model cannot handle this batch size (e.g. out of memory or a fixed batch axis),
+            # so larger ones will not work either
+            break
+        throughput = candidate / max(time.perf_counter() - start, 1e-9)
+        if throughput > best_throughput:
+            best_batch_size, best_throughput = candidate, throughput
+    return best_batch_size, True
+
+
+def _limit_batch_size(batch_size, max_batch_size):
+    if max_batch_size is None:
+        return batch_size
+    return min(batch_size, max_batch_size)
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import pickle
+import time
+from pathlib import Path
+import numpy as np
+
+
+class Checkpoint:
+    """Saves the progress of an explanation to a file at intervals, so an interrupted explanation can be resumed.
+
+    The checkpoint holds the state of the random number generators at the start of the explanation and
+    the model predictions obtained so far, indexed by a hash of each input sample. When resuming, the
+    random number generators are restored so the same perturbations are generated, and the model is
+    only run on samples that were not evaluated before. This yields the same result as an
+    uninterrupted run, as long as the model gives the same output for the same input. The perturbations
+    do not depend on the batch size, so a run can be resumed with another batch size or memory budget.
+    Explainers given a checkpoint file remove it when the explanation is done.
+
+    Examples:
+        >>> heatmaps = dianna.explain_image(model, image, 'RISE', checkpoint='rise_checkpoint.pkl')
+    """
+    # number of outputs of the model if it is known without running the model, which is the case for offline runs
+    n_outputs = None
+
+    def __init__(self, path, interval=60):
+        """
+        Opens a checkpoint. If the checkpoint file exists, its state is loaded to resume from.
+
+        Args:
+            path (str or Path): Checkpoint file
+            interval (float): Minimum time in seconds between writing the checkpoint file
+        """
+        self.path = Path(path)
+        self.interval = interval
+        self.n_reused = 0
+        self._random_states = None
+        self._predictions = {}
+        self._last_save = time.monotonic()
+        if self.path.exists():
+            with open(self.path, 'rb') as checkpoint_file:
+                state = pickle.load(checkpoint_file)
+            self._random_states = state['random_states']
+            self._predictions = state['predictions']
+
+    @property
+    def n_predictions(self):
+        """Number of distinct samples with a stored model prediction."""
+        return len(self._predictions)
+
+    def restore_random_state(self, *generators):
+        """Restores the random number generators to their state at the start of the interrupted explanation.
+
+        If there is nothing to resume from, the current state of the generators is stored instead.
+
+        Args:
+            generators: Objects with get_state and set_state methods, such as np.random or a
+                        np.random.RandomState instance, in the same order in every run
+        """
+        if self._random_states is None:
+            self._random_states = [generator.get_state() for generator in generators]
+            self.save()
+        else:
+            for generator, state in zip(generators, self._random_states):
+                generator.set_state(state)
+
+    def check_fixed_parameters(self, **tuned):
+        """Checks that no explainer parameter needs the model to be run, which only matters for an export.
+
+        Args:
+            tuned: For each parameter name, whether the explainer runs the model to tune or apply it
+        """
+
+    def wrap(self, runner):
+        """Returns a function that runs the model, reusing and storing predictions in the checkpoint.
+
+        Args:
+            runner (callable): Function that runs the model on a batch of samples
+
+        Returns:
+            Function with the same signature as runner
+        """
+        def checkpointed_runner(batch):
+            keys = [_hash_sample(sample) for sample in batch]
+            # only the new samples are evaluated, so batches may be split differently than in the interrupted run
+            missing = [i for i, key in enumerate(keys) if key not in self._predictions]
+            self.n_reused += len(keys) - len(missing)
+            if missing:
+                new_samples = batch[missing] if isinstance(batch, np.ndarray) else [batch[i] for i in missing]
+                for i, prediction in zip(missing, runner(new_samples)):
+                    self._predictions[keys[i]] = prediction
+                if time.monotonic() - self._last_save >= self.interval:
+                    self.save()
+            return np.stack([self._predictions[key] for key in keys])
+
+        return checkpointed_runner
+
+    def save(self):
+        """Writes the checkpoint file atomically, so an interruption never leaves a corrupt file behind."""
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'wb') as checkpoint_file:
+            pickle.dump({'random_states': self._random_states, 'predictions': self._predictions}, checkpoint_file)
+        os.replace(temp_path, self.path)
+        self._last_save = time.monotonic()
+
+    def remove(self):
+        """Removes the checkpoint file, e.g. when the explanation has finished."""
+        if self.path.exists():
+            self.path.unlink()
+
+
+def get_checkpoint(checkpoint):
+    """Returns a Checkpoint for a path to a checkpoint file. None and Checkpoint instances are returned unchanged."""
+    if checkpoint is None or isinstance(checkpoint, Checkpoint):
+        return checkpoint
+    return Checkpoint(checkpoint)
+
+
+def _hash_sample(sample):
+    """Returns a hash of a single model input sample, which can be a string or array."""
+    if isinstance(sample, str):
+        data = sample.encode('utf-8')
+    else:
+        sample = np.ascontiguousarray(sample)
+        data = str(sample.dtype).encode() + str(sample.shape).encode() + sample.tobytes()
+    return hashlib.blake2b(data, digest_size=16).digest()
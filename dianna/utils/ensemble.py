@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .misc import get_function
+
+
+class ModelEnsemble:
+    """Runs several models on the same batch of data, to explain all of them with the same perturbations.
+
+    The output of the ensemble holds the requested labels of each model next to each other: the labels of
+    the first model, then those of the second model, etc. Use split to get the results of each model back.
+    A parallel ensemble keeps its threads between batches, use it as a context manager or call close to
+    stop them.
+    """
+    def __init__(self, models, labels, runner_options=None, parallel=False):
+        """
+        Creates an ensemble of models.
+
+        Args:
+            models (list): Functions that run a model or paths to ONNX models on disk
+            labels (tuple): Labels to take from the output of each model
+            runner_options (dict, optional): ONNX Runtime session options for models given as a path
+            parallel (bool): Whether to run the models in parallel threads
+        """
+        self.runners = [get_function(model, runner_options=runner_options) for model in models]
+        self.labels = list(labels)
+        self.parallel = parallel
+        # created on the first parallel batch and reused for all batches
+        self._executor = None
+        # text explainers tokenize the input with the tokenizer of the model
+        tokenizer = getattr(models[0], 'tokenizer', None)
+        if tokenizer is not None:
+            self.tokenizer = tokenizer
+
+    @property
+    def n_outputs(self):
+        """Number of outputs of the ensemble, which is the number of labels times the number of models."""
+        return len(self.runners) * len(self.labels)
+
+    def __call__(self, input_data):
+        if self.parallel and len(self.runners) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=len(self.runners))
+            outputs = list(self._executor.map(lambda runner: runner(input_data), self.runners))
+        else:
+            outputs = [runner(input_data) for runner in self.runners]
+        return np.concatenate([np.asarray(output)[:, self.labels] for output in outputs], axis=1)
+
+    def split(self, results):
+        """Splits the results of an explanation of the ensemble, with one result per output, per model.
+
+        Args:
+            results (sequence): One result per output of the ensemble, e.g. a heatmap per output
+
+        Returns:
+            List with the results of each model, one result per label
+        """
+        n_labels = len(self.labels)
+        return [results[i:i + n_labels] for i in range(0, self.n_outputs, n_labels)]
+
+    def close(self):
+        """Stops the threads of a parallel ensemble. The ensemble starts new threads if it is called again."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,93 @@
+import re
+import numpy as np
+
+
+_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+
+
+class MemoryBudget:
+    """Keeps track of the memory used by the large arrays of an explanation, to size chunks within a memory budget.
+
+    Arrays that are needed regardless of the chunk sizes, such as the input data, are reserved first.
+    The remaining memory is then divided into chunks, e.g. the number of samples in a batch.
+
+    This is what the max_memory argument of the explainers sets up: the batch size is reduced to fit, and a
+    MemoryError is raised before running the model if even a single perturbed input does not fit.
+    """
+    def __init__(self, max_memory=None):
+        """
+        Creates a memory budget.
+
+        Args:
+            max_memory (int or str, optional): Memory budget in bytes, or a string such as '2GB'.
+                                               If None, there is no memory limit.
+        """
+        self.max_memory = parse_memory_size(max_memory)
+        self.reserved = 0
+
+    @property
+    def available(self):
+        """Memory in bytes that is not reserved yet, None if there is no memory limit."""
+        if self.max_memory is None:
+            return None
+        return self.max_memory - self.reserved
+
+    def fits(self, nbytes):
+        """Returns whether an array of nbytes fits in the available memory."""
+        return self.max_memory is None or nbytes <= self.available
+
+    def reserve(self, nbytes, description):
+        """Reserves memory for an array, raising a MemoryError if it does not fit in the budget.
+
+        Args:
+            nbytes (int): Size of the array in bytes
+            description (str): Description of the array, used in the error message
+        """
+        if not self.fits(nbytes):
+            raise MemoryError(f'{description} needs {format_memory_size(nbytes)}, but only '
+                              f'{format_memory_size(max(self.available, 0))} of the memory budget of '
+                              f'{format_memory_size(self.max_memory)} is available')
+        self.reserved += int(nbytes)
+
+    def chunk_size(self, bytes_per_item, max_items=None, description='a single sample'):
+        """Returns the largest number of items that fit in the available memory.
+
+        Args:
+            bytes_per_item (int): Memory in bytes needed for each item in a chunk
+            max_items (int, optional): Upper limit to the chunk size
+            description (str): Description of an item, used in the error message
+
+        Returns:
+            Chunk size (int), or max_items if there is no memory limit
+        """
+        if self.max_memory is None:
+            return max_items
+        chunk_size = int(self.available // max(bytes_per_item, 1))
+        if chunk_size < 1:
+            # raises a MemoryError with a description of what did not fit
+            self.reserve(bytes_per_item, description)
+        if max_items is not None:
+            chunk_size = min(chunk_size, max_items)
+        return chunk_size
+
+
+def parse_memory_size(memory_size):
+    """Converts a memory size such as '512MB' or '2GB' to a number of bytes. Integers are returned unchanged."""
+    if memory_size is None or isinstance(memory_size, (int, np.integer)):
+        return memory_size
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?B?)\s*', str(memory_size).upper())
+    if match is None:
+        raise ValueError(f'Invalid memory size: {memory_size}, expected a number of bytes or e.g. "2GB"')
+    number, unit = match.groups()
+    if unit and not unit.endswith('B'):
+        unit += 'B'
+    return int(float(number) * _UNITS[unit])
+
+
+def format_memory_size(nbytes):
+    """Formats a number of bytes in a human-readable way, e.g. '1.5 GB'."""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(nbytes) < 1024 or unit == 'GB':
+            break
+        nbytes /= 1024
+    return f'{nbytes:.1f} {unit}' if unit != 'B' else f'{int(nbytes)} B'
@@ -1,7 +1,8 @@
 import inspect
+import warnings
 
 
-def get_function(model_or_function, preprocess_function=None):
+def get_function(model_or_function, preprocess_function=None, runner_options=None):
     """Converts input to callable function.
 
     Any keyword arguments are given to the ModelRunner class if the input is a model path.
@@ -10,10 +11,13 @@ def get_function(model_or_function, preprocess_function=None):
         model_or_function: Can be either model path or function.
             If input is a function, the function is returned unchanged.
         preprocess_function: function to be run to preprocess the data
+        runner_options (dict, optional): ONNX Runtime session options, used if the input is a model path.
+                                         See SimpleModelRunner for the available options.
     """
     from dianna.utils.onnx_runner import SimpleModelRunner  # pylint: disable=import-outside-toplevel
     if isinstance(model_or_function, str):
-        runner = SimpleModelRunner(model_or_function, preprocess_function=preprocess_function)
+        runner = SimpleModelRunner(model_or_function, preprocess_function=preprocess_function,
+                                   runner_options=runner_options)
     elif callable(model_or_function):
         if preprocess_function is None:
             runner = model_or_function
@@ -32,22 +36,65 @@ def get_kwargs_applicable_to_function(function, kwargs):
     argument, this function should not be necessary (provided the function
     handles `**kwargs` robustly).
     """
-    return {key: value for key, value in kwargs.items()
-            if key in inspect.getfullargspec(function).args}
+    names = _get_keyword_names(function)
+    return {key: value for key, value in kwargs.items() if key in names}
 
 
-def to_xarray(data, axis_labels, required_labels=None):
-    """Converts numpy data and axes labels to an xarray object."""
-    if isinstance(axis_labels, dict):
+def warn_inapplicable_kwargs(kwargs, *functions, name=None):
+    """Warns about keyword arguments that none of the functions accept, as they are ignored.
+
+    Args:
+        kwargs (dict): Keyword arguments
+        functions (callable): Functions the keyword arguments are given to
+        name (str, optional): Name of the caller in the warning, by default the first function
+    """
+    names = set().union(*(_get_keyword_names(function) for function in functions))
+    unused = sorted(set(kwargs) - names)
+    if unused:
+        name = functions[0].__qualname__ if name is None else name
+        warnings.warn(f'{name} ignores unsupported keyword arguments: {", ".join(unused)}', stacklevel=3)
+
+
+def accepts_var_keyword(function):
+    """Returns whether a function accepts arbitrary keyword arguments (**kwargs)."""
+    return any(parameter.kind == inspect.Parameter.VAR_KEYWORD
+               for parameter in inspect.signature(function).parameters.values())
+
+
+def _get_keyword_names(function):
+    """Returns the names of the arguments of a function that can be given as keyword, following decorators."""
+    return {name for name, parameter in inspect.signature(function).parameters.items()
+            if parameter.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)}
+
+
+def get_axis_labels(data, axis_labels, required_labels=None):
+    """Resolves axis labels to a tuple with the name of each axis of the data.
+
+    This does not require xarray: explainers use the result to find axis positions once,
+    after which they work on plain numpy arrays.
+
+    Args:
+        data (NumPy-compatible array or DataArray): Data the labels apply to. If it is an xarray
+                                                    DataArray and no axis labels are given, its
+                                                    dimension names are used.
+        axis_labels (dict/list): If a dict, key,value pairs of axis index, name.
+                                 If a list, the name of each axis where the index
+                                 in the list is the axis index
+        required_labels (iterable, optional): Labels that must be present
+
+    Returns:
+        tuple of axis labels
+    """
+    if not axis_labels and hasattr(data, 'dims'):
+        labels = list(data.dims)
+    elif isinstance(axis_labels, dict):
         # key = axis index, value = label
         # not all axes have to be present in the input, but we need to provide
         # a name for each axis
         # first ensure negative indices are converted to positive ones
-        indices = list(axis_labels.keys())
-        for index in indices:
-            if index < 0:
-                axis_labels[data.ndim + index] = axis_labels.pop(index)
-        labels = [axis_labels[index] if index in axis_labels else f'dim_{index}' for index in range(data.ndim)]
+        positive_axis_labels = {(data.ndim + index if index < 0 else index): label
+                                for index, label in axis_labels.items()}
+        labels = [positive_axis_labels.get(index, f'dim_{index}') for index in range(data.ndim)]
     else:
         labels = list(axis_labels)
 
@@ -56,6 +103,13 @@ def to_xarray(data, axis_labels, required_labels=None):
         for label in required_labels:
             assert label in labels, f'Required axis-label missing: {label}'
 
+    return tuple(labels)
+
+
+def to_xarray(data, axis_labels, required_labels=None):
+    """Converts numpy data and axes labels to an xarray object."""
+    labels = get_axis_labels(data, axis_labels, required_labels)
+
     # import here because it's slow
     import xarray as xr  # pylint: disable=import-outside-toplevel
 
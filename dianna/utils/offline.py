@@ -0,0 +1,155 @@
+"""Two-phase workflow to run the model outside of dianna.
+
+In the first phase, the explainer is run with a PerturbationExport as checkpoint. Instead of running the
+model, the perturbed inputs are written to disk in chunks. The model is then run on these chunks by an
+external system, which writes the predictions of each chunk to a file next to it. In the second phase, the
+explainer is run again with a PredictionImport as checkpoint, which computes the explanation from the
+imported predictions without running the model.
+
+Examples:
+    >>> explainer = RISE(n_masks=2000, p_keep=.5)
+    >>> explainer.explain_image(model_path, image, checkpoint=PerturbationExport('job/', n_outputs=10))
+    >>> # run the model on each job/inputs_XXXXXX.npy file, saving the output to job/predictions_XXXXXX.npy
+    >>> heatmaps = explainer.explain_image(model_path, image, checkpoint=PredictionImport('job/'))
+"""
+import json
+import pickle
+from pathlib import Path
+import numpy as np
+from .checkpoint import Checkpoint
+from .checkpoint import _hash_sample
+
+
+METADATA_FILENAME = 'metadata.json'
+RANDOM_STATES_FILENAME = 'random_states.pkl'
+
+
+class PerturbationExport(Checkpoint):
+    """Writes the perturbed model inputs of an explanation to disk instead of running the model.
+
+    Each distinct input sample is written once, in chunks named inputs_XXXXXX.npy. The random state of the
+    explainer is stored as well, so PredictionImport can regenerate the same perturbations.
+    The explanation returned in this phase is meaningless, as the model output is replaced by zeros.
+    The model is never run in this phase. Explainer parameters that are tuned by running the model, such as
+    p_keep of RISE or batch_size='auto', must be fixed, and time_budget cannot be used.
+    """
+    def __init__(self, path, n_outputs, chunk_size=1024):  # pylint: disable=super-init-not-called
+        """
+        Creates an export directory.
+
+        Args:
+            path (str or Path): Directory to write the perturbed inputs to
+            n_outputs (int): Number of outputs of the model, e.g. the number of classes
+            chunk_size (int): Number of samples per file
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.n_outputs = n_outputs
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.n_samples = 0
+        self._pending = []
+        self._exported = set()
+
+    def restore_random_state(self, *generators):
+        """Stores the state of the random number generators, to be restored by PredictionImport."""
+        with open(self.path / RANDOM_STATES_FILENAME, 'wb') as random_states_file:
+            pickle.dump([generator.get_state() for generator in generators], random_states_file)
+
+    def check_fixed_parameters(self, **tuned):
+        """Raises a ValueError if an explainer parameter needs the model to be run.
+
+        The model output is replaced by zeros while exporting, so a tuned parameter would silently get a
+        meaningless value, and the import phase would not find the perturbations it generates.
+
+        Args:
+            tuned: For each parameter name, whether the explainer runs the model to tune or apply it
+        """
+        tuned_names = [name for name, is_tuned in tuned.items() if is_tuned]
+        if tuned_names:
+            raise ValueError(f'{", ".join(tuned_names)} cannot be used while exporting perturbations, as the model '
+                             f'is not run. Fix tuned parameters explicitly instead.')
+
+    def wrap(self, runner):
+        """Returns a function that exports the samples instead of running the model."""
+        def export_runner(batch):
+            for sample in batch:
+                key = _hash_sample(sample)
+                if key not in self._exported:
+                    self._exported.add(key)
+                    # copy, because the explainer may reuse the memory of the batch
+                    self._pending.append(np.array(sample))
+                    if len(self._pending) >= self.chunk_size:
+                        self.save()
+            return np.zeros((len(batch), self.n_outputs))
+
+        return export_runner
+
+    def save(self):
+        """Writes the pending samples to a new chunk and updates the metadata."""
+        if self._pending:
+            chunk_name = f'{len(self.chunks):06d}'
+            np.save(self.path / f'inputs_{chunk_name}.npy', np.stack(self._pending))
+            self.chunks.append(chunk_name)
+            self.n_samples += len(self._pending)
+            self._pending = []
+        with open(self.path / METADATA_FILENAME, 'w', encoding='utf-8') as file:
+            json.dump({'chunks': self.chunks, 'n_samples': self.n_samples, 'n_outputs': self.n_outputs}, file)
+
+    def remove(self):
+        """Called by the explainer when it is done; writes the remaining samples."""
+        self.save()
+
+
+class PredictionImport(Checkpoint):
+    """Provides the explainer with predictions that were computed outside of dianna.
+
+    Reads the inputs written by PerturbationExport and the predictions_XXXXXX.npy file next to each
+    inputs_XXXXXX.npy file, holding the model output for each sample in the same order.
+    """
+    def __init__(self, path):  # pylint: disable=super-init-not-called
+        """
+        Reads exported inputs and their predictions.
+
+        Args:
+            path (str or Path): Directory written by PerturbationExport, with a predictions file for each chunk
+        """
+        self.path = Path(path)
+        self.n_reused = 0
+        with open(self.path / METADATA_FILENAME, encoding='utf-8') as file:
+            metadata = json.load(file)
+        with open(self.path / RANDOM_STATES_FILENAME, 'rb') as random_states_file:
+            self._random_states = pickle.load(random_states_file)
+        self.n_outputs = metadata['n_outputs']
+        self._predictions = {}
+        for chunk_name in metadata['chunks']:
+            inputs = np.load(self.path / f'inputs_{chunk_name}.npy', mmap_mode='r')
+            predictions_file = self.path / f'predictions_{chunk_name}.npy'
+            if not predictions_file.exists():
+                raise FileNotFoundError(f'No predictions for chunk {chunk_name}, expected {predictions_file}')
+            predictions = np.load(predictions_file)
+            if len(predictions) != len(inputs):
+                raise ValueError(f'{predictions_file} has {len(predictions)} predictions, '
+                                 f'but there are {len(inputs)} inputs in this chunk')
+            for sample, prediction in zip(inputs, predictions):
+                self._predictions[_hash_sample(sample)] = prediction
+
+    def wrap(self, runner):
+        """Returns a function that looks up the imported predictions instead of running the model."""
+        def import_runner(batch):
+            try:
+                predictions = np.stack([self._predictions[_hash_sample(sample)] for sample in batch])
+            except KeyError as e:
+                raise ValueError('A perturbed input was not exported. Make sure the explainer is run with the '
+                                 'same input and parameters in both phases, and that parameters that are tuned '
+                                 'using the model output are fixed.') from e
+            self.n_reused += len(batch)
+            return predictions
+
+        return import_runner
+
+    def save(self):
+        """Nothing is saved, the imported predictions are read-only."""
+
+    def remove(self):
+        """The exported inputs and predictions are kept."""
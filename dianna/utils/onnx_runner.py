@@ -1,29 +1,71 @@
+import json
+import os
 import onnxruntime as ort
 
 
+# ONNX Runtime session options that can be set through runner_options, with their default values.
+# Thread counts of 0 let ONNX Runtime choose, which is the number of physical cores.
+DEFAULT_RUNNER_OPTIONS = {
+    'intra_op_num_threads': 0,
+    'inter_op_num_threads': 0,
+    'execution_mode': 'sequential',
+    'graph_optimization_level': 'all',
+    'optimized_model_filepath': None,
+    'providers': ('CPUExecutionProvider', ),
+}
+
+_EXECUTION_MODES = {
+    'sequential': ort.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': ort.ExecutionMode.ORT_PARALLEL,
+}
+
+_GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
 class SimpleModelRunner:
     """Runs an onnx model with a set of inputs and outputs."""
-    def __init__(self, filename, preprocess_function=None):
+    def __init__(self, filename, preprocess_function=None, runner_options=None):
         """
         Generates function to run ONNX model with one set of inputs and outputs.
 
         Args:
             filename (str): Path to ONNX model on disk
             preprocess_function (callable, optional): Function to preprocess input data with
+            runner_options (dict, optional): Options for the ONNX Runtime session. Any of:
+
+                - intra_op_num_threads (int): Number of threads used within an operator (0: ONNX Runtime default)
+                - inter_op_num_threads (int): Number of threads used to run operators in parallel
+                  (0: ONNX Runtime default)
+                - execution_mode (str): 'sequential' or 'parallel'
+                - graph_optimization_level (str): 'disable', 'basic', 'extended' or 'all'
+                - optimized_model_filepath (str): Path to save the optimized model to. When this file
+                  exists and was made from the same model file, unchanged since, with the same
+                  optimization level and providers, it is loaded instead of the original model,
+                  skipping the optimization. Otherwise the model is optimized again.
+                - providers (list): Execution providers, in order of preference
+
+                Options that are not given are taken from DEFAULT_RUNNER_OPTIONS.
 
         Returns:
             function
 
         Examples:
-            >>> runner = SimpleModelRunner('path_to_model.onnx')
+            >>> runner = SimpleModelRunner('path_to_model.onnx', runner_options={'intra_op_num_threads': 1})
             >>> predictions = runner(input_data)
         """
         self.filename = filename
         self.preprocess_function = preprocess_function
+        self.runner_options = get_runner_options(runner_options)
+        self._session = None
 
     def __call__(self, input_data):
         # get ONNX predictions
-        sess = ort.InferenceSession(self.filename)
+        sess = self.session
         input_name = sess.get_inputs()[0].name
         output_name = sess.get_outputs()[0].name
 
@@ -33,3 +75,81 @@ class SimpleModelRunner:
         onnx_input = {input_name: input_data}
         pred_onnx = sess.run([output_name], onnx_input)[0]
         return pred_onnx
+
+    @property
+    def session(self):
+        """ONNX Runtime inference session, created on first use and reused for later calls."""
+        if self._session is None:
+            self._session = create_session(self.filename, self.runner_options)
+        return self._session
+
+    @property
+    def n_outputs(self):
+        """Number of outputs of the model per input, or None if it is not fixed in the model."""
+        shape = self.session.get_outputs()[0].shape
+        return shape[-1] if shape and isinstance(shape[-1], int) else None
+
+    def __getstate__(self):
+        # sessions cannot be pickled, a new one is created when the runner is used in another process
+        state = self.__dict__.copy()
+        state['_session'] = None
+        return state
+
+
+def get_runner_options(runner_options=None):
+    """Combines the given runner options with the defaults, checking that all given options exist."""
+    runner_options = {} if runner_options is None else runner_options
+    unknown_options = set(runner_options) - set(DEFAULT_RUNNER_OPTIONS)
+    if unknown_options:
+        raise ValueError(f"Unknown runner options: {', '.join(sorted(unknown_options))}. "
+                         f"Valid options are: {', '.join(DEFAULT_RUNNER_OPTIONS)}")
+    return {**DEFAULT_RUNNER_OPTIONS, **runner_options}
+
+
+def create_session(filename, runner_options=None):
+    """Creates an ONNX Runtime inference session.
+
+    Args:
+        filename (str): Path to ONNX model on disk
+        runner_options (dict, optional): Session options, see SimpleModelRunner
+
+    Returns:
+        onnxruntime.InferenceSession
+    """
+    options = get_runner_options(runner_options)
+    session_options = ort.SessionOptions()
+    session_options.intra_op_num_threads = options['intra_op_num_threads']
+    session_options.inter_op_num_threads = options['inter_op_num_threads']
+    try:
+        session_options.execution_mode = _EXECUTION_MODES[options['execution_mode']]
+        session_options.graph_optimization_level = _GRAPH_OPTIMIZATION_LEVELS[options['graph_optimization_level']]
+    except KeyError as e:
+        raise ValueError(f"Invalid value for runner option: {e}") from e
+
+    optimized_model_filepath = options['optimized_model_filepath']
+    if optimized_model_filepath is None:
+        return ort.InferenceSession(filename, sess_options=session_options, providers=list(options['providers']))
+
+    # the optimized model is only reused if it was made from the same model file with the same options
+    optimization = {'model': os.path.abspath(filename), 'model_mtime': os.path.getmtime(filename),
+                    'graph_optimization_level': options['graph_optimization_level'],
+                    'providers': list(options['providers'])}
+    info_filepath = f'{optimized_model_filepath}.json'
+    if os.path.exists(optimized_model_filepath) and _read_json(info_filepath) == optimization:
+        # the model was optimized before, no need to do it again
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        return ort.InferenceSession(optimized_model_filepath, sess_options=session_options,
+                                    providers=list(options['providers']))
+    session_options.optimized_model_filepath = optimized_model_filepath
+    session = ort.InferenceSession(filename, sess_options=session_options, providers=list(options['providers']))
+    with open(info_filepath, 'w', encoding='utf-8') as info_file:
+        json.dump(optimization, info_file)
+    return session
+
+
+def _read_json(path):
+    """Returns the content of a JSON file, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
@@ -0,0 +1,272 @@
+import hashlib
+import json
+from pathlib import Path
+import numpy as np
+
+
+METADATA_FILENAME = 'metadata.json'
+
+
+class ResultsWriter:
+    """Writes many explanations to a chunked, compressed results store on disk.
+
+    A results store is a directory with a metadata.json file and one file per chunk of explanations.
+    Explanations are collected in memory until a chunk is full, after which the chunk is written to disk.
+    Read a store with ResultsReader.
+    """
+    def __init__(self, path, method=None, params=None, model=None,  # pylint: disable=too-many-arguments
+                 dtype=np.float32, encoding='dense', chunk_size=256, compress=True):
+        """
+        Opens a results store for writing. If the store exists, new explanations are appended to it.
+
+        Args:
+            path (str or Path): Directory of the results store
+            method (str, optional): Name of the explainer method, stored in the metadata
+            params (dict, optional): Parameters of the explainer, stored in the metadata
+            model (str, optional): Path to the model. A hash of the model file is stored in the metadata.
+            dtype (type): Data type to store the saliency values with. If np.float16, the values are
+                          stored relative to the maximum absolute value of each label.
+            encoding (str): 'dense' to store full saliency maps, or 'segments' to store the segment id of each
+                            pixel and the value of each segment. The latter is much smaller for piecewise
+                            constant explanations, such as those of LIME and KernelSHAP.
+            chunk_size (int): Number of explanations per chunk
+            compress (bool): Whether to compress the chunks. A compressed chunk is decompressed as a whole when
+                             one of its explanations is read. Uncompressed chunks are memory-mapped when read,
+                             so only the requested explanations are read from disk.
+        """
+        if encoding not in ('dense', 'segments'):
+            raise ValueError(f"encoding must be 'dense' or 'segments', got: {encoding}")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self._pending = []
+
+        metadata_file = self.path / METADATA_FILENAME
+        if metadata_file.exists():
+            with open(metadata_file, encoding='utf-8') as file:
+                self.metadata = json.load(file)
+        else:
+            self.metadata = {'method': method,
+                             'params': params if params is not None else {},
+                             'model_hash': get_model_hash(model) if model is not None else None,
+                             'dtype': np.dtype(dtype).name,
+                             'encoding': encoding,
+                             'compress': compress,
+                             'shape': None,
+                             'chunks': []}
+        self._names = {name for chunk in self.metadata['chunks'] for name in chunk['names']}
+        # data type used before converting to the stored data type
+        self._work_dtype = np.float64 if self.metadata['dtype'] == 'float64' else np.float32
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def write(self, name, result):
+        """Adds an explanation to the store.
+
+        Args:
+            name (str): Unique name of the explanation, e.g. the name of the input file
+            result: Saliency maps (labels x spatial axes), or a tuple of (values, segments) as returned by
+                    KernelSHAP, where values holds the value of each segment for each label.
+        """
+        if name in self._names:
+            raise ValueError(f'An explanation with name {name} already exists in {self.path}')
+        if isinstance(result, tuple):
+            values, segments = result
+            values = np.asarray(values, dtype=self._work_dtype)
+            values = values.reshape(-1, values.shape[-1]).T
+            segments = np.asarray(segments)
+            n_ids = int(segments.max()) + 1
+            if n_ids > len(values):
+                # values are indexed by segment id, segments without a value, e.g. because SLIC made more
+                # segments than requested, have no importance
+                values = np.concatenate([values, np.zeros((n_ids - len(values), values.shape[1]), values.dtype)])
+            saliency_shape = (values.shape[1], ) + segments.shape
+            if self.metadata['encoding'] == 'dense':
+                saliency = values.T[:, segments]
+        else:
+            saliency = np.asarray(result, dtype=self._work_dtype)
+            saliency_shape = saliency.shape
+            if self.metadata['encoding'] == 'segments':
+                values, segments = encode_segments(saliency)
+
+        if self.metadata['shape'] is None:
+            self.metadata['shape'] = list(saliency_shape)
+        elif tuple(self.metadata['shape']) != saliency_shape:
+            raise ValueError(f'All explanations in a results store must have the same shape, '
+                             f'expected {tuple(self.metadata["shape"])}, got {saliency_shape}')
+
+        if self.metadata['encoding'] == 'dense':
+            self._pending.append((name, {'saliency': saliency}))
+        else:
+            self._pending.append((name, {'values': values, 'segments': segments}))
+        self._names.add(name)
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the explanations that are not on disk yet to a new chunk."""
+        if not self._pending:
+            return
+        names = [name for name, _ in self._pending]
+        dtype = np.dtype(self.metadata['dtype'])
+        if self.metadata['encoding'] == 'dense':
+            arrays = {'saliency': np.stack([arrays['saliency'] for _, arrays in self._pending])}
+        else:
+            # pad the segment values to the largest number of segments in this chunk
+            n_segments = max(len(arrays['values']) for _, arrays in self._pending)
+            n_labels = self.metadata['shape'][0]
+            values = np.full((len(self._pending), n_segments, n_labels), np.nan, dtype=self._work_dtype)
+            for i, (_, entry) in enumerate(self._pending):
+                values[i, :len(entry['values'])] = entry['values']
+            segments = np.stack([arrays['segments'] for _, arrays in self._pending])
+            arrays = {'values': values, 'segments': segments.astype(np.min_scalar_type(segments.max()))}
+
+        key = 'saliency' if 'saliency' in arrays else 'values'
+        if dtype == np.float16:
+            arrays[key], arrays['scale'] = _quantize(arrays[key], label_axis=1 if key == 'saliency' else 2)
+        else:
+            arrays[key] = arrays[key].astype(dtype)
+
+        chunk_name = f'chunk_{len(self.metadata["chunks"]):06d}'
+        if self.metadata['compress']:
+            np.savez_compressed(self.path / f'{chunk_name}.npz', **arrays)
+        else:
+            for array_name, array in arrays.items():
+                np.save(self.path / f'{chunk_name}.{array_name}.npy', array)
+        self.metadata['chunks'].append({'name': chunk_name, 'names': names})
+        self._pending = []
+        self._write_metadata()
+
+    def close(self):
+        """Writes any remaining explanations to disk."""
+        self.flush()
+        self._write_metadata()
+
+    def _write_metadata(self):
+        temp_file = self.path / f'{METADATA_FILENAME}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as file:
+            json.dump(self.metadata, file, default=str)
+        temp_file.replace(self.path / METADATA_FILENAME)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ResultsReader:
+    """Reads explanations from a results store written by ResultsWriter.
+
+    Chunks are only read when an explanation in them is requested, and the last chunk that was read is kept.
+    A compressed chunk is decompressed as a whole, so random access to a compressed store reads a full chunk per
+    explanation. Uncompressed chunks are memory-mapped, so only the requested explanation is read.
+
+    Examples:
+        >>> results = ResultsReader('results/')
+        >>> saliency = results['image_001']
+    """
+    def __init__(self, path):
+        """
+        Opens a results store for reading.
+
+        Args:
+            path (str or Path): Directory of the results store
+        """
+        self.path = Path(path)
+        with open(self.path / METADATA_FILENAME, encoding='utf-8') as file:
+            self.metadata = json.load(file)
+        self._index = {name: (chunk_index, position)
+                       for chunk_index, chunk in enumerate(self.metadata['chunks'])
+                       for position, name in enumerate(chunk['names'])}
+        self._cached_chunk = (None, None)
+
+    @property
+    def names(self):
+        """Names of all explanations in the store, in the order they were written."""
+        return list(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __getitem__(self, name):
+        """Returns the saliency maps (labels x spatial axes) of an explanation."""
+        if self.metadata['encoding'] == 'segments':
+            return decode_segments(*self.get_segments(name))
+        chunk_index, position = self._index[name]
+        chunk = self._load_chunk(chunk_index)
+        saliency = chunk['saliency'][position]
+        if 'scale' in chunk:
+            saliency = saliency.astype(np.float32) * chunk['scale'][position].reshape(-1, *[1] * (saliency.ndim - 1))
+        return saliency
+
+    def get_segments(self, name):
+        """Returns the (values, segments) of a segment-encoded explanation.
+
+        values has shape (number of segments, labels) and segments holds the segment id of each pixel.
+        """
+        if self.metadata['encoding'] != 'segments':
+            raise ValueError(f'The results in {self.path} are not segment-encoded')
+        chunk_index, position = self._index[name]
+        chunk = self._load_chunk(chunk_index)
+        values = chunk['values'][position]
+        if 'scale' in chunk:
+            values = values.astype(np.float32) * chunk['scale'][position]
+        return values, chunk['segments'][position]
+
+    def _load_chunk(self, chunk_index):
+        if self._cached_chunk[0] == chunk_index:
+            return self._cached_chunk[1]
+        chunk_name = self.metadata['chunks'][chunk_index]['name']
+        if self.metadata['compress']:
+            with np.load(self.path / f'{chunk_name}.npz') as npz_file:
+                chunk = dict(npz_file)
+        else:
+            chunk = {file.name.split('.')[1]: np.load(file, mmap_mode='r')
+                     for file in self.path.glob(f'{chunk_name}.*.npy')}
+        self._cached_chunk = (chunk_index, chunk)
+        return chunk
+
+
+def get_model_hash(model_path):
+    """Returns the SHA-256 hash of a model file."""
+    sha256 = hashlib.sha256()
+    with open(model_path, 'rb') as model_file:
+        for block in iter(lambda: model_file.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def encode_segments(saliency):
+    """Encodes saliency maps as the segment id of each pixel and the values of each segment.
+
+    Pixels that have the same value for all labels form one segment.
+
+    Args:
+        saliency (np.ndarray): Saliency maps (labels x spatial axes)
+
+    Returns:
+        values (number of segments x labels), segment id of each pixel (spatial axes)
+    """
+    values, segments = np.unique(saliency.reshape(len(saliency), -1).T, axis=0, return_inverse=True)
+    return values, segments.reshape(saliency.shape[1:])
+
+
+def decode_segments(values, segments):
+    """Converts values per segment and the segment id of each pixel back to saliency maps (labels x spatial axes)."""
+    return np.moveaxis(np.asarray(values)[segments], -1, 0)
+
+
+def _quantize(array, label_axis):
+    """Converts an array to float16, relative to the maximum absolute value per label."""
+    axes = tuple(axis for axis in range(1, array.ndim) if axis != label_axis)
+    scale = np.nanmax(np.abs(array), axis=axes, keepdims=True)
+    scale[scale == 0] = 1
+    return (array / scale).astype(np.float16), scale.reshape(len(array), -1).astype(np.float32)
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+import numpy as np
+from .misc import get_function
+
+
+def _sigmoid(logits):
+    # computed through logaddexp, which does not overflow for large negative logits
+    return np.exp(-np.logaddexp(0, -logits))
+
+
+def _softmax(logits):
+    exponentials = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exponentials / exponentials.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    None: lambda logits: logits,
+    'sigmoid': _sigmoid,
+    'softmax': _softmax,
+}
+
+
+class TextModelRunner:
+    """Runs a text model on batches of sentences, with cached tokenization and vectorized numericalization.
+
+    Explainers run a text model on many variants of the same text, which consist of the same words. The
+    runner therefore splits each sentence on white space and tokenizes every distinct word only once,
+    converting its tokens to ids with the vocabulary at the same time. The ids of a batch are then
+    assembled into a single padded array, and the output activation is applied to the whole batch.
+
+    The tokenizer attribute tokenizes a text in the same way, so explainers that use it to split the text
+    into words get the same tokens as the model.
+    """
+    def __init__(self, model, vocab, tokenizer, min_length=0,  # pylint: disable=too-many-arguments
+                 pad_token='<pad>', unk_token='<unk>', activation=None, binary=False,
+                 runner_options=None, cache_size=100000):
+        """
+        Creates a text model runner.
+
+        Args:
+            model (callable or str): Function that runs the model on a 2D array of token ids _or_
+                                     the path to a ONNX model on disk
+            vocab (dict): Mapping of token to id, or an object with such a mapping as stoi attribute,
+                          e.g. torchtext Vectors
+            tokenizer (callable): Function that splits a text into a list of tokens
+            min_length (int): Sentences with fewer tokens are padded to this length, e.g. the maximum
+                              filter size of a convolutional model
+            pad_token (str): Token used for padding, the unk_token is used if it is not in the vocabulary
+            unk_token (str): Token used for words that are not in the vocabulary
+            activation (str or callable, optional): Function applied to the model output, 'sigmoid',
+                                                    'softmax' or a function of the whole output array
+            binary (bool): If True, the model has a single output that is the probability of the positive
+                           class, and the runner returns the probabilities of the negative and positive class
+            runner_options (dict, optional): ONNX Runtime session options for a model given as a path
+            cache_size (int): Maximum number of sentences whose token ids are cached
+        """
+        self.run_model = get_function(model, runner_options=runner_options)
+        self.stoi = getattr(vocab, 'stoi', vocab)
+        self.word_tokenizer = tokenizer
+        self.min_length = min_length
+        self.unk_id = self.stoi[unk_token]
+        # vocabularies without a padding token, such as GloVe, pad with the unknown token
+        self.pad_id = self.stoi.get(pad_token, self.unk_id)
+        self.activation = activation if callable(activation) else ACTIVATIONS[activation]
+        self.binary = binary
+        self.cache_size = cache_size
+        # tokens and ids of each distinct word, and the ids of recently seen sentences
+        self._word_cache = {}
+        self._sentence_cache = OrderedDict()
+
+    def tokenizer(self, text):
+        """Splits a text into tokens, in the same way the text is tokenized when running the model."""
+        return [token for word in text.split() for token in self._get_word(word)[0]]
+
+    def __call__(self, sentences):
+        # ensure the input has a batch axis
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        token_ids = [self._get_sentence_ids(sentence) for sentence in sentences]
+
+        # pad all sentences at once to the length of the longest sentence
+        lengths = np.array([len(ids) for ids in token_ids])
+        batch = np.full((len(token_ids), max(lengths.max(initial=0), self.min_length)), self.pad_id, dtype=np.int64)
+        batch[np.arange(batch.shape[1]) < lengths[:, np.newaxis]] = \
+            np.concatenate(token_ids) if token_ids else np.zeros(0, dtype=np.int64)
+
+        output = self.activation(np.asarray(self.run_model(batch)))
+        if self.binary:
+            positivity = output[:, 0]
+            return np.stack([1 - positivity, positivity], axis=1)
+        return output
+
+    def _get_word(self, word):
+        """Returns the tokens and token ids of a word, tokenizing it only the first time it is seen."""
+        cached = self._word_cache.get(word)
+        if cached is None:
+            tokens = list(self.word_tokenizer(word))
+            ids = np.array([self.stoi.get(token, self.unk_id) for token in tokens], dtype=np.int64)
+            cached = self._word_cache[word] = (tokens, ids)
+        return cached
+
+    def _get_sentence_ids(self, sentence):
+        """Returns the token ids of a sentence, from the cache of recently seen sentences if possible."""
+        ids = self._sentence_cache.get(sentence)
+        if ids is not None:
+            self._sentence_cache.move_to_end(sentence)
+            return ids
+        words = sentence.split()
+        ids = np.concatenate([self._get_word(word)[1] for word in words]) if words else np.zeros(0, dtype=np.int64)
+        self._sentence_cache[sentence] = ids
+        if len(self._sentence_cache) > self.cache_size:
+            self._sentence_cache.popitem(last=False)
+        return ids
@@ -0,0 +1,88 @@
+import time
+import numpy as np
+
+
+class TimeBudget:
+    """Keeps track of the time spent on an explanation, to fit model calls within a time budget.
+
+    This is what the time_budget argument of the explainers sets up. Tuning the batch size or p_keep counts
+    towards the budget and stops early when it runs out. RISE then stops evaluating masks when the next batch
+    is not expected to finish in time, while LIME and KernelSHAP measure the time per sample and reduce the
+    number of samples to what fits in the remaining time.
+    """
+    def __init__(self, seconds=None):
+        """
+        Starts the clock.
+
+        Args:
+            seconds (float, optional): Time budget in seconds. If None, there is no time limit.
+        """
+        self.seconds = seconds
+        self.start_time = time.monotonic()
+        self._n_batches = 0
+        self._batches_time = 0.
+
+    @property
+    def elapsed(self):
+        """Time in seconds since the start of the budget."""
+        return time.monotonic() - self.start_time
+
+    @property
+    def remaining(self):
+        """Time in seconds left in the budget, None if there is no time limit."""
+        if self.seconds is None:
+            return None
+        return max(0., self.seconds - self.elapsed)
+
+    @property
+    def exhausted(self):
+        """Whether the budget has run out, always False if there is no time limit.
+
+        Tuning steps (e.g. probing the batch size or p_keep) check this to stop early, so their time is
+        charged to the same budget as the explanation itself.
+        """
+        return self.seconds is not None and self.remaining == 0.
+
+    def iterate(self, batches):
+        """Yields batches for as long as the next batch is expected to finish within the budget.
+
+        The time per batch is measured as the time between requests for the next batch, so it includes
+        running the model on the batch. At least one batch is always yielded.
+
+        Args:
+            batches (iterable): Batches of model input
+
+        Yields:
+            The batches, until the budget would be exceeded
+        """
+        last_time = time.monotonic()
+        for batch in batches:
+            yield batch
+            now = time.monotonic()
+            self._n_batches += 1
+            self._batches_time += now - last_time
+            last_time = now
+            if self.seconds is not None and self.remaining < self._batches_time / self._n_batches:
+                return
+
+    def plan_samples(self, seconds_per_sample, max_samples, min_samples=1):
+        """Returns the number of samples that can be evaluated in the remaining time.
+
+        Args:
+            seconds_per_sample (float): Measured time to evaluate one sample
+            max_samples (int): Number of samples to use if they all fit in the budget
+            min_samples (int): Minimum number of samples, even if they do not fit in the budget
+
+        Returns:
+            Number of samples (int)
+        """
+        if self.seconds is None:
+            return max_samples
+        return int(np.clip(self.remaining / max(seconds_per_sample, 1e-9), min_samples, max_samples))
+
+
+def measure_seconds_per_sample(runner, batch):
+    """Measures the time per sample to run the model on a batch of data."""
+    start = time.monotonic()
+    runner(batch)
+    return (time.monotonic() - start) / len(batch)
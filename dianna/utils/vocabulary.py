@@ -0,0 +1,220 @@
+"""Word vectors in a compact binary format that is memory-mapped instead of loaded.
+
+A text file with word vectors, such as GloVe, is converted once to a directory with:
+
+- vectors.npy: the vectors as a contiguous float32 array, one row per word in the order of the file
+- words.npy: the UTF-8 encoded words one after the other, in sorted order
+- offsets.npy: the start of each sorted word in words.npy, followed by the end of the last word
+- ids.npy: the row in vectors.npy of each sorted word
+
+Opening the directory only maps these files into memory, so it is near-instant, and worker processes that
+open the same vocabulary share its pages. Words are looked up by binary search in the sorted words.
+"""
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+
+
+FILENAMES = ('vectors.npy', 'words.npy', 'offsets.npy', 'ids.npy')
+
+
+class Vocabulary:
+    """Memory-mapped word vectors with a token to id mapping, which can be used as the vocab of a text runner.
+
+    Besides the mapping interface (vocab[word], word in vocab, vocab.get(word, default)), the stoi
+    attribute refers to the vocabulary itself, for code that expects torchtext Vectors.
+    """
+    def __init__(self, path):
+        """
+        Opens a vocabulary written by Vocabulary.save or load_vocabulary.
+
+        Args:
+            path (str or Path): Directory of the vocabulary
+        """
+        self.path = Path(path)
+        self.vectors, self._words, self._offsets, self._ids = \
+            (np.load(self.path / filename, mmap_mode='r') for filename in FILENAMES)
+        # memoryviews of the index, which are much faster to index than the arrays themselves
+        self._words_view, self._offsets_view = memoryview(self._words), memoryview(self._offsets)
+        self.stoi = self
+        # ids of the words looked up so far, as most texts use a small part of the vocabulary
+        self._cache = {}
+
+    def __getstate__(self):
+        # only the path is pickled, so a worker process maps the same files instead of receiving a copy
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, word):
+        word_id = self.get(word)
+        if word_id is None:
+            raise KeyError(word)
+        return word_id
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def get(self, word, default=None):
+        """Returns the id of a word, which is its row in the vectors, or default if it is not in the vocabulary."""
+        if word not in self._cache:
+            self._cache[word] = self._find(word)
+        word_id = self._cache[word]
+        return default if word_id is None else word_id
+
+    def _find(self, word):
+        """Binary search for a word in the sorted words."""
+        key = word.encode('utf-8')
+        low, high = 0, len(self._ids)
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_sorted_word(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._ids) and self._get_sorted_word(low) == key:
+            return int(self._ids[low])
+        return None
+
+    def _get_sorted_word(self, index):
+        return self._words_view[self._offsets_view[index]:self._offsets_view[index + 1]].tobytes()
+
+    @staticmethod
+    def save(path, words, vectors, replace=False):
+        """Writes words and their vectors as a vocabulary.
+
+        The files are written to a temporary directory that is renamed when complete, so processes that
+        convert the same vocabulary at the same time never see incomplete files.
+
+        Args:
+            path (str or Path): Directory to write the vocabulary to
+            words (list): The words, the first occurrence of a word is used if it occurs more than once
+            vectors (np.ndarray): The vector of each word, one row per word
+            replace (bool): Whether to replace an existing vocabulary at path. If False, an existing
+                            vocabulary is kept, as another process converted the same words first.
+
+        Returns:
+            The opened vocabulary (Vocabulary)
+        """
+        temp_path = _make_temp_directory(path)
+        np.save(temp_path / 'vectors.npy', np.ascontiguousarray(vectors, dtype=np.float32))
+        return Vocabulary._save_words(temp_path, path, words, replace)
+
+    @staticmethod
+    def _save_words(temp_path, path, words, replace):
+        """Writes the index of the words next to the vectors in temp_path, and moves temp_path to path."""
+        path = Path(path)
+        encoded = [word.encode('utf-8') for word in words]
+        # sort by encoded word, keeping the first occurrence of duplicate words
+        order = sorted(range(len(encoded)), key=lambda i: (encoded[i], i))
+        order = [i for n, i in enumerate(order) if n == 0 or encoded[i] != encoded[order[n - 1]]]
+        lengths = np.array([len(encoded[i]) for i in order], dtype=np.int64)
+
+        arrays = (np.frombuffer(b''.join(encoded[i] for i in order), dtype=np.uint8),
+                  np.concatenate([[0], np.cumsum(lengths)]),
+                  np.array(order, dtype=np.int64))
+        for filename, array in zip(FILENAMES[1:], arrays):
+            np.save(temp_path / filename, array)
+        try:
+            if replace and path.exists():
+                _replace_directory(temp_path, path)
+            else:
+                os.replace(temp_path, path)
+        except OSError:
+            # another process finished converting first
+            shutil.rmtree(temp_path)
+        return Vocabulary(path)
+
+    @staticmethod
+    def convert(word_vector_file, path, replace=False):
+        """Converts a text file with word vectors to a vocabulary.
+
+        Args:
+            word_vector_file (str or Path): Text file with a word followed by its vector on each line, as
+                                            used by GloVe and word2vec. A word2vec header line with the number
+                                            of words and the dimension is skipped.
+            path (str or Path): Directory to write the vocabulary to
+            replace (bool): Whether to replace an existing vocabulary at path, see Vocabulary.save
+
+        Returns:
+            The opened vocabulary (Vocabulary)
+        """
+        # the vectors are parsed line by line into the vectors file, so the text file is never fully in memory
+        n_words, dimension = 0, None
+        for line in _read_word_vector_lines(word_vector_file):
+            dimension = len(line.split(' ')) - 1 if dimension is None else dimension
+            n_words += 1
+        temp_path = _make_temp_directory(path)
+        vectors = np.lib.format.open_memmap(temp_path / 'vectors.npy', mode='w+', dtype=np.float32,
+                                            shape=(n_words, dimension or 0))
+        words = []
+        for line in _read_word_vector_lines(word_vector_file):
+            # split off the vector from the end, as some words contain spaces
+            word, *vector = line.rsplit(' ', dimension)
+            vectors[len(words)] = np.array(vector, dtype=np.float32)
+            words.append(word)
+        vectors.flush()
+        del vectors
+        return Vocabulary._save_words(temp_path, path, words, replace)
+
+
+def load_vocabulary(word_vector_file, path=None):
+    """Opens the vocabulary of a word vector file, converting the file on first use.
+
+    Args:
+        word_vector_file (str or Path): Text file with word vectors, see Vocabulary.convert
+        path (str or Path, optional): Directory of the converted vocabulary, defaults to the name of the
+                                      word vector file with the suffix .vocab
+
+    Returns:
+        The opened vocabulary (Vocabulary)
+    """
+    word_vector_file = Path(word_vector_file)
+    path = word_vector_file.with_name(word_vector_file.name + '.vocab') if path is None else Path(path)
+    if path.exists() and path.stat().st_mtime >= word_vector_file.stat().st_mtime:
+        return Vocabulary(path)
+    # if the word vector file changed since it was converted, the new conversion replaces the old one
+    return Vocabulary.convert(word_vector_file, path, replace=True)
+
+
+def _read_word_vector_lines(word_vector_file):
+    """Yields the non-empty lines of a word vector file, skipping a word2vec header line."""
+    with open(word_vector_file, encoding='utf-8') as file:
+        for number, line in enumerate(file):
+            line = line.rstrip()
+            parts = line.split(' ')
+            if number == 0 and len(parts) == 2 and all(part.isdigit() for part in parts):
+                continue
+            if line:
+                yield line
+
+
+def _make_temp_directory(path):
+    """Creates the temporary directory a vocabulary is written to before it is renamed to path."""
+    path = Path(path)
+    temp_path = path.with_name(f'{path.name}.tmp{os.getpid()}')
+    temp_path.mkdir(parents=True, exist_ok=True)
+    return temp_path
+
+
+def _replace_directory(source, destination):
+    """Renames a directory to an existing directory, which is moved aside and then removed.
+
+    A directory cannot be renamed over a non-empty one, so the existing directory is first renamed to a name of
+    its own. Its files are unlinked, not truncated, so processes that have them memory-mapped keep reading them.
+    """
+    old_path = destination.with_name(f'{destination.name}.old{os.getpid()}')
+    try:
+        os.replace(destination, old_path)
+    except FileNotFoundError:
+        # another process moved it aside first
+        pass
+    try:
+        os.replace(source, destination)
+    finally:
+        shutil.rmtree(old_path, ignore_errors=True)
@@ -1,3 +1,7 @@
 # flake8: noqa: F401
 from .image import plot_image
+from .image import render_image
+from .image import render_images
 from .text import highlight_text
+from .text import highlight_texts
+from .timeseries import plot_timeseries
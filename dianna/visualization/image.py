@@ -1,4 +1,13 @@
+from functools import lru_cache
+from itertools import repeat
+import matplotlib
 import matplotlib.pyplot as plt
+import numpy as np
+from PIL import Image
+
+
+# number of colours in the lookup table of a colormap, the same as the number of colours of matplotlib colormaps
+LUT_SIZE = 256
 
 
 def _determine_vmax(max_data_value):
@@ -18,6 +27,9 @@ def plot_image(heatmap, original_data=None, heatmap_cmap=None, data_cmap=None, s
     plotted on top of the original data. In that case both images are plotted
     transparantly with alpha = 0.5.
 
+    The figure is closed afterwards. To write many heatmaps to disk, render_image
+    and render_images are much faster.
+
     Args:
         heatmap: the saliency map or other heatmap to be plotted.
         original_data: the data to plot together with the heatmap, both with
@@ -36,7 +48,7 @@ def plot_image(heatmap, original_data=None, heatmap_cmap=None, data_cmap=None, s
     """
     # default cmap depends on shape: grayscale or colour
 
-    _, ax = plt.subplots()
+    fig, ax = plt.subplots()
     alpha = 1
     if original_data is not None:
         if len(original_data.shape) == 2 and data_cmap is None:
@@ -47,7 +59,121 @@ def plot_image(heatmap, original_data=None, heatmap_cmap=None, data_cmap=None, s
         alpha = .5
 
     ax.imshow(heatmap, cmap=heatmap_cmap, alpha=alpha)
+    # save before showing, as showing may clear the figure
+    if output_filename:
+        fig.savefig(output_filename)
     if show_plot:
         plt.show()
+    plt.close(fig)
+
+
+def render_image(heatmap, original_data=None, heatmap_cmap=None, data_cmap=None,  # pylint: disable=too-many-arguments
+                 vmin=None, vmax=None, alpha=.5, output_filename=None):
+    """
+    Renders a heatmap image to an RGBA array without matplotlib figures, and optionally writes it as PNG.
+
+    The heatmap is mapped to colours with a lookup table of the colormap and blended onto the original
+    data in numpy, with the same colours as plot_image. The image has the size of the heatmap, one pixel
+    per value, instead of the size of a figure.
+
+    Args:
+        heatmap: the saliency map or other heatmap to be rendered (2D).
+        original_data: the data to render below the heatmap (optional), 2D or with 3 (RGB) or
+                       4 (RGBA) channels as last axis, with the same height and width as the heatmap.
+        heatmap_cmap: color map for the heatmap (name or matplotlib colormap), the matplotlib
+                      default if None.
+        data_cmap: color map for 2D data (name or matplotlib colormap), 'gray' if None.
+        vmin: heatmap value mapped to the first colour, by default the minimum of the heatmap.
+        vmax: heatmap value mapped to the last colour, by default the maximum of the heatmap.
+              Use the same vmin and vmax for heatmaps that should be compared.
+        alpha: opacity of the heatmap on top of the original data.
+        output_filename: Name of the PNG file to write the image to (optional).
+
+    Returns:
+        The image as RGBA array (height, width, 4) of uint8
+    """
+    heatmap = np.asarray(heatmap)
+    vmin = np.min(heatmap) if vmin is None else vmin
+    vmax = np.max(heatmap) if vmax is None else vmax
+    rgba = _apply_lut(heatmap, _get_lut(heatmap_cmap), vmin, vmax)
+    if original_data is not None:
+        background = _get_data_rgba(np.asarray(original_data), data_cmap)
+        if background.shape != rgba.shape:
+            raise ValueError(f'The original data of shape {np.shape(original_data)} does not have the same '
+                             f'height and width as the heatmap of shape {heatmap.shape}')
+        # the background is opaque, so blending the colours is enough
+        rgba[..., :3] = np.rint(alpha * rgba[..., :3] + (1 - alpha) * background[..., :3]).astype(np.uint8)
     if output_filename:
-        plt.savefig(output_filename)
+        _write_png(output_filename, rgba)
+    return rgba
+
+
+def render_images(heatmaps, output_filenames, original_data=None, heatmap_cmap=None,  # pylint: disable=too-many-arguments
+                  data_cmap=None, vmin=None, vmax=None, alpha=.5):
+    """
+    Renders many heatmap images to PNG files, see render_image.
+
+    The heatmaps are rendered one at a time and written as soon as they are rendered, so heatmaps
+    and original data given as generators or memory-mapped arrays are never loaded at once.
+
+    Args:
+        heatmaps: iterable of heatmaps, e.g. a generator or an array with a heatmap per row.
+        output_filenames: iterable with the name of the PNG file of each heatmap.
+        original_data: iterable with the data of each heatmap (optional), e.g. itertools.repeat(image)
+                       to render all heatmaps on top of the same image.
+        heatmap_cmap: color map for the heatmaps, see render_image.
+        data_cmap: color map for 2D data, see render_image.
+        vmin: heatmap value mapped to the first colour, by default the minimum of each heatmap.
+        vmax: heatmap value mapped to the last colour, by default the maximum of each heatmap.
+        alpha: opacity of the heatmaps on top of the original data.
+
+    Returns:
+        None
+    """
+    original_data = repeat(None) if original_data is None else original_data
+    for heatmap, data, filename in zip(heatmaps, original_data, output_filenames):
+        render_image(heatmap, data, heatmap_cmap=heatmap_cmap, data_cmap=data_cmap, vmin=vmin, vmax=vmax,
+                     alpha=alpha, output_filename=filename)
+
+
+@lru_cache(maxsize=None)
+def _get_named_lut(cmap):
+    colormap = matplotlib.colormaps[cmap if cmap is not None else matplotlib.rcParams['image.cmap']]
+    return colormap(np.linspace(0, 1, LUT_SIZE), bytes=True)
+
+
+def _get_lut(cmap):
+    """Returns the lookup table of a colormap, RGBA uint8 colours (LUT_SIZE x 4)."""
+    if cmap is None or isinstance(cmap, str):
+        return _get_named_lut(cmap)
+    return cmap(np.linspace(0, 1, LUT_SIZE), bytes=True)
+
+
+def _apply_lut(values, lut, vmin, vmax):
+    """Maps values to the colours of a lookup table, with vmin at the first and vmax at the last colour.
+
+    The values are binned in the same way as by matplotlib, so the colours are the same as those of imshow.
+    """
+    scale = len(lut) / (vmax - vmin) if vmax > vmin else 0
+    indices = np.clip(np.floor((values - vmin) * scale), 0, len(lut) - 1).astype(np.intp)
+    return lut[indices]
+
+
+def _get_data_rgba(data, data_cmap):
+    """Converts the original data to RGBA uint8, scaling it in the same way as plot_image."""
+    if data.ndim == 2:
+        vmax = _determine_vmax(data.max())
+        return _apply_lut(data, _get_lut('gray' if data_cmap is None else data_cmap), 0,
+                          data.max() if vmax is None else vmax)
+    if data.dtype == np.uint8:
+        rgb = data[..., :3]
+    else:
+        # colour images are scaled to 0-1 if the values are in the range of 0-255
+        rgb = data[..., :3] / (255 if data.max() > 1 else 1)
+        rgb = np.rint(np.clip(rgb, 0, 1) * 255).astype(np.uint8)
+    return np.concatenate([rgb, np.full(rgb.shape[:-1] + (1, ), 255, dtype=np.uint8)], axis=-1)
+
+
+def _write_png(filename, rgba):
+    # fast compression, as the images are typically written in bulk
+    Image.fromarray(rgba).save(filename, format='PNG', compress_level=1)
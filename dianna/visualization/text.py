@@ -20,25 +20,76 @@ def highlight_text(explanation,
     Returns:
         None
     """
-    output = _create_html(original_text, explanation, max_opacity)
-
     if output_html_filename:
-        with open(output_html_filename, 'w', encoding='utf-8') as output_html_file:
-            print(output, file=output_html_file)
+        _write_html(output_html_filename, original_text, explanation, max_opacity)
 
     if show_plot:
-        display(HTML(output))
-
-
-def _create_html(original_text, explanation, max_opacity):
-    max_importance = max(abs(item[2]) for item in explanation)
-    body = original_text
-    words_in_reverse_order = sorted(explanation, key=lambda item: item[1], reverse=True)
-    for word, word_start, importance in words_in_reverse_order:
-        word_end = word_start + len(word)
-        highlighted_word = _highlight_word(word, importance, max_importance, max_opacity)
-        body = body[:word_start] + highlighted_word + body[word_end:]
-    return '<html><body>' + body + '</body></html>'
+        display(HTML(_create_html(original_text, explanation, max_opacity)))
+
+
+def highlight_texts(explanations,
+                    original_texts,
+                    output_html_filenames=None,
+                    max_opacity=.8,
+                    shared_scale=False):
+    """
+    Highlights many texts, each based on the values in its explanation.
+
+    Args:
+        explanations: list with an explanation for each text, see highlight_text
+        original_texts: list of original texts
+        output_html_filenames: Name of the file to save each highlighted text to (optional).
+                               If given, the html is written to the files while it is generated.
+        max_opacity: Maximum opacity (0-1)
+        shared_scale: If true, the opacity of all texts is relative to the largest importance over all
+                      explanations, so the texts can be compared. Otherwise each text is scaled separately.
+
+    Returns:
+        list with the html of each text, or None if the html is written to files
+    """
+    max_importance = max(_get_max_importance(explanation) for explanation in explanations) \
+        if shared_scale else None
+    if output_html_filenames is None:
+        return [_create_html(original_text, explanation, max_opacity, max_importance)
+                for explanation, original_text in zip(explanations, original_texts)]
+    for explanation, original_text, filename in zip(explanations, original_texts, output_html_filenames):
+        _write_html(filename, original_text, explanation, max_opacity, max_importance)
+    return None
+
+
+def _create_html(original_text, explanation, max_opacity, max_importance=None):
+    return ''.join(_generate_html(original_text, explanation, max_opacity, max_importance))
+
+
+def _write_html(filename, original_text, explanation, max_opacity, max_importance=None):
+    """Writes the html to a file piece by piece, so the complete html is never held in memory."""
+    with open(filename, 'w', encoding='utf-8') as output_html_file:
+        output_html_file.writelines(_generate_html(original_text, explanation, max_opacity, max_importance))
+        output_html_file.write('\n')
+
+
+def _generate_html(original_text, explanation, max_opacity, max_importance=None):
+    """Generates the html of a highlighted text in pieces, in a single pass over the words sorted by position.
+
+    A highlighted word replaces the text from its start, with the length of the word.
+    Words that overlap a previous word are skipped.
+    """
+    if max_importance is None:
+        max_importance = _get_max_importance(explanation)
+    yield '<html><body>'
+    position = 0
+    for word, word_start, importance in sorted(explanation, key=lambda item: item[1]):
+        if word_start < position:
+            continue
+        yield original_text[position:word_start]
+        yield _highlight_word(word, importance, max_importance, max_opacity)
+        position = word_start + len(word)
+    yield original_text[position:]
+    yield '</body></html>'
+
+
+def _get_max_importance(explanation):
+    return max(abs(item[2]) for item in explanation)
 
 
 def _highlight_word(word, importance, max_importance, max_opacity):
@@ -0,0 +1,89 @@
+import matplotlib.pyplot as plt
+import numpy as np
+
+
+def downsample(values, max_points):
+    """
+    Downsamples a series for plotting, keeping the minimum and maximum of each bucket of consecutive values.
+
+    Unlike taking every n-th value, this keeps narrow peaks visible.
+
+    Args:
+        values: 1D array with the series
+        max_points: maximum number of points to return
+
+    Returns:
+        indices of the kept values (1D array), kept values (1D array)
+    """
+    values = np.asarray(values)
+    n_buckets = max(max_points // 2, 1)
+    if len(values) <= max_points:
+        return np.arange(len(values)), values
+    bucket_size = int(np.ceil(len(values) / n_buckets))
+    n_full = len(values) // bucket_size
+    # the last, incomplete bucket is handled separately so the others can be reshaped
+    buckets = values[:n_full * bucket_size].reshape(n_full, bucket_size)
+    starts = np.arange(n_full) * bucket_size
+    indices = [starts + buckets.argmin(axis=1), starts + buckets.argmax(axis=1)]
+    if n_full * bucket_size < len(values):
+        rest = values[n_full * bucket_size:]
+        indices += [[n_full * bucket_size + rest.argmin()], [n_full * bucket_size + rest.argmax()]]
+    indices = np.unique(np.concatenate(indices))
+    return indices, values[indices]
+
+
+def _bucket_mean(values, n_buckets):
+    """Averages consecutive values into at most n_buckets buckets."""
+    bucket_size = int(np.ceil(len(values) / n_buckets))
+    padded = np.full(int(np.ceil(len(values) / bucket_size)) * bucket_size, np.nan)
+    padded[:len(values)] = values
+    return np.nanmean(padded.reshape(-1, bucket_size), axis=1)
+
+
+def plot_timeseries(timeseries, heatmap, time=None, channel_names=None,  # pylint: disable=too-many-arguments,too-many-locals
+                    heatmap_cmap='bwr', max_points=2000, show_plot=True, output_filename=None):
+    """
+    Plots a time series with its heatmap as background colour.
+
+    Series that are longer than max_points are downsampled for plotting: the series keeps the minimum and
+    maximum of each bucket of consecutive values, the heatmap the mean of each bucket.
+
+    The figure is closed afterwards, like in plot_image.
+
+    Args:
+        timeseries: the time series, 1D (time) or 2D (time, channels).
+        heatmap: the saliency map of the time series, 1D (time) or 2D (time, channels) to have a
+                 separate heatmap for each channel.
+        time: the time of each value (optional), by default the index of each value.
+        channel_names: name of each channel, used as y-axis label (optional).
+        heatmap_cmap: color map for the heatmap (see mpl.Axes.imshow documentation for options).
+        max_points: maximum number of points to plot per channel.
+        show_plot: Shows plot if true (for testing or writing plots to disk instead).
+        output_filename: Name of the file to save the plot to (optional).
+
+    Returns:
+        None
+    """
+    timeseries = np.asarray(timeseries).reshape(len(timeseries), -1)
+    heatmap = np.asarray(heatmap).reshape(len(heatmap), -1)
+    time = np.arange(len(timeseries)) if time is None else np.asarray(time)
+    n_channels = timeseries.shape[1]
+    vmax = max(np.abs(heatmap).max(), 1e-12)
+
+    fig, axes = plt.subplots(n_channels, 1, sharex=True, squeeze=False)
+    for channel, ax in enumerate(axes[:, 0]):
+        indices, values = downsample(timeseries[:, channel], max_points)
+        channel_heatmap = _bucket_mean(heatmap[:, min(channel, heatmap.shape[1] - 1)], max_points)
+        # the heatmap covers the range of the values, with some height for a constant series
+        bottom, top = values.min(), max(values.max(), values.min() + 1e-6)
+        ax.imshow(channel_heatmap[np.newaxis], cmap=heatmap_cmap, vmin=-vmax, vmax=vmax, aspect='auto',
+                  extent=(time[0], time[-1], bottom, top), alpha=.5)
+        ax.plot(time[indices], values, color='black', linewidth=.8)
+        if channel_names is not None:
+            ax.set_ylabel(channel_names[channel])
+    # save before showing, as showing may clear the figure
+    if output_filename:
+        fig.savefig(output_filename)
+    if show_plot:
+        plt.show()
+    plt.close(fig)
@@ -0,0 +1,44 @@
+import numpy as np
+from dianna.methods.rise import RISE
+from dianna.methods.rise import images
+from dianna.utils import BatchBuffer
+
+
+def test_batch_buffer_reuses_memory():
+    """Tests if the buffer memory is reused for batches of the same or smaller size."""
+    buffers = BatchBuffer(np.float32)
+
+    first = buffers.get((10, 3, 4))
+    second = buffers.get((7, 3, 4))
+
+    assert np.shares_memory(first, second)
+    assert second.shape == (7, 3, 4)
+    assert second.dtype == np.float32
+    assert second.flags['C_CONTIGUOUS']
+
+
+def test_batch_buffer_cycles_buffers():
+    """Tests if consecutive batches use different memory when multiple buffers are requested."""
+    buffers = BatchBuffer(np.float32, n_buffers=2)
+
+    first = buffers.get((4, 3))
+    second = buffers.get((4, 3))
+    third = buffers.get((4, 3))
+
+    assert not np.shares_memory(first, second)
+    assert np.shares_memory(first, third)
+
+
+def test_rise_masked_batch_in_model_layout():
+    """Tests if RISE writes masked batches in the layout and dtype of the input, as the preprocessing function does."""
+    explainer = RISE()
+    model_input = np.random.randint(0, 256, size=(1, 3, 20, 24)).astype(np.int32)
+    channels_axis_index = 1
+    input_data, full_preprocess_function = images.prepare_image_data(explainer, model_input, channels_axis_index)
+    masks = explainer.generate_masks_for_images(input_data.shape[1:3], .5, 5)
+
+    expected = full_preprocess_function(input_data * masks)
+    masked = images.get_masked_batch_function(explainer, model_input, channels_axis_index, prefetch=0)(masks)
+
+    assert masked.dtype == expected.dtype
+    assert np.array_equal(masked, expected)
@@ -0,0 +1,138 @@
+import asyncio
+import gc
+import io
+import time
+import numpy as np
+import pytest
+import dianna
+from dianna import utils
+from tests.utils import run_model
+
+
+def test_get_batch_size_fixed():
+    """Tests if an integer batch size is returned unchanged, without calling the model."""
+    def runner(_):
+        raise AssertionError('runner should not be called')
+
+    assert utils.get_batch_size(42, runner, lambda n: np.zeros((n, 3))) == 42
+
+
+def test_get_batch_size_auto_respects_limits():
+    """Tests if the tuned batch size is one of the candidates and respects the maximum batch size and memory."""
+    utils.clear_batch_size_cache()
+    candidates = (1, 4, 16, 64)
+
+    batch_size = utils.get_batch_size('auto', run_model, lambda n: np.zeros((n, 10), dtype=np.float32),
+                                      max_batch_size=16, max_memory=4 * 10 * 4, candidates=candidates)
+
+    assert batch_size in (1, 4)
+
+
+def test_get_batch_size_auto_is_cached():
+    """Tests if the tuned batch size is cached per model and input shape."""
+    utils.clear_batch_size_cache()
+    calls = []
+
+    def runner(input_data):
+        calls.append(len(input_data))
+        return run_model(input_data)
+
+    first = utils.get_batch_size('auto', runner, lambda n: np.zeros((n, 10)), model_or_function=runner,
+                                 input_shape=(10,))
+    n_calls = len(calls)
+    second = utils.get_batch_size('auto', runner, lambda n: np.zeros((n, 10)), model_or_function=runner,
+                                  input_shape=(10,))
+
+    assert first == second
+    assert len(calls) == n_calls
+
+
+def test_get_batch_size_cache_forgets_collected_models():
+    """Tests if the cached batch size of a model is removed when the model is garbage collected."""
+    utils.clear_batch_size_cache()
+
+    def runner(input_data):
+        return run_model(input_data)
+
+    utils.get_batch_size('auto', runner, lambda n: np.zeros((n, 10)), model_or_function=runner, input_shape=(10,))
+    assert len(utils.batching._batch_size_cache) == 1  # pylint: disable=protected-access
+    del runner
+    gc.collect()
+
+    assert not utils.batching._batch_size_cache  # pylint: disable=protected-access
+
+
+def test_run_in_batches():
+    """Tests if running in batches gives the same output as running all input at once."""
+    input_data = np.random.random((25, 3))
+
+    predictions = utils.run_in_batches(lambda data: data * 2, input_data, batch_size=10)
+
+    assert np.allclose(predictions, input_data * 2)
+
+
+def test_rise_auto_batch_size():
+    """Tests if RISE runs with an automatically determined batch size."""
+    input_data = np.random.random((28, 28, 1))
+
+    heatmaps = dianna.explain_image(run_model, input_data, method="RISE", axis_labels={-1: 'channels'},
+                                    n_masks=50, p_keep=.5, batch_size='auto')
+
+    assert heatmaps[0].shape == input_data.shape[:2]
+
+
+def test_prefetch_batches_keeps_order():
+    """Tests if prefetching batches in a background thread yields all batches in order."""
+    batches = (np.full(3, i) for i in range(20))
+
+    result = list(utils.prefetch_batches(batches, prefetch=2))
+
+    assert [batch[0] for batch in result] == list(range(20))
+
+
+def test_prefetch_batches_forwards_errors():
+    """Tests if an error raised while preparing a batch is raised in the consumer."""
+    def batches():
+        yield np.zeros(3)
+        raise ValueError('failed to create batch')
+
+    with pytest.raises(ValueError):
+        list(utils.prefetch_batches(batches(), prefetch=2))
+
+
+def test_prefetch_batches_progress_follows_consumer():
+    """Tests if the progress bar counts the batches the consumer has finished, not those prepared ahead."""
+    progress = {'total': 10, 'mininterval': 0, 'miniters': 1, 'file': io.StringIO()}
+    batches = utils.prefetch_batches(iter(range(10)), prefetch=4, progress=progress)
+
+    for i, _ in enumerate(batches):
+        # give the producer time to prepare batches ahead
+        time.sleep(.01)
+        assert batches.n == i
+
+    assert batches.n == 10
+
+
+def test_rise_prefetch_gives_same_result():
+    """Tests if RISE gives the same result with and without prefetching batches."""
+    input_data = np.random.random((28, 28, 1))
+    axis_labels = {-1: 'channels'}
+
+    np.random.seed(0)
+    expected = dianna.explain_image(run_model, input_data, method="RISE", axis_labels=axis_labels,
+                                    n_masks=50, p_keep=.5, batch_size=10)
+    np.random.seed(0)
+    heatmaps = dianna.explain_image(run_model, input_data, method="RISE", axis_labels=axis_labels,
+                                    n_masks=50, p_keep=.5, batch_size=10, prefetch=2)
+
+    assert np.allclose(heatmaps, expected)
+
+
+def test_explain_image_async():
+    """Tests if the explanation can be awaited from an asyncio event loop."""
+    input_data = np.random.random((28, 28, 1))
+
+    heatmaps = asyncio.run(dianna.explain_image_async(run_model, input_data, method="RISE",
+                                                      axis_labels={-1: 'channels'}, n_masks=50, p_keep=.5))
+
+    assert heatmaps[0].shape == input_data.shape[:2]
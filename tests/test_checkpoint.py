@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from dianna.methods.lime import LIME
+from dianna.methods.rise import RISE
+from dianna.utils import Checkpoint
+
+
+def run_model(input_data):
+    """Dummy model with 2 classes of which the output only depends on the input sample."""
+    mean = np.asarray(input_data).reshape(len(input_data), -1).mean(axis=1)
+    return np.stack([mean, 1 - mean], axis=1)
+
+
+class Preempted(Exception):
+    """Raised by the model to simulate an interrupted explanation."""
+
+
+def get_counting_model(fail_after=None):
+    """Returns a model that counts the samples it evaluates and optionally fails after a number of calls."""
+    calls = []
+
+    def model(input_data):
+        if fail_after is not None and len(calls) >= fail_after:
+            raise Preempted()
+        calls.append(len(input_data))
+        return run_model(input_data)
+
+    return model, calls
+
+
+def test_checkpoint_reuses_predictions(tmp_path):
+    """Tests if stored predictions are reused instead of running the model again."""
+    model, calls = get_counting_model()
+    input_data = np.random.random((4, 3))
+    checkpoint = Checkpoint(tmp_path / 'checkpoint.pkl', interval=0)
+    expected = checkpoint.wrap(model)(input_data)
+
+    resumed = Checkpoint(tmp_path / 'checkpoint.pkl')
+    result = resumed.wrap(model)(input_data)
+
+    assert np.array_equal(result, expected)
+    assert len(calls) == 1
+    assert resumed.n_reused == 4
+
+
+def test_rise_resume(tmp_path):
+    """Tests if a resumed RISE explanation gives the same result as an uninterrupted one."""
+    input_data = np.random.random((28, 28, 1))
+    checkpoint_path = tmp_path / 'rise.pkl'
+
+    np.random.seed(42)
+    expected = RISE(n_masks=100, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+        run_model, input_data, batch_size=10)
+
+    np.random.seed(42)
+    interrupted_model, _ = get_counting_model(fail_after=6)
+    with pytest.raises(Preempted):
+        RISE(n_masks=100, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+            interrupted_model, input_data, batch_size=10, checkpoint=Checkpoint(checkpoint_path, interval=0))
+
+    np.random.seed(0)
+    model, calls = get_counting_model()
+    result = RISE(n_masks=100, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+        model, input_data, batch_size=10, checkpoint=checkpoint_path)
+
+    assert np.allclose(result, expected)
+    assert sum(calls) == 40
+    assert not checkpoint_path.exists()
+
+
+def test_rise_resume_other_batch_size(tmp_path):
+    """Tests if a RISE explanation can be resumed with a different batch size and memory budget."""
+    input_data = np.random.random((28, 28, 1))
+    checkpoint_path = tmp_path / 'rise.pkl'
+
+    np.random.seed(42)
+    expected = RISE(n_masks=100, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+        run_model, input_data, batch_size=10)
+
+    np.random.seed(42)
+    interrupted_model, _ = get_counting_model(fail_after=6)
+    with pytest.raises(Preempted):
+        RISE(n_masks=100, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+            interrupted_model, input_data, batch_size=10, checkpoint=Checkpoint(checkpoint_path, interval=0))
+
+    # the masks are streamed in batches of 7 on resume, which must not change them
+    model, calls = get_counting_model()
+    result = RISE(n_masks=100, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+        model, input_data, batch_size=7, max_memory='100KB', checkpoint=checkpoint_path)
+
+    assert np.allclose(result, expected)
+    # the first call is on the unmasked input, which the memory planning needs
+    assert sum(calls[1:]) == 40
+
+
+def test_lime_resume(tmp_path):
+    """Tests if a resumed LIME explanation gives the same result as an uninterrupted one."""
+    # LIME expects values in the [0, 255] range
+    input_data = np.random.random((28, 28, 1)) * 255
+    checkpoint_path = tmp_path / 'lime.pkl'
+    expected = LIME(random_state=42, axis_labels={-1: 'channels'}).explain_image(
+        run_model, input_data, num_samples=100, batch_size=10)
+
+    interrupted_model, _ = get_counting_model(fail_after=5)
+    with pytest.raises(Preempted):
+        LIME(random_state=42, axis_labels={-1: 'channels'}).explain_image(
+            interrupted_model, input_data, num_samples=100, batch_size=10,
+            checkpoint=Checkpoint(checkpoint_path, interval=0))
+
+    model, calls = get_counting_model()
+    result = LIME(random_state=0, axis_labels={-1: 'channels'}).explain_image(
+        model, input_data, num_samples=100, batch_size=10, checkpoint=checkpoint_path)
+
+    assert np.allclose(result, expected)
+    assert sum(calls) < 100
@@ -0,0 +1,123 @@
+import json
+import numpy as np
+import onnx
+import pytest
+from onnx import TensorProto
+from onnx import helper
+from dianna import cli
+from dianna.utils import ResultsReader
+from dianna.utils import ResultsWriter
+from .test_onnx_runner import generate_data
+
+
+def _run_explain(inputs, out, *extra_args):
+    return cli.main(['explain', '--model', 'tests/test_data/mnist_model.onnx', '--method', 'RISE',
+                     '--inputs', str(inputs), '--out', str(out), '--axis-labels', 'channels,y,x',
+                     '--param', 'n_masks=20', '--param', 'p_keep=0.5', *extra_args])
+
+
+def _save_text_model(path):
+    """Saves an ONNX model that scores a batch of token ids by their sum, for the positive and negative class."""
+    nodes = [helper.make_node('Cast', ['token_ids'], ['values'], to=TensorProto.FLOAT),
+             helper.make_node('Constant', [], ['axes'], value=helper.make_tensor('axes', TensorProto.INT64, [1], [1])),
+             helper.make_node('ReduceSum', ['values', 'axes'], ['score'], keepdims=1),
+             helper.make_node('Neg', ['score'], ['negative_score']),
+             helper.make_node('Concat', ['score', 'negative_score'], ['scores'], axis=1)]
+    graph = helper.make_graph(nodes, 'text_model',
+                              [helper.make_tensor_value_info('token_ids', TensorProto.INT64, ['batch', 'length'])],
+                              [helper.make_tensor_value_info('scores', TensorProto.FLOAT, ['batch', 2])])
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)], ir_version=7), path)
+
+
+def test_cli_explain_images(tmp_path, capsys):
+    """Tests if the explain command writes a result for each image in the input directory."""
+    inputs = tmp_path / 'inputs'
+    inputs.mkdir()
+    for i in range(2):
+        np.save(inputs / f'image{i}.npy', generate_data(batch_size=1)[0].astype(np.float32))
+
+    _run_explain(inputs, tmp_path / 'out')
+
+    results = ResultsReader(tmp_path / 'out')
+    assert results.names == ['image0.npy', 'image1.npy']
+    for name in results:
+        assert results[name].shape == (1, 28, 28)
+    # the number of masks each explanation is based on is reported
+    assert capsys.readouterr().out.count('(20 samples)') == 2
+
+
+def test_cli_explain_resume(tmp_path):
+    """Tests if inputs with an existing result are skipped."""
+    inputs = tmp_path / 'inputs'
+    inputs.mkdir()
+    out = tmp_path / 'out'
+    for i in range(2):
+        np.save(inputs / f'image{i}.npy', generate_data(batch_size=1)[0].astype(np.float32))
+    with ResultsWriter(out) as writer:
+        writer.write('image0.npy', np.zeros((1, 28, 28)))
+
+    _run_explain(inputs, out)
+
+    results = ResultsReader(out)
+    assert np.all(results['image0.npy'] == 0)
+    assert 'image1.npy' in results
+
+
+def test_cli_explain_flush_interval(tmp_path):
+    """Tests if every result is written to disk at once with a flush interval of 0, even if its chunk is not full."""
+    inputs = tmp_path / 'inputs'
+    inputs.mkdir()
+    for i in range(2):
+        np.save(inputs / f'image{i}.npy', generate_data(batch_size=1)[0].astype(np.float32))
+
+    _run_explain(inputs, tmp_path / 'out', '--flush-interval', '0')
+
+    chunks = ResultsReader(tmp_path / 'out').metadata['chunks']
+    assert [chunk['names'] for chunk in chunks] == [['image0.npy'], ['image1.npy']]
+
+
+def test_cli_explain_workers_same_file_names(tmp_path):
+    """Tests if worker processes explain all images, keeping images with the same name in different directories."""
+    inputs = tmp_path / 'inputs'
+    for directory in ('a', 'b'):
+        (inputs / directory).mkdir(parents=True)
+        np.save(inputs / directory / 'image.npy', generate_data(batch_size=1)[0].astype(np.float32))
+
+    _run_explain(inputs, tmp_path / 'out', '--workers', '2', '--threads', '1')
+
+    assert sorted(ResultsReader(tmp_path / 'out').names) == ['a/image.npy', 'b/image.npy']
+
+
+def test_cli_explain_text(tmp_path):
+    """Tests if each line of a text file is explained with a text model runner built from the vocabulary."""
+    model = tmp_path / 'text_model.onnx'
+    _save_text_model(str(model))
+    vocab = tmp_path / 'word_vectors.txt'
+    vocab.write_text('<unk> 0 0\n<pad> 0 0\nsuch 1 0\na 0 1\nbad 1 1\nmovie 0 0\n', encoding='utf-8')
+    inputs = tmp_path / 'reviews.txt'
+    inputs.write_text('such a bad movie\n\nbad movie\n', encoding='utf-8')
+
+    cli.main(['explain', '--model', str(model), '--method', 'RISE', '--inputs', str(inputs),
+              '--out', str(tmp_path / 'out'), '--vocab', str(vocab), '--labels', '0',
+              '--param', 'n_masks=20', '--param', 'p_keep=0.5'])
+
+    with open(tmp_path / 'out' / cli.TEXT_RESULTS_FILENAME, encoding='utf-8') as results_file:
+        results = [json.loads(line) for line in results_file]
+    assert [result['name'] for result in results] == ['line_00000000', 'line_00000002']
+    assert [word for word, _, _ in results[0]['explanation'][0]] == ['such', 'a', 'bad', 'movie']
+
+
+def test_cli_explain_text_requires_vocab(tmp_path):
+    """Tests if text inputs without a vocabulary are refused before any model is run."""
+    inputs = tmp_path / 'reviews.txt'
+    inputs.write_text('such a bad movie\n', encoding='utf-8')
+
+    with pytest.raises(SystemExit, match='--vocab'):
+        _run_explain(inputs, tmp_path / 'out')
+
+
+def test_cli_explain_kernelshap_threads(tmp_path):
+    """Tests if --threads is refused for KernelSHAP, which does not run the model with ONNX Runtime."""
+    with pytest.raises(SystemExit, match='--threads'):
+        cli.main(['explain', '--model', 'tests/test_data/mnist_model.onnx', '--method', 'KernelSHAP',
+                  '--inputs', str(tmp_path), '--out', str(tmp_path / 'out'), '--threads', '2'])
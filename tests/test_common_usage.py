@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 import dianna
 import dianna.visualization
 from tests.utils import run_model
@@ -12,3 +13,40 @@ def test_common_RISE_pipeline():  # noqa: N802 ignore case
     heatmap = dianna.explain_image(run_model, input_data, method="RISE", axis_labels=axis_labels)[0]
     dianna.visualization.plot_image(heatmap, show_plot=False)
     dianna.visualization.plot_image(heatmap, original_data=input_data[0], show_plot=False)
+
+
+def test_common_top_k():
+    """Tests if the top labels are selected with the same keyword for every explainer that supports it."""
+    def model(data):
+        return np.stack([np.full(len(data), .2), np.full(len(data), .5), np.full(len(data), .3)], axis=1)
+
+    image = np.random.random((28, 28, 3))
+
+    rise_heatmaps = dianna.explain_image(model, image, 'RISE', axis_labels=axis_labels, n_masks=20, p_keep=.5,
+                                         top_k=2)
+    lime_heatmaps = dianna.explain_image(model, image * 255, 'LIME', axis_labels=axis_labels, num_samples=20,
+                                         top_k=2)
+
+    assert len(rise_heatmaps) == len(lime_heatmaps) == 2
+
+
+def test_common_unsupported_keyword():
+    """Tests if keyword arguments that an explainer does not support give a warning instead of being ignored."""
+    image = np.random.random((28, 28, 3))
+
+    with pytest.warns(UserWarning, match='n_mask'):
+        dianna.explain_image(run_model, image, 'RISE', axis_labels=axis_labels, n_masks=20, p_keep=.5, n_mask=20)
+    with pytest.warns(UserWarning, match='unknown_option'):
+        dianna.explain_image(run_model, image * 255, 'LIME', axis_labels=axis_labels, num_samples=20,
+                             unknown_option=1)
+
+
+def test_common_top_labels_deprecated():
+    """Tests if the deprecated top_labels argument of LIME still selects the top labels, with a warning."""
+    image = np.random.random((28, 28, 3))
+
+    with pytest.warns(DeprecationWarning, match='top_k'):
+        heatmaps = dianna.explain_image(run_model, image * 255, 'LIME', axis_labels=axis_labels, num_samples=20,
+                                        top_labels=2)
+
+    assert len(heatmaps) == 2
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import dianna
+from dianna import utils
+
+
+def mean_model(input_data):
+    """Dummy model with 2 classes based on the mean of each sample."""
+    mean = np.asarray(input_data).reshape(len(input_data), -1).mean(axis=1)
+    return np.stack([mean, 1 - mean], axis=1)
+
+
+def max_model(input_data):
+    """Dummy model with 2 classes based on the maximum of each sample."""
+    maximum = np.asarray(input_data).reshape(len(input_data), -1).max(axis=1)
+    return np.stack([1 - maximum, maximum], axis=1)
+
+
+@pytest.mark.parametrize('parallel', (False, True))
+def test_rise_ensemble(parallel):
+    """Tests if an ensemble explanation gives the same heatmaps as explaining each model with the same masks."""
+    input_data = np.random.random((28, 28, 1))
+    kwargs = {'n_masks': 50, 'p_keep': .5, 'axis_labels': {-1: 'channels'}}
+
+    np.random.seed(0)
+    heatmaps = dianna.explain_image_ensemble([mean_model, max_model], input_data, 'RISE', labels=(1, 0),
+                                             parallel=parallel, **kwargs)
+    expected = []
+    for model in (mean_model, max_model):
+        np.random.seed(0)
+        expected.append(dianna.explain_image(model, input_data, 'RISE', labels=(1, 0), **kwargs))
+
+    assert len(heatmaps) == 2
+    for model_heatmaps, model_expected in zip(heatmaps, expected):
+        assert np.allclose(model_heatmaps, model_expected)
+
+
+@pytest.mark.parametrize('parallel', (False, True))
+def test_lime_ensemble(parallel):
+    """Tests if a LIME ensemble explanation gives the same heatmaps as explaining each model with the same samples."""
+    input_data = np.random.random((28, 28, 1))
+    kwargs = {'num_samples': 100, 'random_state': 42, 'axis_labels': {-1: 'channels'}}
+
+    heatmaps = dianna.explain_image_ensemble([mean_model, max_model], input_data, 'LIME', labels=(1, 0),
+                                             parallel=parallel, **kwargs)
+    expected = [dianna.explain_image(model, input_data, 'LIME', labels=(1, 0), **kwargs)
+                for model in (mean_model, max_model)]
+
+    assert len(heatmaps) == 2
+    for model_heatmaps, model_expected in zip(heatmaps, expected):
+        assert np.allclose(model_heatmaps, model_expected)
+
+
+def test_parallel_ensemble_reuses_threads():
+    """Tests if a parallel ensemble creates its threads once and stops them when it is closed."""
+    input_data = np.random.random((4, 28, 28, 1))
+    with utils.ModelEnsemble([mean_model, max_model], (1, 0), parallel=True) as ensemble:
+        output = ensemble(input_data)
+        executor = ensemble._executor  # pylint: disable=protected-access
+        ensemble(input_data)
+        assert ensemble._executor is executor  # pylint: disable=protected-access
+
+    assert ensemble._executor is None  # pylint: disable=protected-access
+    assert np.allclose(output, np.concatenate([mean_model(input_data)[:, [1, 0]],
+                                               max_model(input_data)[:, [1, 0]]], axis=1))
+
+
+def test_kernelshap_ensemble_not_supported():
+    """Tests if a clear error is raised for methods that cannot explain an ensemble."""
+    with pytest.raises(ValueError, match='KernelSHAP'):
+        dianna.explain_image_ensemble([mean_model, max_model], np.zeros((28, 28, 1)), 'KernelSHAP')
@@ -0,0 +1,61 @@
+import itertools
+import os
+import tempfile
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+from PIL import Image
+from dianna.visualization import plot_image
+from dianna.visualization import render_image
+from dianna.visualization import render_images
+
+
+def test_plot_image_closes_figure():
+    """Tests if plot_image does not leave figures open."""
+    heatmap = np.random.random((8, 8))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        plot_image(heatmap, np.random.random((8, 8)), show_plot=False,
+                   output_filename=os.path.join(tmpdir, 'heatmap.png'))
+
+        assert os.path.exists(os.path.join(tmpdir, 'heatmap.png'))
+    assert not plt.get_fignums()
+
+
+def test_render_image_matches_matplotlib_colors():
+    """Tests if the heatmap colours are those of the colormap, normalized in the same way as matplotlib."""
+    heatmap = np.linspace(-1, 1, 300).reshape(15, 20)
+
+    rgba = render_image(heatmap, heatmap_cmap='bwr')
+
+    expected = matplotlib.colormaps['bwr'](matplotlib.colors.Normalize()(heatmap), bytes=True)
+    assert rgba.dtype == np.uint8
+    assert np.array_equal(rgba, expected)
+
+
+def test_render_image_blends_with_data():
+    """Tests if the heatmap is blended half-transparently onto grayscale and colour data."""
+    heatmap = np.zeros((4, 5))
+    gray = np.full((4, 5), 255.)
+    colour = np.full((4, 5, 3), 1.)
+
+    rgba_gray = render_image(heatmap, gray, heatmap_cmap='gray', vmin=0, vmax=1)
+    rgba_colour = render_image(heatmap, colour, heatmap_cmap='gray', vmin=0, vmax=1)
+
+    assert np.all(rgba_gray[..., :3] == 128)
+    assert np.all(rgba_colour[..., :3] == 128)
+    assert np.all(rgba_gray[..., 3] == 255)
+
+
+def test_render_images_writes_pngs():
+    """Tests if a batch of heatmaps is written to PNG files with the same pixels as render_image."""
+    heatmaps = np.random.random((3, 6, 7))
+    image = np.random.random((6, 7, 3))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filenames = [os.path.join(tmpdir, f'{i}.png') for i in range(len(heatmaps))]
+        render_images(heatmaps, filenames, original_data=itertools.repeat(image), vmin=0, vmax=1)
+
+        for heatmap, filename in zip(heatmaps, filenames):
+            with Image.open(filename) as png:
+                assert np.array_equal(np.asarray(png), render_image(heatmap, image, vmin=0, vmax=1))
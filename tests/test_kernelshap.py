@@ -65,3 +65,29 @@ class ShapOnImages(TestCase):
         )
 
         assert shap_values[0].shape == np.zeros((1, n_segments)).shape
+
+    def test_shap_explain_image_labels(self):
+        """Tests if only the SHAP values of the requested labels are returned."""
+        input_data = np.random.random((1, 28, 28))
+        onnx_model_path = "./tests/test_data/mnist_model.onnx"
+        explainer = KernelSHAP(axis_labels=('channels', 'height', 'width'))
+
+        shap_values, _ = explainer.explain_image(onnx_model_path, input_data, labels=(1, ), nsamples=100,
+                                                 n_segments=20)
+
+        assert explainer.explained_labels == (1, )
+        assert len(shap_values) == 1
+        assert shap_values[0].shape == (1, 20)
+
+    def test_shap_explain_image_all_labels(self):
+        """Tests if the SHAP values of all classes are returned when labels is None."""
+        input_data = np.random.random((1, 28, 28))
+        onnx_model_path = "./tests/test_data/mnist_model.onnx"
+        explainer = KernelSHAP(axis_labels=('channels', 'height', 'width'))
+
+        shap_values, _ = explainer.explain_image(onnx_model_path, input_data, labels=None, nsamples=100,
+                                                 n_segments=20)
+
+        # the test model distinguishes 2 classes
+        assert explainer.explained_labels == (0, 1)
+        assert [values.shape for values in shap_values] == [(1, 20), (1, 20)]
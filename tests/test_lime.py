@@ -37,6 +37,19 @@ class LimeOnImages(TestCase):
         assert heatmap[0].shape == input_data[0].shape
         assert np.allclose(heatmap, heatmap_expected, atol=.01)
 
+    def test_lime_top_k(self):
+        """Test if lime explains the labels with the highest prediction for the unperturbed image."""
+        input_data = np.random.random((28, 28, 3)) * 255
+
+        def model(data):
+            return np.stack([np.full(len(data), .2), np.full(len(data), .5), np.full(len(data), .3)], axis=1)
+
+        explainer = LIME(random_state=42, axis_labels=('y', 'x', 'channels'))
+        heatmaps = explainer.explain_image(model, input_data, top_k=2, num_samples=20)
+
+        assert explainer.explained_labels == (1, 2)
+        assert len(heatmaps) == 2
+
 
 def test_lime_text():
     """Tests exact expected output given a text and model for Lime."""
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+from dianna.methods.lime import LIME
+from dianna.methods.rise import RISE
+from dianna.utils import MemoryBudget
+from dianna.utils import parse_memory_size
+from tests.utils import run_model
+
+
+def test_parse_memory_size():
+    """Tests if memory sizes are converted to bytes."""
+    assert parse_memory_size(None) is None
+    assert parse_memory_size(1000) == 1000
+    assert parse_memory_size('512KB') == 512 * 1024
+    assert parse_memory_size('1.5 gb') == int(1.5 * 1024 ** 3)
+    with pytest.raises(ValueError):
+        parse_memory_size('a lot')
+
+
+def test_memory_budget_chunk_size():
+    """Tests if chunks are sized to the memory that is not reserved."""
+    memory = MemoryBudget(1000)
+    memory.reserve(200, 'The input data')
+
+    assert memory.chunk_size(100) == 8
+    assert memory.chunk_size(100, max_items=5) == 5
+    assert MemoryBudget().chunk_size(100, max_items=5) == 5
+    with pytest.raises(MemoryError, match='The input data'):
+        memory.reserve(1000, 'The input data')
+
+
+def test_rise_max_memory_streams_masks():
+    """Tests if RISE generates the masks per batch when they do not all fit in the memory budget."""
+    input_data = np.random.random((28, 28, 1)).astype(np.float32)
+    batch_sizes = []
+
+    def model(data):
+        batch_sizes.append(len(data))
+        return run_model(data)
+
+    explainer = RISE(n_masks=200, p_keep=.5, axis_labels={-1: 'channels'})
+    heatmaps = explainer.explain_image(model, input_data, batch_size=100, max_memory='100KB')
+
+    assert heatmaps.shape == (2, 28, 28)
+    assert explainer.masks is None
+    assert explainer.n_evaluated_masks == 200
+    assert max(batch_sizes) < 100
+
+
+def test_rise_streamed_masks_match_kept_masks():
+    """Tests if the masks generated per batch are the same as those generated at once, for any batch size."""
+    def run_mean_model(batch):
+        # unlike run_model, the output of each sample does not depend on the rest of the batch
+        means = batch.reshape(len(batch), -1).mean(axis=1)
+        return np.stack([means, 1 - means], axis=1)
+
+    input_data = np.random.random((28, 28, 1)).astype(np.float32)
+    heatmaps = []
+    for batch_size, max_memory in ((100, None), (100, '100KB'), (7, '100KB')):
+        np.random.seed(0)
+        explainer = RISE(n_masks=50, p_keep=.5, axis_labels={-1: 'channels'}, sampler='sobol')
+        heatmaps.append(explainer.explain_image(run_mean_model, input_data, batch_size=batch_size,
+                                                  max_memory=max_memory))
+
+    assert np.allclose(heatmaps[1], heatmaps[0])
+    assert np.allclose(heatmaps[2], heatmaps[0])
+
+
+def test_rise_max_memory_too_small():
+    """Tests if RISE raises an error before running the model if the input does not fit in the memory budget."""
+    input_data = np.random.random((28, 28, 1))
+    explainer = RISE(n_masks=10, p_keep=.5, axis_labels={-1: 'channels'})
+
+    with pytest.raises(MemoryError, match='The input data'):
+        explainer.explain_image(run_model, input_data, max_memory=1000)
+
+
+def test_lime_max_memory_limits_batch_size():
+    """Tests if LIME runs the model in batches that fit in the memory budget."""
+    input_data = np.random.random((28, 28, 1))
+    batch_sizes = []
+
+    def model(data):
+        batch_sizes.append(len(data))
+        return run_model(data)
+
+    explainer = LIME(random_state=42, axis_labels={-1: 'channels'})
+    explainer.explain_image(model, input_data, num_samples=100, batch_size=50, max_memory='500KB')
+
+    assert max(batch_sizes) < 50
+
+
+def test_lime_max_memory_without_batch_size():
+    """Tests if LIME uses the largest batch size that fits in the memory budget if no batch size is given."""
+    input_data = np.random.random((28, 28, 1))
+    batch_sizes = []
+
+    def model(data):
+        batch_sizes.append(len(data))
+        return run_model(data)
+
+    explainer = LIME(random_state=42, axis_labels={-1: 'channels'})
+    explainer.explain_image(model, input_data, num_samples=100, batch_size=None, max_memory='500KB')
+
+    assert 1 < max(batch_sizes) < 100
+
+
+def test_rise_max_memory_no_extra_model_run():
+    """Tests if the memory planning of RISE shares the prediction for the unmasked image with top_k."""
+    input_data = np.random.random((28, 28, 1)).astype(np.float32)
+    batch_sizes = {}
+
+    for max_memory in (None, '10MB'):
+        batch_sizes[max_memory] = []
+
+        def model(data, calls=batch_sizes[max_memory]):
+            calls.append(len(data))
+            return run_model(data)
+
+        explainer = RISE(n_masks=20, p_keep=.5, axis_labels={-1: 'channels'})
+        explainer.explain_image(model, input_data, batch_size=10, max_memory=max_memory, top_k=1)
+
+    assert batch_sizes['10MB'] == batch_sizes[None]
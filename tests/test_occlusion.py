@@ -0,0 +1,66 @@
+import os
+import tempfile
+import numpy as np
+import dianna
+from dianna.methods.occlusion import Occlusion
+from tests.test_onnx_runner import generate_data
+
+
+def patch_model(input_data):
+    """Dummy model that only looks at the pixels in rows 4-7 and columns 8-11 of a channels-last image."""
+    mean = input_data[:, 4:8, 8:12].reshape(len(input_data), -1).mean(axis=1)
+    return np.stack([mean, 1 - mean], axis=1)
+
+
+def test_occlusion_localizes():
+    """Tests if only the patch the model looks at is relevant, with opposite sign for the two labels."""
+    input_data = np.ones((16, 16, 3), dtype=np.float32)
+    explainer = Occlusion(patch_size=4, axis_labels={-1: 'channels'})
+
+    heatmaps = explainer.explain_image(patch_model, input_data, labels=(0, 1))
+
+    expected = np.zeros((16, 16))
+    expected[4:8, 8:12] = 1
+    assert explainer.n_patches == 16
+    assert np.allclose(heatmaps, [expected, -expected])
+
+
+def test_occlusion_batching():
+    """Tests if the result does not depend on the batch size, prefetching or the layout of the input."""
+    input_data = np.random.random((3, 15, 17)).astype(np.float32)
+    explainer = Occlusion(patch_size=5, stride=2, baseline='mean', axis_labels=('channels', 'y', 'x'))
+
+    def model(data):
+        return patch_model(np.moveaxis(data, 1, -1))
+
+    expected = explainer.explain_image(model, input_data, labels=(0, ), batch_size=100)
+    heatmaps = explainer.explain_image(model, input_data, labels=(0, ), batch_size=7, prefetch=2)
+    channels_last = Occlusion(patch_size=5, stride=2, baseline='mean', axis_labels={-1: 'channels'})
+    heatmaps_channels_last = channels_last.explain_image(patch_model, np.moveaxis(input_data, 0, -1), labels=(0, ))
+
+    assert np.allclose(heatmaps, expected)
+    assert np.allclose(heatmaps_channels_last, expected)
+
+
+def test_occlusion_memmap_output():
+    """Tests if the saliency can be written to a memory-mapped file."""
+    input_data = np.random.random((16, 16, 1)).astype(np.float32)
+    explainer = Occlusion(patch_size=3, axis_labels={-1: 'channels'})
+    expected = explainer.explain_image(patch_model, input_data, labels=(1, ))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out = os.path.join(tmpdir, 'saliency.npy')
+        explainer.explain_image(patch_model, input_data, labels=(1, ), out=out)
+
+        assert np.allclose(np.load(out), expected)
+
+
+def test_occlusion_filename():
+    """Tests if occlusion runs through dianna.explain_image, given an ONNX model file."""
+    model_filename = 'tests/test_data/mnist_model.onnx'
+    input_data = generate_data(batch_size=1).astype(np.float32)[0]
+
+    heatmaps = dianna.explain_image(model_filename, input_data, method='Occlusion', labels=(0, 1),
+                                    axis_labels=('channels', 'y', 'x'), patch_size=7, stride=3)
+
+    assert heatmaps.shape == (2, ) + input_data.shape[1:]
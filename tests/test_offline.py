@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from dianna.methods.lime import LIME
+from dianna.methods.rise import RISE
+from dianna.utils import PerturbationExport
+from dianna.utils import PredictionImport
+
+
+def run_model(input_data):
+    """Dummy model with 2 classes of which the output only depends on the input sample."""
+    mean = np.asarray(input_data).reshape(len(input_data), -1).mean(axis=1)
+    return np.stack([mean, 1 - mean], axis=1)
+
+
+def fail_model(input_data):
+    """Model that must not be called."""
+    raise AssertionError('The model should not be run')
+
+
+def run_external_pipeline(path):
+    """Runs the model on all exported inputs, like an external batch-inference system would."""
+    for inputs_file in sorted(path.glob('inputs_*.npy')):
+        predictions = run_model(np.load(inputs_file))
+        np.save(path / inputs_file.name.replace('inputs_', 'predictions_'), predictions)
+
+
+def test_rise_offline(tmp_path):
+    """Tests if RISE gives the same result from exported perturbations and imported predictions."""
+    input_data = np.random.random((28, 28, 1))
+    np.random.seed(42)
+    expected = RISE(n_masks=50, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+        run_model, input_data, batch_size=10)
+
+    np.random.seed(42)
+    RISE(n_masks=50, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+        fail_model, input_data, batch_size=10, checkpoint=PerturbationExport(tmp_path, n_outputs=2, chunk_size=20))
+    assert len(list(tmp_path.glob('inputs_*.npy'))) == 3
+
+    run_external_pipeline(tmp_path)
+    np.random.seed(0)
+    result = RISE(n_masks=50, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+        fail_model, input_data, batch_size=10, checkpoint=PredictionImport(tmp_path))
+
+    assert np.allclose(result, expected)
+
+
+def test_lime_offline(tmp_path):
+    """Tests if LIME gives the same result from exported perturbations and imported predictions."""
+    input_data = np.random.random((28, 28, 1)) * 255
+    expected = LIME(random_state=42, axis_labels={-1: 'channels'}).explain_image(
+        run_model, input_data, num_samples=50, batch_size=10)
+
+    LIME(random_state=42, axis_labels={-1: 'channels'}).explain_image(
+        fail_model, input_data, num_samples=50, batch_size=10, checkpoint=PerturbationExport(tmp_path, n_outputs=2))
+    run_external_pipeline(tmp_path)
+    result = LIME(random_state=42, axis_labels={-1: 'channels'}).explain_image(
+        fail_model, input_data, num_samples=50, batch_size=10, checkpoint=PredictionImport(tmp_path))
+
+    assert np.allclose(result, expected)
+
+
+def test_missing_predictions(tmp_path):
+    """Tests if a clear error is raised when the predictions have not been computed yet."""
+    exporter = PerturbationExport(tmp_path, n_outputs=2)
+    exporter.restore_random_state(np.random)
+    exporter.wrap(None)(np.ones((3, 2)))
+    exporter.remove()
+
+    with pytest.raises(FileNotFoundError, match='predictions_000000.npy'):
+        PredictionImport(tmp_path)
+
+
+def test_export_refuses_tuned_parameters(tmp_path):
+    """Tests if parameters that are tuned using the model output are refused while exporting."""
+    input_data = np.random.random((28, 28, 1))
+
+    with pytest.raises(ValueError, match='p_keep'):
+        RISE(n_masks=50, axis_labels={-1: 'channels'}).explain_image(
+            fail_model, input_data, checkpoint=PerturbationExport(tmp_path, n_outputs=2))
+    with pytest.raises(ValueError, match='top_k'):
+        RISE(n_masks=50, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+            fail_model, input_data, top_k=1, checkpoint=PerturbationExport(tmp_path, n_outputs=2))
+    with pytest.raises(ValueError, match='top_k'):
+        LIME(random_state=42, axis_labels={-1: 'channels'}).explain_image(
+            fail_model, input_data * 255, top_k=1, num_samples=20,
+            checkpoint=PerturbationExport(tmp_path, n_outputs=2))
+    with pytest.raises(ValueError, match='batch_size'):
+        RISE(n_masks=50, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+            fail_model, input_data, batch_size='auto', checkpoint=PerturbationExport(tmp_path, n_outputs=2))
+    with pytest.raises(ValueError, match='time_budget'):
+        LIME(random_state=42, axis_labels={-1: 'channels'}).explain_image(
+            fail_model, input_data * 255, num_samples=20, time_budget=10,
+            checkpoint=PerturbationExport(tmp_path, n_outputs=2))
+
+
+def test_rise_offline_max_memory(tmp_path):
+    """Tests if RISE takes the number of outputs from the export instead of running the model for its memory plan."""
+    input_data = np.random.random((28, 28, 1))
+
+    RISE(n_masks=50, p_keep=.5, axis_labels={-1: 'channels'}).explain_image(
+        fail_model, input_data, batch_size=10, max_memory='100KB', checkpoint=PerturbationExport(tmp_path, n_outputs=2))
+
+    assert (tmp_path / 'inputs_000000.npy').exists()
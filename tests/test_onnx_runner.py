@@ -1,4 +1,9 @@
+import json
+import os
+import shutil
 import numpy as np
+import pytest
+import dianna
 from dianna.utils.onnx_runner import SimpleModelRunner
 
 
@@ -17,3 +22,75 @@ def test_onnx_runner():
     pred_onnx = runner(generate_data(batch_size).astype(np.float32))
 
     assert pred_onnx.shape == (batch_size, n_classes)
+    assert runner.n_outputs == n_classes
+
+
+def test_onnx_runner_options():
+    """Tests if the onnx runner applies the session options and reuses its session."""
+    filename = 'tests/test_data/mnist_model.onnx'
+    runner_options = {'intra_op_num_threads': 1, 'inter_op_num_threads': 1, 'graph_optimization_level': 'basic'}
+
+    runner = SimpleModelRunner(filename, runner_options=runner_options)
+    runner(generate_data(2).astype(np.float32))
+    session = runner.session
+
+    assert session.get_session_options().intra_op_num_threads == 1
+    assert runner(generate_data(2).astype(np.float32)).shape == (2, 2)
+    assert runner.session is session
+
+
+def test_onnx_runner_optimized_model_file(tmp_path):
+    """Tests if the optimized model is written to disk and can be used by a new runner."""
+    filename = 'tests/test_data/mnist_model.onnx'
+    optimized_filename = str(tmp_path / 'optimized.onnx')
+    input_data = generate_data(2).astype(np.float32)
+
+    expected = SimpleModelRunner(filename, runner_options={'optimized_model_filepath': optimized_filename})(input_data)
+    pred_onnx = SimpleModelRunner(filename, runner_options={'optimized_model_filepath': optimized_filename})(input_data)
+
+    assert os.path.exists(optimized_filename)
+    assert np.allclose(pred_onnx, expected)
+
+
+def test_onnx_runner_stale_optimized_model_file(tmp_path):
+    """Tests if an optimized model is made again when the model file or the optimization options changed."""
+    filename = str(tmp_path / 'model.onnx')
+    shutil.copy('tests/test_data/mnist_model.onnx', filename)
+    optimized_filename = str(tmp_path / 'optimized.onnx')
+    input_data = generate_data(2).astype(np.float32)
+    expected = SimpleModelRunner(filename)(input_data)
+    # an unrelated file, which must not be loaded as the optimized model
+    with open(optimized_filename, 'wb') as optimized_file:
+        optimized_file.write(b'stale')
+
+    pred_onnx = SimpleModelRunner(filename, runner_options={'optimized_model_filepath': optimized_filename})(input_data)
+    os.utime(filename, (os.path.getatime(filename), os.path.getmtime(filename) + 10))
+    pred_onnx_changed_model = SimpleModelRunner(filename, runner_options={
+        'optimized_model_filepath': optimized_filename})(input_data)
+    pred_onnx_changed_options = SimpleModelRunner(filename, runner_options={
+        'optimized_model_filepath': optimized_filename, 'graph_optimization_level': 'basic'})(input_data)
+
+    assert np.allclose(pred_onnx, expected)
+    assert np.allclose(pred_onnx_changed_model, expected)
+    assert np.allclose(pred_onnx_changed_options, expected)
+    with open(f'{optimized_filename}.json', encoding='utf-8') as info_file:
+        info = json.load(info_file)
+    assert info['graph_optimization_level'] == 'basic'
+    assert info['model_mtime'] == os.path.getmtime(filename)
+
+
+def test_onnx_runner_unknown_option():
+    """Tests if an error is raised for unknown runner options."""
+    with pytest.raises(ValueError):
+        SimpleModelRunner('tests/test_data/mnist_model.onnx', runner_options={'n_threads': 1})
+
+
+def test_runner_options_from_explain_image():
+    """Tests if runner options can be given to dianna.explain_image."""
+    input_data = generate_data(batch_size=1).astype(np.float32)[0]
+
+    heatmaps = dianna.explain_image('tests/test_data/mnist_model.onnx', input_data, method="RISE",
+                                    axis_labels=('channels', 'y', 'x'), n_masks=20, p_keep=.5,
+                                    runner_options={'intra_op_num_threads': 1})
+
+    assert heatmaps[0].shape == input_data.shape[1:]
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from dianna.utils import ResultsReader
+from dianna.utils import ResultsWriter
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_results_dense_roundtrip(tmp_path, compress):
+    """Tests if dense saliency maps are read back exactly, from compressed and memory-mapped chunks."""
+    saliencies = {f'image{i}': np.random.random((2, 8, 10)).astype(np.float32) for i in range(5)}
+
+    with ResultsWriter(tmp_path, method='RISE', params={'n_masks': 100}, chunk_size=2, compress=compress) as writer:
+        for name, saliency in saliencies.items():
+            writer.write(name, saliency)
+    results = ResultsReader(tmp_path)
+
+    assert results.names == list(saliencies)
+    assert results.metadata['method'] == 'RISE'
+    assert len(results.metadata['chunks']) == 3
+    for name, saliency in saliencies.items():
+        assert np.array_equal(results[name], saliency)
+
+
+def test_results_float16(tmp_path):
+    """Tests if float16 quantization keeps the values close to the original, also for large values."""
+    saliency = np.random.random((2, 8, 10)) * np.array([1e-3, 1e6])[:, None, None]
+
+    with ResultsWriter(tmp_path, dtype=np.float16) as writer:
+        writer.write('image', saliency)
+
+    assert np.allclose(ResultsReader(tmp_path)['image'], saliency, rtol=1e-3)
+
+
+def test_results_segments(tmp_path):
+    """Tests if segment encoding stores each segment once and decodes to the original maps."""
+    segments = np.repeat(np.arange(4), 25).reshape(10, 10)
+    values = np.random.random((3, 4))
+    saliency = values[:, segments]
+
+    with ResultsWriter(tmp_path, encoding='segments') as writer:
+        writer.write('dense', saliency)
+        writer.write('kernelshap', ([values], segments))
+    results = ResultsReader(tmp_path)
+
+    assert results.get_segments('dense')[0].shape == (4, 3)
+    assert np.allclose(results['dense'], saliency)
+    assert np.allclose(results['kernelshap'], saliency)
+
+
+@pytest.mark.parametrize('encoding', ['dense', 'segments'])
+def test_results_segment_ids_without_value(tmp_path, encoding):
+    """Tests if segment ids beyond the values of a KernelSHAP result, which SLIC can produce, get no importance."""
+    segments = np.repeat(np.arange(6), 10).reshape(6, 10)
+    values = np.random.random((2, 4))
+
+    with ResultsWriter(tmp_path, encoding=encoding) as writer:
+        writer.write('kernelshap', (list(values[:, None]), segments))
+    saliency = ResultsReader(tmp_path)['kernelshap']
+
+    assert np.allclose(saliency[:, :4], values[:, :, None])
+    assert np.all(saliency[:, 4:] == 0)
+
+
+def test_results_append_and_duplicate(tmp_path):
+    """Tests if a store can be appended to and if duplicate names are refused."""
+    with ResultsWriter(tmp_path) as writer:
+        writer.write('first', np.zeros((1, 4, 4)))
+    with ResultsWriter(tmp_path) as writer:
+        writer.write('second', np.ones((1, 4, 4)))
+        with pytest.raises(ValueError):
+            writer.write('first', np.ones((1, 4, 4)))
+
+    assert ResultsReader(tmp_path).names == ['first', 'second']
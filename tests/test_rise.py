@@ -1,9 +1,14 @@
+import os
+import tempfile
 from unittest import TestCase
 
 import dianna
 import dianna.visualization
 import numpy as np
 from dianna.methods.rise import RISE
+from dianna.methods.rise import images
+from dianna.methods.rise import masks as rise_masks
+from dianna.methods.rise import text
 from dianna.utils import get_function
 from tests.utils import ModelRunner, run_model, get_mnist_1_data
 
@@ -40,11 +45,62 @@ class RiseOnImages(TestCase):
         model_filename = 'tests/test_data/mnist_model.onnx'
         data = get_mnist_1_data().astype(np.float32)
 
-        p_keep = RISE()._determine_p_keep_for_images(  # pylint: disable=protected-access
-            data, get_function(model_filename))
+        p_keep = images.determine_p_keep(RISE(), data, get_function(model_filename))
 
         assert np.isclose(p_keep, expected_p_exact_keep)
 
+    def test_rise_labels_match_all_labels(self):
+        """Tests if explaining a subset of labels gives the same heatmaps as explaining all labels."""
+        input_data = np.random.random((28, 28, 1))
+        explainer = RISE(n_masks=50, p_keep=.5, axis_labels={-1: 'channels'})
+
+        np.random.seed(0)
+        all_heatmaps = explainer.explain_image(run_model, input_data, labels=None)
+        np.random.seed(0)
+        heatmaps = explainer.explain_image(run_model, input_data, labels=(1, ))
+
+        assert np.allclose(heatmaps, all_heatmaps[[1]])
+
+    def test_rise_top_k(self):
+        """Tests if top_k explains the labels with the highest prediction for the unmasked image."""
+        input_data = np.random.random((28, 28, 1))
+
+        def model(data):
+            return np.stack([np.full(len(data), .2), np.full(len(data), .5), np.full(len(data), .3)], axis=1)
+
+        explainer = RISE(n_masks=20, p_keep=.5, axis_labels={-1: 'channels'})
+        heatmaps = explainer.explain_image(model, input_data, top_k=2)
+
+        assert explainer.explained_labels == (1, 2)
+        assert heatmaps.shape == (2, 28, 28)
+
+    def test_rise_samplers(self):
+        """Tests if all mask samplers generate masks of the right shape and keep probability."""
+        for sampler in ('random', 'stratified', 'sobol', 'antithetic'):
+            explainer = RISE(feature_res=8, sampler=sampler)
+            masks = explainer.generate_masks_for_images((28, 28), .5, 64)
+
+            assert masks.shape == (64, 28, 28, 1)
+            assert np.isclose(masks.mean(), .5, atol=.05)
+
+    def test_rise_antithetic_pairs_masks_of_channel_groups(self):
+        """Tests if antithetic pairs are formed between masks, with all channel groups of a mask in one grid."""
+        grids, _ = rise_masks.sample_image_grids('antithetic', (8, 8), .5, 6, feature_res=4, n_groups=3)
+
+        assert grids.shape == (6, 3, 4, 4)
+        assert np.all(grids[1::2] == ~grids[::2])
+
+    def test_rise_stratified_sampler_keeps_exact_fraction(self):
+        """Tests if the stratified sampler keeps the same number of cells in each mask."""
+        masks = text.generate_masks(RISE(sampler='stratified'), (20, ), .3, 10)
+
+        assert np.all(masks.sum(axis=1) == 6)
+
+    def test_rise_unknown_sampler(self):
+        """Tests if an unknown sampler is rejected."""
+        with self.assertRaises(ValueError):
+            RISE(sampler='halton')
+
 
 class RiseOnText(TestCase):
     """Suite of RISE tests for the text case."""
@@ -79,6 +135,253 @@ class RiseOnText(TestCase):
         runner = get_function(runner)
         input_tokens = np.asarray(runner.tokenizer(input_text))
 
-        p_keep = RISE()._determine_p_keep_for_text(input_tokens, runner)  # pylint: disable=protected-access
+        p_keep = text.determine_p_keep(RISE(), input_tokens, runner)
 
         assert np.isclose(p_keep, expected_p_exact_keep)
+
+
+class KeywordModel:
+    """Text model that predicts the second class if the text contains the word 'good'."""
+    def __init__(self):
+        """Uses a tokenizer that splits on white space and full stops, without network access."""
+        self.tokenizer = lambda text: text.replace('.', ' .').split()
+
+    def __call__(self, sentences):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        good = np.array([float('good' in sentence.split()) for sentence in sentences])
+        return np.stack([1 - good, good], axis=1)
+
+
+class RiseOnLongText(TestCase):
+    """Suite of RISE tests for long texts explained in windows."""
+    def test_rise_text_windows_single_window(self):
+        """Tests if a text that fits in a single window gives the same importances as explain_text."""
+        text = 'The film was bad, but the ending was good.'
+        np.random.seed(0)
+        expected = RISE(n_masks=50, p_keep=.5).explain_text(KeywordModel(), text, labels=(1, ))
+        np.random.seed(0)
+        explanation = RISE(n_masks=50, p_keep=.5).explain_text_windows(KeywordModel(), text, window_size=100,
+                                                                       labels=(1, ))
+
+        assert np.allclose([item[2] for item in explanation[0]], [item[2] for item in expected[0]])
+        assert [text[item[1]:item[1] + len(item[0])] for item in explanation[0]] == \
+            [item[0] for item in explanation[0]]
+
+    def test_rise_text_windows_long_document(self):
+        """Tests if the relevant word of a long document is found, at its offset in the text."""
+        np.random.seed(0)
+        text = 'The film was bad. ' * 30 + 'But the ending was good. ' + 'The film was bad. ' * 30
+        explainer = RISE(n_masks=100, p_keep=.5)
+
+        explanation = explainer.explain_text_windows(KeywordModel(), text, window_size=20, labels=(1, ),
+                                                     overlap=5, batch_size=64, prefetch=1)[0]
+
+        word, offset, _ = max(explanation, key=lambda item: item[2])
+        assert len(explanation) == len(KeywordModel().tokenizer(text))
+        assert word == 'good'
+        assert offset == text.index('good')
+
+
+class RiseOnVolumes(TestCase):
+    """Suite of RISE tests for images with more than two spatial axes or many channels."""
+    def test_rise_volume(self):
+        """Tests if the part of a channels-first volume that the model looks at is the most relevant."""
+        np.random.seed(0)
+        input_data = np.ones((1, 12, 16, 16), dtype=np.float32)
+
+        def model(data):
+            mean = data[:, :, :6, :8, :8].reshape(len(data), -1).mean(axis=1)
+            return np.stack([mean, 1 - mean], axis=1)
+
+        explainer = RISE(n_masks=300, p_keep=.5, feature_res=4,
+                         axis_labels=('channels', 'depth', 'height', 'width'))
+        heatmaps = explainer.explain_image(model, input_data, labels=(0, ), batch_size=64)
+
+        assert heatmaps.shape == (1, 12, 16, 16)
+        assert explainer.masks is None
+        assert heatmaps[0, :6, :8, :8].mean() > heatmaps[0, 6:, 8:, 8:].mean()
+
+    def test_rise_channel_groups(self):
+        """Tests if the group of channels that the model looks at is the most relevant."""
+        np.random.seed(0)
+        input_data = np.ones((8, 8, 30), dtype=np.float32)
+
+        def model(data):
+            mean = data[..., 20:30].reshape(len(data), -1).mean(axis=1)
+            return np.stack([mean, 1 - mean], axis=1)
+
+        explainer = RISE(n_masks=100, p_keep=.5, feature_res=2, axis_labels={-1: 'channels'})
+        heatmaps = explainer.explain_image(model, input_data, labels=(0, ), channel_groups=3)
+        heatmaps_by_index = explainer.explain_image(model, input_data, labels=(0, ),
+                                                    channel_groups=np.repeat([0, 1, 2], 10))
+
+        assert heatmaps.shape == heatmaps_by_index.shape == (1, 8, 8, 3)
+        assert heatmaps[0, ..., 2].mean() > heatmaps[0, ..., :2].mean() + .1
+        assert heatmaps_by_index[0, ..., 2].mean() > heatmaps_by_index[0, ..., :2].mean() + .1
+
+    def test_rise_masks_volume(self):
+        """Tests the shape and range of masks with three spatial axes and channel groups."""
+        masks = RISE(feature_res=3).generate_masks_for_images((5, 6, 7), .5, 4, n_groups=2)
+
+        assert masks.shape == (4, 5, 6, 7, 2)
+        assert masks.min() >= 0 and masks.max() <= 1
+
+
+class RiseOnSequences(TestCase):
+    """Suite of RISE tests for sequences of images."""
+    @staticmethod
+    def _model(data):
+        mean = (data[:, 4:10, 4:10] ** 2).reshape(len(data), -1).mean(axis=1)
+        return np.stack([mean, 1 - mean], axis=1)
+
+    def test_rise_sequence_shares_masks(self):
+        """Tests if each frame is explained as explain_image does with the same masks."""
+        frames = np.random.random((4, 16, 16, 1)).astype(np.float32)
+        explainer = RISE(n_masks=30, p_keep=.5, axis_labels={-1: 'channels'})
+        np.random.seed(0)
+        heatmaps = dianna.explain_image_sequence(self._model, frames, 'RISE', labels=(0, 1), batch_size=7,
+                                                 n_masks=30, p_keep=.5, axis_labels={-1: 'channels'})
+        np.random.seed(0)
+        expected = explainer.explain_image(self._model, frames[2], labels=(0, 1))
+
+        assert heatmaps.shape == (4, 2, 16, 16)
+        assert np.allclose(heatmaps[2], expected, atol=1e-6)
+
+    def test_rise_sequence_warm_start(self):
+        """Tests if warm-started frames are more accurate than explanations with the same number of new masks."""
+        base = np.random.RandomState(1).random((16, 16, 1))
+        frames = np.stack([base * (1 + .01 * i) for i in range(4)]).astype(np.float32)
+        reference = RISE(n_masks=10000, p_keep=.5, axis_labels={-1: 'channels'}).explain_image_sequence(
+            self._model, frames, batch_size=500)
+
+        np.random.seed(0)
+        explainer = RISE(n_masks=1000, p_keep=.5, axis_labels={-1: 'channels'})
+        heatmaps = explainer.explain_image_sequence(self._model, frames, warm_start_masks=100, batch_size=128)
+        cold = RISE(n_masks=100, p_keep=.5, axis_labels={-1: 'channels'})
+        cold_heatmaps = np.stack([cold.explain_image(self._model, frame, labels=(0, )) for frame in frames])
+
+        assert explainer.keyframes == [0]
+        assert explainer.n_evaluated_masks == 1000 + 3 * 100
+        assert np.abs(heatmaps[1:] - reference[1:]).mean() < np.abs(cold_heatmaps[1:] - reference[1:]).mean()
+
+
+    def test_rise_sequence_warm_start_without_masks(self):
+        """Tests if warm-starting with no masks, which would give no correction to normalize, is refused."""
+        frames = np.random.random((2, 16, 16, 1)).astype(np.float32)
+        explainer = RISE(n_masks=10, p_keep=.5, axis_labels={-1: 'channels'})
+
+        with self.assertRaisesRegex(ValueError, 'warm_start_masks'):
+            explainer.explain_image_sequence(self._model, frames, warm_start_masks=0)
+
+
+class RiseTiled(TestCase):
+    """Suite of tests for RISE on images that are larger than the model input."""
+    def test_rise_tiled_single_tile(self):
+        """Tests if an image of the size of a tile gives the same result as explain_image."""
+        input_data = np.random.random((16, 16, 1))
+
+        def model(data):
+            mean = data.reshape(len(data), -1).mean(axis=1)
+            return np.stack([mean, 1 - mean], axis=1)
+
+        explainer = RISE(n_masks=20, p_keep=.5, axis_labels={-1: 'channels'})
+        np.random.seed(0)
+        expected = explainer.explain_image(model, input_data, labels=(1, ))
+        np.random.seed(0)
+        heatmaps = explainer.explain_image_tiled(model, input_data, (16, 16), labels=(1, ))
+
+        assert np.allclose(heatmaps, expected, atol=1e-6)
+
+    def test_rise_tiled_memmap(self):
+        """Tests if a memory-mapped image is explained into a memory-mapped output covering the full image."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_data = np.lib.format.open_memmap(os.path.join(tmpdir, 'image.npy'), mode='w+',
+                                                   dtype=np.float32, shape=(1, 40, 50))
+            input_data[:] = np.random.random(input_data.shape)
+            out = os.path.join(tmpdir, 'saliency.npy')
+
+            explainer = RISE(n_masks=10, p_keep=.5, axis_labels=('channels', 'y', 'x'))
+            heatmaps = explainer.explain_image_tiled(run_model, input_data, (16, 16), labels=(0, 1), overlap=4, out=out)
+
+            assert heatmaps.shape == (2, 40, 50)
+            assert np.all(np.isfinite(np.load(out)))
+            assert sorted(os.listdir(tmpdir)) == ['image.npy', 'saliency.npy']
+
+
+class RiseOnTimeseries(TestCase):
+    """Suite of RISE tests for the time series case."""
+    @staticmethod
+    def _window_model(data):
+        """Model that only looks at time steps 400-499 of a channels-last time series."""
+        mean = data[:, 400:500].reshape(len(data), -1).mean(axis=1)
+        return np.stack([mean, 1 - mean], axis=1)
+
+    def test_rise_timeseries_localizes(self):
+        """Tests if the time steps the model looks at are the most relevant."""
+        np.random.seed(0)
+        input_data = np.ones((1000, 2), dtype=np.float32)
+
+        heatmaps = dianna.explain_timeseries(self._window_model, input_data, 'RISE', labels=(0, ),
+                                             axis_labels={-1: 'channels'}, n_masks=500, p_keep=.5, feature_res=16)
+
+        assert heatmaps.shape == (1, 1000)
+        assert heatmaps[0, 400:500].mean() > heatmaps[0, :300].mean() + .1
+
+    def test_rise_timeseries_mask_channels(self):
+        """Tests if channels-first data with a mask per channel gives a saliency per time step and channel."""
+        input_data = np.ones((3, 1000), dtype=np.float32)
+        explainer = RISE(n_masks=50, p_keep=.5, axis_labels=('channels', 'time'))
+
+        heatmaps = explainer.explain_timeseries(lambda data: self._window_model(np.moveaxis(data, 1, 2)),
+                                                input_data, labels=(0, 1), batch_size=16, prefetch=1,
+                                                mask_channels=True)
+
+        assert heatmaps.shape == (2, 1000, 3)
+        assert explainer.n_evaluated_masks == 50
+
+    def test_rise_timeseries_masks(self):
+        """Tests if the 1-D masks are smooth, within [0, 1] and have the requested shape."""
+        masks = RISE(feature_res=8).generate_masks_for_timeseries(100, .5, 20, n_channels=2)
+
+        assert masks.shape == (20, 100, 2)
+        assert masks.dtype == np.float32
+        assert masks.min() >= 0 and masks.max() <= 1
+        # linear interpolation over cells of 13 time steps
+        assert np.abs(np.diff(masks, axis=1)).max() <= 1 / 13 + 1e-6
+
+
+class RiseMultiresolution(TestCase):
+    """Suite of tests for coarse-to-fine RISE on images."""
+    @staticmethod
+    def _patch_model(data):
+        """Model that only looks at a small patch in the top left of the image."""
+        mean = data[:, 4:8, 4:8].reshape(len(data), -1).mean(axis=1)
+        return np.stack([mean, 1 - mean], axis=1)
+
+    def test_rise_multiresolution_single_level(self):
+        """Tests if a single resolution gives the same result as explain_image."""
+        input_data = np.random.random((16, 16, 1))
+        explainer = RISE(n_masks=20, p_keep=.5, feature_res=4, axis_labels={-1: 'channels'})
+        np.random.seed(0)
+        expected = explainer.explain_image(self._patch_model, input_data, labels=(1, ))
+        np.random.seed(0)
+        heatmaps = explainer.explain_image_multiresolution(self._patch_model, input_data, labels=(1, ),
+                                                           resolutions=(4, ))
+
+        assert np.allclose(heatmaps, expected, atol=1e-6)
+
+    def test_rise_multiresolution_localizes(self):
+        """Tests if the refined heatmap has its maximum on the patch the model looks at."""
+        np.random.seed(0)
+        input_data = np.ones((32, 32, 1))
+        explainer = RISE(n_masks=600, p_keep=.5, axis_labels={-1: 'channels'})
+
+        heatmaps = explainer.explain_image_multiresolution(self._patch_model, input_data, labels=(0, ),
+                                                           resolutions=(2, 4, 8), refine_fraction=.25)
+
+        assert heatmaps.shape == (1, 32, 32)
+        assert np.all(np.isfinite(heatmaps))
+        y, x = np.unravel_index(heatmaps[0].argmax(), (32, 32))
+        assert 2 <= y < 10 and 2 <= x < 10
+        assert explainer.n_evaluated_masks == 600
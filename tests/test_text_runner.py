@@ -0,0 +1,80 @@
+import numpy as np
+from dianna.utils import TextModelRunner
+
+
+VOCAB = {'<pad>': 0, '<unk>': 1, 'a': 2, 'good': 3, 'movie': 4, '.': 5}
+
+
+class CountingTokenizer:
+    """Tokenizer that splits off full stops and counts how often it is called."""
+    def __init__(self):
+        """Starts counting at zero."""
+        self.n_calls = 0
+
+    def __call__(self, text):
+        self.n_calls += 1
+        return text.replace('.', ' .').split()
+
+
+def test_text_runner_pads_and_numericalizes():
+    """Tests if a batch of sentences is converted to a padded array of token ids."""
+    inputs = []
+
+    def model(token_ids):
+        inputs.append(token_ids)
+        return np.zeros((len(token_ids), 1))
+
+    runner = TextModelRunner(model, VOCAB, CountingTokenizer(), min_length=5, activation='sigmoid', binary=True)
+    output = runner(['a good movie.', 'a bad movie'])
+
+    assert np.array_equal(inputs[0], [[2, 3, 4, 5, 0], [2, 1, 4, 0, 0]])
+    assert inputs[0].dtype == np.int64
+    assert np.allclose(output, .5)
+    assert runner.tokenizer('a good movie.') == ['a', 'good', 'movie', '.']
+
+
+def test_text_runner_caches_words():
+    """Tests if each distinct word is tokenized once, however often it occurs in a batch."""
+    tokenizer = CountingTokenizer()
+    runner = TextModelRunner(lambda token_ids: token_ids.sum(axis=1, keepdims=True), VOCAB, tokenizer,
+                             cache_size=2)
+    sentences = ['a good movie.', 'a UNKWORDZ movie.', 'UNKWORDZ good UNKWORDZ'] * 10
+
+    output = runner(sentences)
+
+    assert tokenizer.n_calls == 4
+    assert np.array_equal(output[:3, 0], [14, 12, 5])
+    assert len(runner._sentence_cache) == 2  # pylint: disable=protected-access
+
+
+def test_text_runner_without_pad_token():
+    """Tests if a vocabulary without padding token, such as GloVe, pads with the unknown token."""
+    inputs = []
+
+    def model(token_ids):
+        inputs.append(token_ids)
+        return np.array([[-1000., 0., 1000.]] * len(token_ids))
+
+    vocab = {word: index for word, index in VOCAB.items() if word != '<pad>'}
+    runner = TextModelRunner(model, vocab, str.split, min_length=3, activation='softmax')
+    output = runner(['a movie'])
+
+    assert np.array_equal(inputs[0], [[2, 4, 1]])
+    assert np.allclose(output, [[0, 0, 1]])
+    assert np.allclose(TextModelRunner(model, vocab, str.split, activation='sigmoid')(['a']), [[0, .5, 1]])
+
+
+def test_text_runner_empty_input():
+    """Tests if an empty batch and sentences without tokens give a batch of padding."""
+    inputs = []
+
+    def model(token_ids):
+        inputs.append(token_ids)
+        return np.zeros((len(token_ids), 1))
+
+    runner = TextModelRunner(model, VOCAB, str.split, min_length=2)
+
+    assert runner([]).shape == (0, 1)
+    assert runner(['', ' ']).shape == (2, 1)
+    assert inputs[0].shape == (0, 2)
+    assert np.array_equal(inputs[1], [[0, 0], [0, 0]])
@@ -4,6 +4,7 @@ import shutil
 import unittest
 from pathlib import Path
 from dianna.visualization.text import highlight_text
+from dianna.visualization.text import highlight_texts
 
 
 class TextExample:
@@ -73,6 +74,33 @@ class TextVisualizationTestCase(unittest.TestCase):
         highlight_text(TextExample.explanation, original_text=TextExample.original_text,
                        show_plot=True)
 
+    def test_text_visualization_batch(self):
+        """Test if a batch of texts gives the same html as highlighting each text, in memory and written to files."""
+        highlight_text(TextExampleWithExpectedHtml.explanation, original_text=TextExampleWithExpectedHtml.original_text,
+                       show_plot=False, output_html_filename=self.html_file_path)
+        with open(self.html_file_path, encoding='utf-8') as result_file:
+            expected = result_file.read()
+        explanations = [TextExampleWithExpectedHtml.explanation, TextExample.explanation]
+        original_texts = [TextExampleWithExpectedHtml.original_text, TextExample.original_text]
+        filenames = [str(Path(self.temp_folder) / f'output{i}.html') for i in range(2)]
+
+        results = highlight_texts(explanations, original_texts)
+        highlight_texts(explanations, original_texts, output_html_filenames=filenames)
+
+        assert results[0] + '\n' == expected
+        with open(filenames[0], encoding='utf-8') as result_file:
+            assert result_file.read() == expected
+
+    def test_text_visualization_batch_shared_scale(self):
+        """Test if a shared scale makes the opacity relative to the largest importance over all texts."""
+        explanations = [[('bad', 7, -0.5)], [('bad', 7, -1.0)]]
+        original_texts = ['Such a bad movie.'] * 2
+
+        results = highlight_texts(explanations, original_texts, max_opacity=1, shared_scale=True)
+
+        assert 'rgba(0, 0, 255, 0.500000)' in results[0]
+        assert 'rgba(0, 0, 255, 1.000000)' in results[1]
+
     def setUp(self) -> None:
         os.mkdir(self.temp_folder)
 
@@ -0,0 +1,99 @@
+import logging
+import time
+import numpy as np
+import dianna
+from dianna import utils
+from dianna.methods.lime import LIME
+from dianna.methods.rise import RISE
+from dianna.utils import TimeBudget
+from tests.utils import run_model
+
+
+def slow_model(input_data):
+    """Dummy model that takes 10 ms per batch."""
+    time.sleep(.01)
+    return run_model(input_data)
+
+
+def test_time_budget_iterate_stops():
+    """Tests if iterating stops when the next batch would not fit in the budget, but yields at least one batch."""
+    budget = TimeBudget(.05)
+    n_batches = 0
+    for _ in budget.iterate(range(100)):
+        time.sleep(.01)
+        n_batches += 1
+
+    assert 1 <= n_batches < 10
+    assert len(list(TimeBudget(0).iterate(range(100)))) == 1
+
+
+def test_time_budget_plan_samples():
+    """Tests if the planned number of samples fits in the budget and respects the limits."""
+    assert TimeBudget(None).plan_samples(1., 1000) == 1000
+    assert 90 < TimeBudget(1.).plan_samples(.01, 1000) <= 100
+    assert TimeBudget(1.).plan_samples(10., 1000, min_samples=5) == 5
+
+
+def test_rise_time_budget():
+    """Tests if RISE returns an explanation based on fewer masks when the time budget runs out."""
+    input_data = np.random.random((28, 28, 1))
+    explainer = RISE(n_masks=1000, p_keep=.5, axis_labels={-1: 'channels'})
+
+    heatmaps = explainer.explain_image(slow_model, input_data, batch_size=10, time_budget=.2)
+
+    assert heatmaps[0].shape == input_data.shape[:2]
+    assert 0 < explainer.n_evaluated_masks < 1000
+    assert len(explainer.masks) == explainer.n_evaluated_masks
+
+
+def test_lime_time_budget():
+    """Tests if LIME reduces the number of samples to fit in the time budget."""
+    input_data = np.random.random((28, 28, 1))
+    explainer = LIME(random_state=42, axis_labels={-1: 'channels'})
+
+    heatmaps = explainer.explain_image(slow_model, input_data, num_samples=5000, time_budget=.5)
+
+    assert heatmaps[0].shape == input_data.shape[:2]
+    assert explainer.n_evaluated_samples < 5000
+
+
+def test_rise_time_budget_includes_p_keep_tuning():
+    """Tests if determining p_keep stops when the time budget runs out."""
+    input_data = np.random.random((28, 28, 1))
+    explainer = RISE(n_masks=100, p_keep=None, axis_labels={-1: 'channels'})
+    n_calls = 0
+
+    def counting_model(input_data):
+        nonlocal n_calls
+        n_calls += 1
+        return slow_model(input_data)
+
+    explainer.explain_image(counting_model, input_data, batch_size=50, time_budget=0)
+
+    # without a budget, each of the 9 p_keep values is tried on 2 batches of 50 masks
+    assert n_calls < 9 * 2
+    assert explainer.n_evaluated_masks == 50
+
+
+def test_auto_batch_size_time_budget():
+    """Tests if probing the batch size stops when the time budget runs out, and is not cached."""
+    utils.clear_batch_size_cache()
+
+    batch_size = utils.get_batch_size('auto', slow_model, lambda n: np.random.random((n, 1, 28, 28)),
+                                      model_or_function=slow_model, input_shape=(1, 28, 28),
+                                      time_budget=TimeBudget(0))
+
+    assert batch_size == 1
+    assert not utils.batching._batch_size_cache  # pylint: disable=protected-access
+
+
+def test_explain_image_logs_sample_count(caplog):
+    """Tests if the dispatcher logs the number of samples of an explanation reduced by the time budget."""
+    input_data = np.random.random((28, 28, 1))
+
+    with caplog.at_level(logging.INFO, logger='dianna'):
+        dianna.explain_image(slow_model, input_data, 'RISE', labels=(0,), n_masks=1000, p_keep=.5,
+                             axis_labels={-1: 'channels'}, batch_size=10, time_budget=.1)
+
+    record, = [record for record in caplog.records if hasattr(record, 'n_samples')]
+    assert 0 < record.n_samples < 1000
@@ -0,0 +1,36 @@
+import os
+import tempfile
+import matplotlib.pyplot as plt
+import numpy as np
+from dianna.visualization.timeseries import downsample
+from dianna.visualization.timeseries import plot_timeseries
+
+
+def test_downsample_keeps_peaks():
+    """Tests if downsampling a long series keeps its extremes and the number of points."""
+    values = np.zeros(100000)
+    values[12345] = 5
+    values[54321] = -3
+
+    indices, downsampled = downsample(values, 1000)
+
+    assert len(indices) <= 1000
+    assert np.all(np.diff(indices) > 0)
+    assert downsampled.max() == 5 and downsampled.min() == -3
+    assert np.array_equal(downsample(values[:10], 1000)[1], values[:10])
+
+
+def test_plot_timeseries():
+    """Tests if a multivariate time series with a heatmap per channel is plotted, saved and its figure closed."""
+    timeseries = np.random.random((50000, 2))
+    heatmap = np.random.random((50000, 2)) - .5
+
+    n_figures = len(plt.get_fignums())
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output_filename = os.path.join(tmpdir, 'timeseries.png')
+        plot_timeseries(timeseries, heatmap, channel_names=['a', 'b'], show_plot=False,
+                        output_filename=output_filename)
+
+        assert os.path.exists(output_filename)
+    assert len(plt.get_fignums()) == n_figures
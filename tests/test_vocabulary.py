@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import pickle
+import tempfile
+import numpy as np
+import pytest
+from dianna.utils import TextModelRunner
+from dianna.utils import Vocabulary
+from dianna.utils import load_vocabulary
+
+
+WORD_VECTORS = '2 3\nmovie 0.1 0.2 0.3\n<pad> 0 0 0\nécole 1 2 3\n<unk> -1 -1 -1\nmovie 9 9 9\ngood 0.5 0.5 0.5\n'
+
+
+@pytest.fixture(name='word_vector_file')
+def fixture_word_vector_file():
+    """Writes a small word vector file in word2vec text format, with a duplicate word."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'vectors.txt')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(WORD_VECTORS)
+        yield path
+
+
+def test_vocabulary_lookup(word_vector_file):
+    """Tests if words map to the row of their vector, using the first occurrence of duplicate words."""
+    vocab = load_vocabulary(word_vector_file)
+
+    assert len(vocab) == 5
+    assert isinstance(vocab.vectors, np.memmap)
+    assert vocab['movie'] == 0 and vocab['école'] == 2 and vocab['good'] == 5
+    assert np.allclose(vocab.vectors[vocab['école']], [1, 2, 3])
+    assert 'bad' not in vocab
+    assert vocab.get('bad', vocab['<unk>']) == 3
+    with pytest.raises(KeyError):
+        vocab['bad']  # pylint: disable=pointless-statement
+
+
+def test_vocabulary_reuses_conversion(word_vector_file):
+    """Tests if the converted vocabulary is opened on the next load and can be sent to another process."""
+    load_vocabulary(word_vector_file)
+    vectors_file = os.path.join(word_vector_file + '.vocab', 'vectors.npy')
+    modified = os.stat(vectors_file).st_mtime_ns
+
+    vocab = pickle.loads(pickle.dumps(load_vocabulary(word_vector_file)))
+
+    assert os.stat(vectors_file).st_mtime_ns == modified
+    assert vocab['good'] == 5
+
+
+def test_vocabulary_in_text_runner(word_vector_file):
+    """Tests if a vocabulary can be used as the vocab of a text runner."""
+    runner = TextModelRunner(lambda token_ids: token_ids, Vocabulary.convert(word_vector_file,
+                                                                             word_vector_file + '.vocab'),
+                             str.split, min_length=3)
+
+    assert np.array_equal(runner(['good movie']), [[5, 0, 1]])
+
+
+def _make_stale(word_vector_file):
+    """Adds a word to the word vector file, so it is newer than its conversion."""
+    with open(word_vector_file, 'a', encoding='utf-8') as file:
+        file.write('bad -0.5 -0.5 -0.5\n')
+    converted = os.stat(word_vector_file + '.vocab').st_mtime
+    os.utime(word_vector_file, (converted + 10, converted + 10))
+
+
+def test_vocabulary_replaced_when_file_changes(word_vector_file):
+    """Tests if a changed word vector file is converted again, while an open vocabulary stays readable."""
+    old_vocab = load_vocabulary(word_vector_file)
+    _make_stale(word_vector_file)
+
+    new_vocab = load_vocabulary(word_vector_file)
+
+    assert new_vocab['bad'] == 6
+    assert 'bad' not in old_vocab and np.allclose(old_vocab.vectors[old_vocab['école']], [1, 2, 3])
+    assert sorted(os.listdir(os.path.dirname(word_vector_file))) == ['vectors.txt', 'vectors.txt.vocab']
+
+
+def test_vocabulary_replaced_by_concurrent_workers(word_vector_file):
+    """Tests if worker processes that find the same stale conversion can all convert it again."""
+    load_vocabulary(word_vector_file)
+    _make_stale(word_vector_file)
+
+    # spawned processes do not inherit the threads of the test process, which can deadlock a fork
+    with multiprocessing.get_context('spawn').Pool(4) as pool:
+        vocabs = pool.map(load_vocabulary, [word_vector_file] * 8)
+
+    assert all(vocab['bad'] == 6 for vocab in vocabs)
+    assert sorted(os.listdir(os.path.dirname(word_vector_file))) == ['vectors.txt', 'vectors.txt.vocab']
@@ -56,3 +56,21 @@ def test_xarray_move_axis_nonexistent():
 
     with pytest.raises(ValueError):
         utils.move_axis(data, nonexistent_label, 0)
+
+
+def test_get_axis_labels_dict():
+    """Tests if axis labels are resolved for every axis without creating an xarray object."""
+    data = np.zeros((1, 28, 28, 3))
+    labels = {0: 'batch', -1: 'channels'}
+    expected_labels = ('batch', 'dim_1', 'dim_2', 'channels')
+
+    assert utils.get_axis_labels(data, labels) == expected_labels
+    # the given labels should not be modified
+    assert labels == {0: 'batch', -1: 'channels'}
+
+
+def test_get_axis_labels_from_dataarray():
+    """Tests if the dimension names of an xarray DataArray are used when no axis labels are given."""
+    data = xr.DataArray(np.zeros((28, 28, 3)), dims=('y', 'x', 'channels'))
+
+    assert utils.get_axis_labels(data, [], required_labels=('channels',)) == ('y', 'x', 'channels')